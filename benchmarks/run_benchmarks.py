@@ -0,0 +1,375 @@
+"""Benchmarks of the solver and rendering hot paths.
+
+Times `compute_motion` with every method the GUI offers, in uniform and
+callable fields and at several run lengths, the drawing of complete
+traces and animations on an offscreen canvas, and the time for the GUI
+to start. Each benchmark records
+its best wall time over a few repeats, then one more instrumented run
+counts the evaluations of the equations of motion and of the fields,
+and the peak memory allocated.
+
+The results are saved as JSON, and can be compared with an earlier
+version's::
+
+    $ python benchmarks/run_benchmarks.py -o before.json
+    $ git checkout new-feature
+    $ python benchmarks/run_benchmarks.py -o after.json --compare before.json
+
+"""
+
+import argparse
+from contextlib import contextmanager
+import datetime
+import importlib.metadata
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Render without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import matplotlib  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+import numpy as np  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QWidget  # noqa: E402
+import scipy  # noqa: E402
+
+from drift_explorer import FieldExpression, compute_motion, solver, stepping  # noqa: E402
+
+# Picks the Qt backend, as the GUI does, so must come before pyplot
+from drift_explorer.custom_widgets import MatplotlibWidget  # noqa: E402
+from drift_explorer.animation import animate_particles, num_frames  # noqa: E402
+
+INITIAL_CONDITIONS = [0.0, 1.0, 0.0, 1.0, 0.0, 0.1]
+UNIFORM_B = (0.0, 0.0, 1.0)
+CALLABLE_B = "0, 0.01*z, 1 + 0.01*x"
+FORCE = (0.05, 0.0, 0.0)
+# The methods in the GUI's method box, apart from "auto", which picks
+# one of these
+METHODS = ("analytic", *stepping.SOLVE_IVP_METHODS, "boris", "splitting")
+# (num_periods, points_per_period) of the runs
+SCALES = [(10, 100), (100, 100), (10, 1000)]
+QUICK_SCALES = [(10, 100)]
+# Number of positions in the traces drawn
+TRACE_LENGTHS = [10_000, 100_000, 1_000_000]
+QUICK_TRACE_LENGTHS = [10_000]
+# Raised when the commit being benchmarked can't be found
+GIT_ERRORS = (OSError, subprocess.CalledProcessError)
+
+
+class Counter:
+    """Wraps ``function``, counting its calls"""
+
+    def __init__(self, function):
+        self.function = function
+        self.calls = 0
+        self.time_dependent = getattr(function, "time_dependent", False)
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.function(*args, **kwargs)
+
+
+@contextmanager
+def count_evaluations():
+    """Count the calls of the equations of motion and their Jacobian
+    inside the solver"""
+    counters = {
+        "newton": Counter(solver.newton),
+        "newton_jacobian": Counter(solver.newton_jacobian),
+    }
+    originals = {name: getattr(solver, name) for name in counters}
+    for name, counter in counters.items():
+        setattr(solver, name, counter)
+    try:
+        yield counters
+    finally:
+        for name, function in originals.items():
+            setattr(solver, name, function)
+
+
+def measure(run, repeats, make_field=None):
+    """Best and mean wall time of ``run()`` over ``repeats``, then the
+    evaluation counts and peak memory of one more run.
+
+    ``run`` takes the field to use if ``make_field`` is given, which is
+    wrapped to count its evaluations in the instrumented run.
+    """
+    times = []
+    for _ in range(repeats):
+        field = None if make_field is None else make_field()
+        start = time.perf_counter()
+        run() if make_field is None else run(field)
+        times.append(time.perf_counter() - start)
+
+    field = None if make_field is None else make_field()
+    if callable(field):
+        field = Counter(field)
+    with count_evaluations() as counters:
+        tracemalloc.start()
+        try:
+            run() if make_field is None else run(field)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds": min(times),
+        "mean_seconds": float(np.mean(times)),
+        "repeats": repeats,
+        "rhs_evaluations": counters["newton"].calls,
+        "jacobian_evaluations": counters["newton_jacobian"].calls,
+        "field_evaluations": field.calls if isinstance(field, Counter) else 0,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def solver_benchmarks(scales, repeats):
+    for field_kind in ("uniform", "callable"):
+        for method in METHODS:
+            if method == "analytic" and field_kind == "callable":
+                continue
+            for num_periods, points_per_period in scales:
+
+                def make_field():
+                    if field_kind == "uniform":
+                        return UNIFORM_B
+                    return FieldExpression(CALLABLE_B)
+
+                def run(B):
+                    compute_motion(
+                        INITIAL_CONDITIONS,
+                        0.0,
+                        1.0,
+                        1.0,
+                        B,
+                        FORCE,
+                        num_periods=num_periods,
+                        points_per_period=points_per_period,
+                        method=method,
+                    )
+
+                name = f"compute_motion/{method}/{field_kind}/{num_periods}x{points_per_period}"
+                yield (
+                    name,
+                    {
+                        "group": "solver",
+                        "method": method,
+                        "field": field_kind,
+                        "num_periods": num_periods,
+                        "points_per_period": points_per_period,
+                        **measure(run, repeats, make_field),
+                    },
+                )
+
+
+def _trace(length):
+    num_periods = length // 100
+    return compute_motion(
+        INITIAL_CONDITIONS,
+        0.0,
+        1.0,
+        1.0,
+        UNIFORM_B,
+        FORCE,
+        num_periods=num_periods,
+        method="analytic",
+    )
+
+
+def rendering_benchmarks(trace_lengths, repeats):
+    app = QApplication.instance() or QApplication(sys.argv)
+    parent = QWidget()
+    parent.resize(800, 600)
+    widget = MatplotlibWidget(parent)
+    parent.show()
+    app.processEvents()
+
+    for length in trace_lengths:
+        positions = _trace(length)
+
+        def plot_all():
+            widget.clear_fig()
+            widget.plot_all(positions)
+
+        yield (
+            f"plot_all/{length}",
+            {
+                "group": "rendering",
+                "num_samples": length,
+                **measure(plot_all, repeats),
+            },
+        )
+
+        def animate():
+            figure = Figure(figsize=(8, 6))
+            FigureCanvasAgg(figure)
+            ax = figure.add_subplot(projection="3d")
+            animation = animate_particles([positions], ax=ax)
+            figure.canvas.draw()
+            # Draw every frame as the timer would, without waiting for it
+            for frame in range(num_frames(len(positions)) + 1):
+                animation.draw_frame(frame)
+
+        yield (
+            f"animate_particles/{length}",
+            {
+                "group": "rendering",
+                "num_samples": length,
+                **measure(animate, repeats),
+            },
+        )
+
+    parent.close()
+
+
+def startup_benchmarks(repeats):
+    """Time ``drift-explorer --startup-time`` from launching Python to
+    the window being shown, and the parts it reports"""
+    command = [sys.executable, "-m", "drift_explorer", "--startup-time"]
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run(
+            command, capture_output=True, text=True, check=True, env=env
+        ).stdout
+        parts = dict(line.split()[:2] for line in output.splitlines() if line.strip())
+        # Not counting the wait for the background imports before quitting
+        times.append(time.perf_counter() - start - float(parts["preloaded"]))
+
+    yield (
+        "startup",
+        {
+            "group": "startup",
+            "seconds": min(times),
+            "mean_seconds": float(np.mean(times)),
+            "repeats": repeats,
+            # From the last run
+            "parts_seconds": {name: float(seconds) for name, seconds in parts.items()},
+        },
+    )
+
+
+def _version(package):
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def environment():
+    """Versions and machine the benchmarks ran with"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except GIT_ERRORS:
+        commit = None
+
+    return {
+        "drift_explorer": _version("drift-explorer"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change in time of each benchmark since ``baseline``,
+    returning the names of those slower by more than ``threshold``"""
+    regressions = []
+    print(f"\n{'benchmark':<50} {'before':>10} {'after':>10} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["seconds"], result["seconds"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  slower"
+        print(f"{name:<50} {before:>10.4f} {after:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-o", "--output", default="benchmarks.json", help="file to save results to"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="only the smallest cases, once each"
+    )
+    parser.add_argument(
+        "--only",
+        choices=("solver", "rendering", "startup"),
+        help="run one group of benchmarks",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed runs of each benchmark"
+    )
+    parser.add_argument("--compare", help="earlier results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="ratio of times counted as a regression when comparing",
+    )
+    args = parser.parse_args(argv)
+
+    repeats = 1 if args.quick else args.repeat
+    groups = []
+    if args.only in (None, "solver"):
+        groups.append(
+            solver_benchmarks(QUICK_SCALES if args.quick else SCALES, repeats)
+        )
+    if args.only in (None, "rendering"):
+        groups.append(
+            rendering_benchmarks(
+                QUICK_TRACE_LENGTHS if args.quick else TRACE_LENGTHS, repeats
+            )
+        )
+    if args.only in (None, "startup"):
+        groups.append(startup_benchmarks(repeats))
+
+    results = {}
+    for group in groups:
+        for name, result in group:
+            results[name] = result
+            print(
+                f"{name:<50} {result['seconds']:>9.4f} s "
+                f"{result.get('rhs_evaluations', 0):>8} rhs "
+                f"{result.get('peak_memory_bytes', 0) / 2**20:>8.1f} MiB",
+                flush=True,
+            )
+
+    with open(args.output, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
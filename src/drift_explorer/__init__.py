@@ -1,3 +1,49 @@
-from .solver import compute_motion
+from .solver import (
+    compute_dense_motion,
+    compute_motion,
+    compute_motion_batch,
+    compute_guiding_centre,
+    iter_motion,
+)
+from .boundaries import Box, EnergyLimit, StopCondition
+from .section import Plane, compute_section
+from .ensemble import EnsembleStatistics, compute_ensemble, maxwellian
+from .dense import DenseTrajectory
+from .diagnostics import (
+    DriftDiagnostics,
+    gyro_average,
+    measure_drift,
+    theoretical_drift,
+)
+from .expressions import FieldExpression
+from .fieldmap import FieldMap
+from .storage import CompactTrajectory, allocate_positions
+from .trajectory_file import SavedTrajectory, load_trajectory, save_trajectory
 
-__all__ = ["compute_motion"]
+__all__ = [
+    "Box",
+    "CompactTrajectory",
+    "DenseTrajectory",
+    "DriftDiagnostics",
+    "EnergyLimit",
+    "EnsembleStatistics",
+    "FieldExpression",
+    "FieldMap",
+    "Plane",
+    "SavedTrajectory",
+    "StopCondition",
+    "allocate_positions",
+    "compute_dense_motion",
+    "compute_ensemble",
+    "compute_motion",
+    "compute_motion_batch",
+    "compute_section",
+    "compute_guiding_centre",
+    "gyro_average",
+    "iter_motion",
+    "load_trajectory",
+    "maxwellian",
+    "measure_drift",
+    "save_trajectory",
+    "theoretical_drift",
+]
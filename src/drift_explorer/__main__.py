@@ -1,16 +1,68 @@
-from PyQt6.QtWidgets import QApplication
+import time
 
-import sys
-import signal
+# When the window was asked for, as near to the start as this module
+# can measure
+START = time.perf_counter()
 
-from .gui import DriftExplorer
+from PyQt6.QtCore import QTimer  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
 
+import argparse  # noqa: E402
+import sys  # noqa: E402
+import signal  # noqa: E402
+import threading  # noqa: E402
+
+from .gui import DriftExplorer  # noqa: E402
+
+
+def preload():
+    """Import the modules a run needs but the window doesn't, so the
+    first run doesn't wait for them"""
+    from scipy import integrate, interpolate, sparse  # noqa: F401
+
+    from . import animation  # noqa: F401
+
+
+def report_startup(timings, preloading):
+    """Print how long each part of starting up took, waiting for
+    `preload` to finish too"""
+    preloading.join()
+    timings["preloaded"] = time.perf_counter()
+    previous = START
+    for name, finished in timings.items():
+        print(f"{name:<10} {finished - previous:8.3f} s")
+        previous = finished
+    print(f"{'total':<10} {previous - START:8.3f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="drift-explorer")
+    parser.add_argument(
+        "--startup-time",
+        action="store_true",
+        help="print how long the window took to appear, then quit",
+    )
+    args, qt_args = parser.parse_known_args(argv)
+    timings = {"imported": time.perf_counter()}
 
-def main():
     signal.signal(signal.SIGINT, signal.SIG_DFL)
-    app = QApplication(sys.argv)
+    app = QApplication([sys.argv[0], *qt_args])
+    app.setApplicationName("drift-explorer")
     window = DriftExplorer()
+    timings["created"] = time.perf_counter()
     window.show()
+
+    # Once the window is up, load the rest in the background
+    preloading = threading.Thread(target=preload, daemon=True)
+
+    def shown():
+        timings["shown"] = time.perf_counter()
+        preloading.start()
+        if args.startup_time:
+            report_startup(timings, preloading)
+            app.quit()
+
+    QTimer.singleShot(0, shown)
     sys.exit(app.exec())
 
 
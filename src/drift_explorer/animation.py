@@ -1,27 +1,53 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib import animation
+from matplotlib.axes import Axes
 from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
 
+from .decimation import decimate
+
+# Target frame rate
+FRAME_RATE = 30
+# Range of time in seconds to show a complete trajectory over
+MIN_DURATION = 2.0
+MAX_DURATION = 20.0
+# Rate at which positions are revealed between those limits
+SAMPLES_PER_SECOND = 500
+
+
+def num_frames(num_samples: int) -> int:
+    """Number of frames to animate ``num_samples`` positions over"""
+    duration = np.clip(num_samples / SAMPLES_PER_SECOND, MIN_DURATION, MAX_DURATION)
+    return int(max(1, min(num_samples, round(duration * FRAME_RATE))))
+
+
+def _bounds(positions, start, end):
+    """Lower and upper corners of the box around ``positions[start:end]``"""
+    if start != 0 or end != len(positions):
+        positions = positions[start:end]
+    # Whole arrays, including a `CompactTrajectory`, are used in place
+    return positions.min(axis=0), positions.max(axis=0)
+
 
 def animate_particles(
     array_of_positions: list[np.ndarray],
     title: str | None = None,
-    nframes: int = 50,
-    ax: plt.Axes | None = None,
+    nframes: int | None = None,
+    ax: Axes | None = None,
 ):
     """Animate particle traces.
 
     Parameters
     ----------
     array_of_positions : list[np.ndarray]
-        List of 3D arrays of particle positions
+        List of 3D arrays of particle positions, which are drawn from
+        directly, so may be a `CompactTrajectory` or `numpy.memmap`
     B : tuple[int]
         Magnetic field vector
     F : tuple[int]
         Force vector
-    nframes : int
-        Number of frames
+    nframes : int | None
+        Number of frames, by default chosen from the length of the
+        trajectories, see `num_frames`
 
     Examples
     --------
@@ -36,42 +62,301 @@ def animate_particles(
     if len(array_of_positions) == 0:
         raise ValueError("Expected at least one array in `array_of_positions`!")
 
-    positions = array_of_positions
-    _step = positions[0].shape[0] // nframes
-
     if ax is None:
-        fig, ax = plt.subplots(subplot_kw={"projection": "3d"})
-    else:
-        fig = ax.get_figure()
+        # Only standalone use needs pyplot, not the GUI
+        import matplotlib.pyplot as plt
+
+        _, ax = plt.subplots(subplot_kw={"projection": "3d"})
 
     if title is not None:
         ax.set_title(title, size="xx-large")
 
-    ax.axis(
-        (
-            min(positions[0][:, 0]),
-            max(positions[0][:, 0]),
-            min(positions[0][:, 1]),
-            max(positions[0][:, 1]),
-            min(positions[0][:, 2]),
-            max(positions[0][:, 2]),
+    return TrajectoryAnimation(ax, array_of_positions, nframes=nframes)
+
+
+class TrajectoryAnimation(animation.FuncAnimation):
+    """Animation of particle traces that can be extended while it plays.
+
+    Parameters
+    ----------
+    ax : plt.Axes
+        3D axes to draw on
+    array_of_positions : list[np.ndarray]
+        Positions of each particle so far, which may be empty. Complete
+        positions are drawn from without being copied
+    expected_lengths : list[int] | None
+        Final number of positions of each particle, if more are still to
+        come through `extend`. If None, the positions are complete and
+        the animation loops
+    buffers : list[np.ndarray] | None
+        Arrays of the expected lengths to keep the positions in while
+        more are to come, such as from `allocate_positions`. They can
+        also be written to directly, followed by `fill`
+    nframes : int | None
+        Number of frames to show the complete trajectories over. By
+        default this depends on their length, so that short runs take
+        at least ``MIN_DURATION`` and long ones at most ``MAX_DURATION``
+        seconds at ``FRAME_RATE``
+    interval : int | None
+        Delay between frames in milliseconds, by default set by
+        ``FRAME_RATE``
+
+    Each frame only draws the newly revealed part of the traces. Where
+    the canvas supports blitting, the frames accumulate in a cached
+    background, so the cost of a frame doesn't grow as the traces do;
+    the full traces are only drawn again when the whole figure is.
+
+    Only the positions the canvas can resolve are drawn, see `decimate`.
+    They are picked incrementally as the traces are revealed, and
+    picked again from the start after `refresh`.
+
+    """
+
+    def __init__(
+        self,
+        ax,
+        array_of_positions: list[np.ndarray],
+        expected_lengths: list[int] | None = None,
+        nframes: int | None = None,
+        interval: int | None = None,
+        buffers: list[np.ndarray] | None = None,
+    ):
+        self.complete = expected_lengths is None
+        if self.complete:
+            expected_lengths = [len(positions) for positions in array_of_positions]
+
+        if nframes is None:
+            nframes = num_frames(expected_lengths[0])
+        if interval is None:
+            interval = 1000 / FRAME_RATE
+
+        self.ax = ax
+        self._samples_per_frame = max(1, -(-expected_lengths[0] // nframes))
+        self._ratios = [int(round(n / expected_lengths[0])) for n in expected_lengths]
+
+        if self.complete:
+            # Draw straight from the arrays given, without copying them
+            self._positions = list(array_of_positions)
+        elif buffers is not None:
+            self._positions = list(buffers)
+        else:
+            # Preallocate, so extending doesn't copy what is already there
+            self._positions = [np.empty((n, 3)) for n in expected_lengths]
+        self._lengths = [0 for _ in expected_lengths]
+        self._limits = None
+
+        # The decimated positions revealed so far, see `_reveal`
+        self._drawn = [np.empty((0, 3)) for _ in expected_lengths]
+        self._num_drawn = [0 for _ in expected_lengths]
+        self._revealed = [0 for _ in expected_lengths]
+
+        canvas = ax.get_figure().canvas
+        self._blitting = canvas.supports_blit
+        self._background = None
+
+        self.artists = [ax.plot3D([], [], [])[0] for _ in expected_lengths]
+        # The segments revealed by the latest frame, drawn over the
+        # cached background when blitting
+        self.heads = [
+            ax.plot3D([], [], [], color=artist.get_color(), animated=True)[0]
+            for artist in self.artists
+        ]
+        if self.complete:
+            self.fill(expected_lengths)
+        else:
+            self.extend(array_of_positions)
+
+        if self.complete:
+            frames = nframes + 1
+            repeat = True
+        else:
+            frames = self._frames()
+            repeat = False
+
+        super().__init__(
+            ax.get_figure(),
+            self._update,
+            frames=frames,
+            interval=interval,
+            repeat=repeat,
+            cache_frame_data=False,
         )
-    )
-
-    artists = [
-        ax.plot3D(positions[:0, 0], positions[:0, 1], positions[:0, 2])[0]
-        for positions in positions
-    ]
-    ratios = [int(round(len(p) / len(positions[0]))) for p in positions]
-
-    def update(frame):
-        index = _step * frame
-        for artist, position, ratio in zip(artists, positions, ratios):
-            artist.set_data_3d(
-                position[: index * ratio, 0],
-                position[: index * ratio, 1],
-                position[: index * ratio, 2],
-            )
-        return artist
-
-    return animation.FuncAnimation(fig, update, frames=nframes, interval=100)
+
+        if self._blitting:
+            self._draw_id = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def extend(self, array_of_positions: list[np.ndarray]):
+        """Append the next segment of each particle's trajectory"""
+        lengths = []
+        for index, segment in enumerate(array_of_positions):
+            start = self._lengths[index]
+            end = start + len(segment)
+            if end > len(self._positions[index]):
+                self._positions[index] = np.concatenate(
+                    (self._positions[index][:start], segment)
+                )
+            else:
+                self._positions[index][start:end] = segment
+            lengths.append(end)
+
+        self.fill(lengths)
+
+    def fill(self, lengths: list[int]):
+        """Mark the first ``lengths`` positions of each particle as
+        ready to show, after writing them into the ``buffers`` directly
+        instead of through `extend`"""
+        start = self._lengths[0]
+        self._lengths = list(lengths)
+        if self._lengths[0] > start:
+            self._update_limits(*_bounds(self._positions[0], start, self._lengths[0]))
+
+    def finish(self):
+        """Mark the trajectories as complete, so the animation stops
+        once they have been fully drawn"""
+        self.complete = True
+        # Drop the headroom left for more to come, which zooms in, so
+        # decimate again
+        if self._limits is not None:
+            self._set_limits(*self._limits)
+            self.refresh()
+
+    def refresh(self):
+        """Pick the positions to draw again, after the view changes"""
+        revealed = self._revealed
+        self._num_drawn = [0 for _ in self._num_drawn]
+        self._revealed = [0 for _ in self._revealed]
+        for index, end in enumerate(revealed):
+            self._reveal(index, end)
+        self._background = None
+
+    def pause(self):
+        # Once a finished animation has stopped, it has no timer left
+        if self.event_source is not None:
+            super().pause()
+        if self._blitting:
+            self._fig.canvas.mpl_disconnect(self._draw_id)
+
+    def resume(self):
+        if self._blitting:
+            self._background = None
+            self._draw_id = self._fig.canvas.mpl_connect("draw_event", self._on_draw)
+        super().resume()
+
+    def draw_frame(self, frame):
+        """Draw ``frame`` straight away, as the timer would, such as to
+        render the animation without waiting for it"""
+        self._draw_next_frame(frame, blit=False)
+
+    def remove(self):
+        """Stop the animation and take its traces off the axes,
+        returning the colour of the last one"""
+        self.pause()
+        for artist in self.artists + self.heads:
+            artist.remove()
+        return self.artists[-1].get_color()
+
+    def _reveal(self, index, end):
+        """Decimate the positions of particle ``index`` up to ``end``
+        that haven't been revealed yet, and add them to the trace.
+        Returns the new part of the trace, starting from the end of the
+        old one"""
+        start = self._revealed[index]
+        if end <= start:
+            return np.empty((0, 3))
+
+        # Overlap by one, which `decimate` always keeps, to carry on
+        # from the last position drawn
+        first = max(start - 1, 0)
+        new = self._positions[index][first:end]
+        new = new[decimate(self.ax, new)]
+        if start:
+            new = new[1:]
+
+        num_drawn = self._num_drawn[index]
+        total = num_drawn + len(new)
+        drawn = self._drawn[index]
+        if total > len(drawn):
+            drawn = np.empty((max(total, 2 * len(drawn)), 3))
+            drawn[:num_drawn] = self._drawn[index][:num_drawn]
+            self._drawn[index] = drawn
+        drawn[num_drawn:total] = new
+
+        self._num_drawn[index] = total
+        self._revealed[index] = end
+        # Views, so the trace costs nothing to update
+        self.artists[index].set_data_3d(
+            drawn[:total, 0], drawn[:total, 1], drawn[:total, 2]
+        )
+        return drawn[max(num_drawn - 1, 0) : total]
+
+    def _update_limits(self, lower, upper):
+        first = self._limits is None
+        if not first:
+            lower = np.minimum(lower, self._limits[0])
+            upper = np.maximum(upper, self._limits[1])
+        self._limits = (lower, upper)
+
+        if self.complete:
+            self._set_limits(lower, upper)
+            return
+
+        # Changing the limits means drawing everything again, so leave
+        # room for the traces to grow into. Growing the limits only
+        # makes what has been decimated finer than needed, so it doesn't
+        # need to be picked again
+        shown_lower, shown_upper = np.array(self.ax.axis()).reshape(3, 2).T
+        if first or np.any(lower < shown_lower) or np.any(upper > shown_upper):
+            headroom = 0.25 * (upper - lower)
+            self._set_limits(lower - headroom, upper + headroom)
+
+    def _set_limits(self, lower, upper):
+        self.ax.axis((lower[0], upper[0], lower[1], upper[1], lower[2], upper[2]))
+        self._background = None
+
+    def _frames(self):
+        frame = 0
+        while not self.complete or self._samples_per_frame * frame < self._lengths[0]:
+            yield frame
+            frame += 1
+        yield frame
+
+    def _update(self, frame):
+        sample = self._samples_per_frame * frame
+        for index, (head, length, ratio) in enumerate(
+            zip(self.heads, self._lengths, self._ratios)
+        ):
+            end = min(sample * ratio, length)
+            if end < self._revealed[index]:
+                # Starting again from the beginning
+                self._num_drawn[index] = 0
+                self._revealed[index] = 0
+                self._background = None
+                self.artists[index].set_data_3d([], [], [])
+            new = self._reveal(index, end)
+            head.set_data_3d(new[:, 0], new[:, 1], new[:, 2])
+        return self.heads
+
+    def _on_draw(self, event):
+        # A full draw includes everything revealed so far, but not the
+        # animated heads, so is the background for the next frame
+        self._background = self._fig.canvas.copy_from_bbox(self.ax.bbox)
+
+    # Overrides the private `FuncAnimation` hook that draws each frame,
+    # which tests/test_animation.py checks still gets called
+    def _post_draw(self, framedata, blit):
+        canvas = self._fig.canvas
+        if not self._blitting:
+            # The traces are drawn in full, so the heads aren't needed
+            for head in self.heads:
+                head.set_data_3d([], [], [])
+            canvas.draw_idle()
+            return
+
+        if self._background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+        for head in self.heads:
+            self.ax.draw_artist(head)
+        canvas.blit(self.ax.bbox)
+        self._background = canvas.copy_from_bbox(self.ax.bbox)
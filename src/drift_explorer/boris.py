@@ -0,0 +1,183 @@
+import numpy as np
+
+from .fields import cross, field_at, norm
+
+
+def _boris_rotation(B, charge_mass_ratio, dt):
+    """Boris rotation vectors ``(t, s)`` for ``(N, 3)`` fields B.
+
+    ``t`` uses ``tan(theta) / theta`` in place of the usual first order
+    half angle, so that the velocity rotates by exactly ``wc * dt``
+    each step and the gyrophase does not drift over long runs.
+    """
+    half_angle = 0.5 * charge_mass_ratio * dt * norm(B.T)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        phase_correction = np.where(
+            half_angle == 0, 1.0, np.tan(half_angle) / half_angle
+        )
+    t = (0.5 * charge_mass_ratio * dt * phase_correction)[:, np.newaxis] * B
+    s = 2 * t / (1 + np.sum(t * t, axis=1))[:, np.newaxis]
+    return t, s
+
+
+def _boris_rotate(v, t, s):
+    v_prime = v + cross(v, t)
+    return v + cross(v_prime, s)
+
+
+def iter_boris(
+    initial_conditions,
+    sample_dt,
+    num_samples,
+    substeps,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    progress=None,
+    block_size=1000,
+    stop=None,
+    min_particles=1,
+    with_velocity=False,
+):
+    """Generator form of `boris`, yielding ``(N, k, 3)`` blocks of up
+    to ``block_size`` samples as the push proceeds, and returning the
+    final ``(N, 6)`` state. If ``with_velocity``, the blocks are of
+    ``(N, k, 6)`` states, with the velocity brought level with each
+    sampled position"""
+    charge_mass_ratio = charge / mass
+    dt = sample_dt / substeps
+
+    position = np.array(initial_conditions[:, :3], dtype=float)
+    velocity = np.array(initial_conditions[:, 3:], dtype=float)
+    num_particles = len(position)
+
+    # Time of each particle, for time dependent fields
+    time = np.zeros(num_particles)
+
+    # Particles still being pushed, and the states of those that stopped
+    active = np.arange(num_particles)
+    final_state = np.array(initial_conditions, dtype=float)
+    if stop is not None:
+        keep = ~stop(time, final_state.T, mass)
+        active, position, velocity, time = (
+            active[keep],
+            position[keep],
+            velocity[keep],
+            time[keep],
+        )
+        dt, charge_mass_ratio, mass = dt[keep], charge_mass_ratio[keep], mass[keep]
+
+    force = None if callable(F) else np.asarray(F, dtype=float)
+
+    def half_kick(position, time, dt):
+        local_force = field_at(F, position, time) if force is None else force
+        return (0.5 * dt / mass)[:, np.newaxis] * local_force
+
+    def rotate_velocity(velocity, position, time, dt):
+        kick = half_kick(position, time, dt)
+        t, s = _boris_rotation(field_at(B, position, time), charge_mass_ratio, dt)
+        return _boris_rotate(velocity + kick, t, s) + kick
+
+    # Stagger the velocity back half a step
+    velocity = rotate_velocity(velocity, position, time, -0.5 * dt)
+
+    if callable(B):
+        push_velocity = rotate_velocity
+    else:
+        # Uniform field: the rotation is the same every step, so build
+        # it once as a matrix
+        t, s = _boris_rotation(field_at(B, position), charge_mass_ratio, dt)
+        rotation = _boris_rotate(np.eye(3), t[:, np.newaxis, :], s[:, np.newaxis, :])
+        uniform_kick = None if force is None else half_kick(position, time, dt)
+
+        def push_velocity(velocity, position, time, dt):
+            kick = (
+                half_kick(position, time, dt) if uniform_kick is None else uniform_kick
+            )
+            return np.matmul((velocity + kick)[:, np.newaxis, :], rotation)[:, 0] + kick
+
+    step = dt[:, np.newaxis]
+    progress_interval = max(1, num_samples // 1000)
+
+    width = 6 if with_velocity else 3
+
+    def new_block(length):
+        # Stopped particles have no more positions
+        if stop is None:
+            return np.empty((num_particles, length, width))
+        return np.full((num_particles, length, width), np.nan)
+
+    block = new_block(min(block_size, num_samples))
+    block[:, 0] = initial_conditions[:, :width]
+    filled = 1
+    ended = len(active) < min_particles
+
+    for sample in range(1, num_samples):
+        if ended:
+            break
+        if filled == block.shape[1]:
+            yield block
+            block = new_block(min(block_size, num_samples - sample))
+            filled = 0
+
+        for _ in range(substeps):
+            velocity = push_velocity(velocity, position, time, dt)
+            position += velocity * step
+            time += dt
+            if stop is None:
+                continue
+
+            # The leapfrog velocity is half a step behind here
+            stopped = stop(time, np.concatenate((position, velocity), axis=1).T, mass)
+            if not stopped.any():
+                continue
+            ended = len(active) - np.count_nonzero(stopped) < min_particles
+            if ended:
+                # The rest stop here too
+                stopped[:] = True
+            final_state[active[stopped]] = np.concatenate(
+                (position, rotate_velocity(velocity, position, time, 0.5 * dt)),
+                axis=1,
+            )[stopped]
+
+            keep = ~stopped
+            active, position, velocity, time = (
+                active[keep],
+                position[keep],
+                velocity[keep],
+                time[keep],
+            )
+            dt, charge_mass_ratio, mass = (
+                dt[keep],
+                charge_mass_ratio[keep],
+                mass[keep],
+            )
+            step = step[keep]
+            if not callable(B):
+                rotation = rotation[keep]
+                if uniform_kick is not None:
+                    uniform_kick = uniform_kick[keep]
+            if ended:
+                break
+
+        if ended:
+            break
+        block[active, filled, :3] = position
+        if with_velocity:
+            block[active, filled, 3:] = rotate_velocity(
+                velocity, position, time, 0.5 * dt
+            )
+        filled += 1
+
+        if progress is not None and sample % progress_interval == 0:
+            progress(sample / num_samples)
+
+    if filled:
+        yield block[:, :filled]
+
+    if len(active):
+        # Bring the velocity level with the position again
+        velocity = rotate_velocity(velocity, position, time, 0.5 * dt)
+        final_state[active] = np.concatenate((position, velocity), axis=1)
+    return final_state
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class StopCondition:
+    """Condition that ends a particle's run early, see the ``stop``
+    argument of `compute_motion`.
+
+    Conditions are called with the time, the ``(6, N)`` states
+    ``(x, y, z, u, v, w)`` of ``N`` particles and their ``(N,)`` masses,
+    and return True for each particle that should stop. Any function
+    doing the same can be used instead, but unlike those, subclasses of
+    this are compared by their parameters, so runs using them can be
+    cached.
+    """
+
+    def __call__(self, t, state, mass):
+        raise NotImplementedError
+
+    def _parameters(self):
+        """Tuple of the numbers that define the condition"""
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._parameters() == other._parameters()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self._parameters()))
+
+
+class Box(StopCondition):
+    """Stop particles once they leave the axis-aligned box between the
+    corners ``lower`` and ``upper``.
+
+    Examples
+    --------
+    >>> wall = Box([-1, -1, -np.inf], [1, 1, np.inf])
+    >>> positions = compute_motion(initial_conditions, 0, 1, 1, B, stop=wall)
+
+    """
+
+    def __init__(self, lower, upper):
+        self.lower = np.asarray(lower, dtype=float).reshape(3, 1)
+        self.upper = np.asarray(upper, dtype=float).reshape(3, 1)
+        if np.any(self.lower > self.upper):
+            raise ValueError(
+                f"Lower corner {self.lower.ravel()} must be below upper corner "
+                f"{self.upper.ravel()}"
+            )
+
+    def __call__(self, t, state, mass):
+        position = state[:3]
+        return np.any((position < self.lower) | (position > self.upper), axis=0)
+
+    def _parameters(self):
+        return (*self.lower.ravel().tolist(), *self.upper.ravel().tolist())
+
+    def __repr__(self):
+        return f"Box({self.lower.ravel().tolist()}, {self.upper.ravel().tolist()})"
+
+
+class EnergyLimit(StopCondition):
+    """Stop particles once their kinetic energy rises above ``maximum``
+    or falls below ``minimum``, whichever are given"""
+
+    def __init__(self, maximum=None, minimum=None):
+        if maximum is None and minimum is None:
+            raise ValueError("Give a `maximum` or `minimum` energy")
+        self.maximum = maximum
+        self.minimum = minimum
+
+    def __call__(self, t, state, mass):
+        velocity = state[3:]
+        energy = 0.5 * mass * np.sum(velocity * velocity, axis=0)
+        stopped = np.zeros(energy.shape, dtype=bool)
+        if self.maximum is not None:
+            stopped |= energy > self.maximum
+        if self.minimum is not None:
+            stopped |= energy < self.minimum
+        return stopped
+
+    def _parameters(self):
+        return (self.maximum, self.minimum)
+
+    def __repr__(self):
+        return f"EnergyLimit(maximum={self.maximum!r}, minimum={self.minimum!r})"
@@ -0,0 +1,350 @@
+from collections import OrderedDict
+import hashlib
+import inspect
+import os
+from pathlib import Path
+import threading
+
+import numpy as np
+
+from .boundaries import StopCondition
+from .expressions import FieldExpression
+from .section import Plane
+from .solver import compute_guiding_centre, compute_motion, iter_motion
+from .stepping import num_samples
+
+# Raised by `numpy.load` for a missing, unreadable or corrupt cache file
+LOAD_ERRORS = (OSError, ValueError)
+
+
+def _canonical(value):
+    """Hashable, repr-stable form of an argument, or raise TypeError if
+    it can't be part of a cache key"""
+    if isinstance(value, FieldExpression):
+        # Unlike other functions, these are identified by their text
+        return ("expression", value.text)
+    if isinstance(value, (StopCondition, Plane)):
+        return (type(value).__name__, value._parameters())
+    if callable(value):
+        raise TypeError("callable arguments can't be cached")
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_canonical(item) for item in np.asarray(value).tolist())
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    return float(value)
+
+
+def _mark_cached(kwargs):
+    """Note in the ``stats`` of a call, if any, that it was served from
+    the cache"""
+    stats = kwargs.get("stats")
+    if stats is not None:
+        stats["cached"] = True
+
+
+def _state_key(key):
+    """Key for the final state of the run cached under ``key``"""
+    return f"{key}-state"
+
+
+class TrajectoryCache:
+    """Memoising cache of computed trajectories.
+
+    Results are kept in memory up to ``max_bytes``, evicting the least
+    recently used first. If ``directory`` is given, results are also
+    written there as ``.npy`` files, which survive restarts and are
+    evicted oldest-used first once they exceed ``max_disk_bytes``.
+
+    Runs with callable fields are never cached, as there is no reliable
+    way to tell whether two functions are the same field, except for a
+    `FieldExpression`, which is identified by its text. Neither are
+    runs written into a caller's ``out`` or ``velocities`` buffers,
+    which would otherwise need a second copy.
+
+    Streamed runs are only collected in memory up to ``max_bytes``.
+    Beyond that they are written to the on-disk tier chunk by chunk as
+    they arrive, and entries too big for memory are loaded back as
+    memory-mapped arrays, so runs bigger than RAM can still be cached.
+
+    The final state of a `compute_motion` run is kept alongside its
+    trajectory, so that it can be continued from the cache. It is
+    dropped from memory along with the trajectory, and if it is missing
+    the run is recomputed when the state is asked for.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory budget for cached trajectories
+    directory : str | Path | None
+        Location of the on-disk tier, or None to only cache in memory
+    max_disk_bytes : int
+        Budget for the on-disk tier
+
+    Examples
+    --------
+    >>> cache = TrajectoryCache(max_bytes=256 * 2**20)
+    >>> ions = cache.compute_motion(initial_conditions, 0.0, 1, 1, B)
+
+    """
+
+    def __init__(self, max_bytes=512 * 2**20, directory=None, max_disk_bytes=2**32):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._states = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(function, *args, **kwargs):
+        """Key identifying a call of ``function``, or None if the call
+        can't be cached. Arguments that don't affect the result, like
+        ``progress`` and ``stats``, are ignored"""
+        arguments = inspect.signature(function).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        arguments = dict(arguments.arguments)
+        arguments.pop("progress", None)
+        arguments.pop("stats", None)
+        # Output buffers would have to be filled in again on a hit
+        for name in ("out", "velocities"):
+            if arguments.pop(name, None) is not None:
+                return None
+
+        try:
+            canonical = sorted(
+                (name, _canonical(value)) for name, value in arguments.items()
+            )
+        except TypeError:
+            return None
+
+        return hashlib.sha256(repr((function.__name__, canonical)).encode()).hexdigest()
+
+    def get(self, key):
+        """Cached trajectory for ``key``, or None"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        path = self._path(key)
+        if path is None or not path.exists():
+            return None
+
+        try:
+            # Too big to keep in memory, so read from the file as needed
+            mmap_mode = "r" if path.stat().st_size > self.max_bytes else None
+            positions = np.load(path, mmap_mode=mmap_mode)
+        except LOAD_ERRORS:
+            return None
+        os.utime(path)
+        self._remember(key, positions)
+        return positions
+
+    def put(self, key, positions):
+        """Cache ``positions`` under ``key``. The array is made
+        read-only, as it will be shared between callers"""
+        positions.flags.writeable = False
+        self._remember(key, positions)
+
+        path = self._path(key)
+        if path is not None:
+            np.save(path, positions)
+            self._evict_disk()
+
+    def get_state(self, key):
+        """Cached final state of the run under ``key``, or None"""
+        with self._lock:
+            if key in self._states:
+                return self._states[key]
+
+        path = self._path(_state_key(key))
+        if path is None or not path.exists():
+            return None
+
+        try:
+            state = np.load(path)
+        except LOAD_ERRORS:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._states[key] = state
+        return state
+
+    def put_state(self, key, state):
+        """Cache the final ``state`` of the run under ``key``. It is
+        only kept in memory while the run's trajectory is"""
+        state.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                self._states[key] = state
+
+        path = self._path(_state_key(key))
+        if path is not None:
+            np.save(path, state)
+
+    def clear(self):
+        """Empty the memory tier. The on-disk tier is left alone"""
+        with self._lock:
+            self._entries.clear()
+            self._states.clear()
+            self._nbytes = 0
+
+    def call(self, function, *args, **kwargs):
+        """Return ``function(*args, **kwargs)``, computing it only if it
+        isn't already cached"""
+        key = self.key(function, *args, **kwargs)
+        if key is not None:
+            positions = self.get(key)
+            if positions is not None:
+                _mark_cached(kwargs)
+                return positions
+
+        positions = function(*args, **kwargs)
+        if key is not None:
+            self.put(key, positions)
+        return positions
+
+    def compute_motion(self, *args, return_state=False, **kwargs):
+        """Cached `compute_motion`"""
+        key = self.key(compute_motion, *args, **kwargs)
+        if key is not None:
+            positions = self.get(key)
+            state = self.get_state(key) if return_state else None
+            if positions is not None and (state is not None or not return_state):
+                _mark_cached(kwargs)
+                return (positions, state) if return_state else positions
+
+        positions, state = compute_motion(*args, return_state=True, **kwargs)
+        if key is not None:
+            self.put(key, positions)
+            self.put_state(key, state)
+        return (positions, state) if return_state else positions
+
+    def compute_guiding_centre(self, *args, **kwargs):
+        """Cached `compute_guiding_centre`"""
+        return self.call(compute_guiding_centre, *args, **kwargs)
+
+    def iter_motion(self, *args, chunk_size=1000, **kwargs):
+        """Cached `iter_motion`. Shares entries with `compute_motion`,
+        and replays a cached trajectory in chunks straight away. Returns
+        the final state, or None if it is no longer cached"""
+        key = self.key(compute_motion, *args, **kwargs)
+        positions = self.get(key) if key is not None else None
+
+        if positions is not None:
+            _mark_cached(kwargs)
+            for start in range(0, len(positions), chunk_size):
+                yield positions[start : start + chunk_size]
+            return self.get_state(key)
+
+        disk = self._open_streamed(key, *args, **kwargs)
+        chunks = [] if key is not None else None
+        length = nbytes = 0
+        motion = iter_motion(*args, chunk_size=chunk_size, **kwargs)
+        try:
+            while True:
+                try:
+                    chunk = next(motion)
+                except StopIteration as stop:
+                    state = stop.value
+                    break
+                if disk is not None:
+                    disk[length : length + len(chunk)] = chunk
+                length += len(chunk)
+                nbytes += chunk.nbytes
+                # Only kept in memory if the whole run fits
+                if chunks is not None and nbytes <= self.max_bytes:
+                    chunks.append(chunk)
+                else:
+                    chunks = None
+                yield chunk
+
+            if chunks:
+                positions = np.concatenate(chunks)
+                positions.flags.writeable = False
+                self._remember(key, positions)
+            if disk is not None and length:
+                self._finish_streamed(key, disk, length)
+            if chunks or (disk is not None and length):
+                self.put_state(key, state)
+        finally:
+            if disk is not None:
+                del disk
+                self._path(key).with_suffix(".part").unlink(missing_ok=True)
+        return state
+
+    def _open_streamed(self, key, *args, **kwargs):
+        """File on the on-disk tier that a streamed run under ``key`` is
+        written into as it arrives, long enough for the whole run, or
+        None if there is no on-disk tier or the run wouldn't fit"""
+        if key is None or self.directory is None:
+            return None
+        arguments = inspect.signature(iter_motion).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        length = num_samples(
+            arguments.arguments["num_periods"],
+            arguments.arguments["mass"],
+            arguments.arguments["points_per_period"],
+        )
+        if length * 3 * np.dtype(float).itemsize > self.max_disk_bytes:
+            return None
+        return np.lib.format.open_memmap(
+            self._path(key).with_suffix(".part"),
+            mode="w+",
+            dtype=float,
+            shape=(length, 3),
+        )
+
+    def _finish_streamed(self, key, disk, length):
+        """Move the first ``length`` positions written to ``disk`` by
+        `iter_motion` into place on the on-disk tier"""
+        path = self._path(key)
+        if length < len(disk):
+            # Cut short by a stop condition, so copy the start over to a
+            # file of the right length
+            trimmed_path = path.with_suffix(".trim")
+            trimmed = np.lib.format.open_memmap(
+                trimmed_path, mode="w+", dtype=disk.dtype, shape=(length, 3)
+            )
+            trimmed[:] = disk[:length]
+            trimmed.flush()
+            del trimmed
+            os.replace(trimmed_path, path)
+        else:
+            disk.flush()
+            os.replace(path.with_suffix(".part"), path)
+        self._evict_disk()
+
+    def _remember(self, key, positions):
+        if positions.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = positions
+            self._nbytes += positions.nbytes
+
+            while self._nbytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._states.pop(evicted_key, None)
+                self._nbytes -= evicted.nbytes
+
+    def _path(self, key):
+        if self.directory is None:
+            return None
+        return self.directory / f"{key}.npy"
+
+    def _evict_disk(self):
+        files = [(path, path.stat()) for path in self.directory.glob("*.npy")]
+        total = sum(stat.st_size for _, stat in files)
+        # Oldest used first
+        for path, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
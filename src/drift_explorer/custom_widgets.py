@@ -17,9 +17,13 @@ import numpy as np
 from PyQt6.QtWidgets import QVBoxLayout, QDoubleSpinBox
 from PyQt6.QtGui import QValidator
 
+from contextlib import nullcontext
 import warnings
 
-from .animation import animate_particles
+from .decimation import DecimatedTrace
+
+# Label of the lines drawn by `MatplotlibWidget.plot_guiding_centre`
+GUIDING_CENTRE_LABEL = "guiding centre"
 
 
 class ScientificDoubleSpinBox(QDoubleSpinBox):
@@ -61,6 +65,9 @@ class MatplotlibWidget:
         self.mpl_toolbar = NavigationToolbar(self.canvas, parent)
         self._make_axes()
         self.animation = None
+        self.traces = []
+        # `RunProfile` to time drawing in, if any
+        self.profile = None
 
         self.grid_layout = QVBoxLayout()
         self.grid_layout.addWidget(self.canvas)
@@ -68,11 +75,27 @@ class MatplotlibWidget:
         parent.setLayout(self.grid_layout)
 
         self.callback_id = None
+        # Rotating or zooming with the mouse changes what can be seen
+        self.canvas.mpl_connect("button_release_event", lambda event: self.redraw())
 
         warnings.filterwarnings(
             "ignore", "Attempting to set identical left == right.*", UserWarning
         )
 
+    def stage(self, name):
+        """Time the code inside as stage ``name`` of `profile`, if
+        there is one, such as the plotting that the window prepares"""
+        return nullcontext() if self.profile is None else self.profile.stage(name)
+
+    def _draw(self):
+        with self.stage("draw"):
+            self.canvas.draw()
+
+    @property
+    def is_3d(self):
+        """Whether the axes show orbits in 3D, rather than a section"""
+        return self.axes.name == "3d"
+
     def _make_axes(self):
         self.axes = self.figure.add_subplot(111, projection="3d")
         self.axes.set_xlabel("x [m]")
@@ -109,42 +132,142 @@ class MatplotlibWidget:
         """
         self._clean_axes()
         self._make_axes()
-        self.canvas.draw()
+        self.traces = []
+        self._draw()
+
+    def redraw(self):
+        """Draw the canvas, first decimating the particle traces again
+        for the current view"""
+        with self.stage("decimate"):
+            for trace in self.traces:
+                trace.refresh()
+            if self.animation is not None:
+                self.animation.refresh()
+        self._draw()
+
+    def animate(self, positions, expected_lengths=None, buffers=None):
+        """Animate the particle traces in ``positions``.
+
+        If ``expected_lengths`` is given, the traces are still being
+        computed: the animation plays what it has so far and more is
+        added with `extend_animation`, or written into ``buffers`` and
+        marked with `fill_animation`, until `finish_animation`.
+        """
+        # Not needed until the first run, so not imported at startup
+        from .animation import TrajectoryAnimation
+
+        if self.animation is not None:
+            self.animation.pause()
+        if not self.is_3d:
+            self.clear_fig()
+        self.animation = TrajectoryAnimation(
+            self.axes, positions, expected_lengths=expected_lengths, buffers=buffers
+        )
+        self._draw()
+
+    def extend_animation(self, segments):
+        self.animation.extend(segments)
 
-    def animate(self, positions):
-        self.animation = animate_particles(positions, ax=self.axes)
-        self.canvas.draw()
+    def fill_animation(self, lengths):
+        self.animation.fill(lengths)
+
+    def finish_animation(self):
+        self.animation.finish()
 
     def plot_field(self, X, Y, Z, U, V, W, colour="black"):
         self.axes.quiver(X, Y, Z, U, V, W, alpha=0.5, color=colour, normalize=True)
 
-    def plot_all(self, positions):
-        self.axes.plot3D(positions[:, 0], positions[:, 1], positions[:, 2])
-        self.canvas.draw()
+    def plot_all(self, positions, colour=None):
+        if not self.is_3d:
+            self.clear_fig()
+        self.traces.append(DecimatedTrace(self.axes, positions, color=colour))
+        # Decimate again now the axis limits include the new trace
+        self.redraw()
+
+    def plot_guiding_centre(self, centres):
+        """Dashed line of a guiding centre's trajectory, over the orbit
+        it was measured from, which `redraw_trace` leaves alone"""
+        self.traces.append(
+            DecimatedTrace(
+                self.axes,
+                centres,
+                color="black",
+                linestyle="--",
+                label=GUIDING_CENTRE_LABEL,
+            )
+        )
+        self.redraw()
+
+    def plot_section(self, points, labels):
+        """Scatter plot of the ``(K, 2)`` coordinates of the crossings of
+        a Poincaré section, labelling the axes with the coordinates'
+        ``labels``. Sections through the same plane share the axes"""
+        if self.animation is not None:
+            self.animation.pause()
+            self.animation = None
+        if self.is_3d or (self.axes.get_xlabel(), self.axes.get_ylabel()) != labels:
+            self._clean_axes()
+            self.traces = []
+            self.axes = self.figure.add_subplot(111)
+            self.axes.set_xlabel(labels[0])
+            self.axes.set_ylabel(labels[1])
+            self.axes.grid(True)
+        self.axes.scatter(points[:, 0], points[:, 1], s=4)
+        self._draw()
+
+    def redraw_trace(self, positions):
+        """Redraw the last particle trace plotted as ``positions``, such
+        as the same trajectory continued further or sampled differently"""
+        lines = [
+            line for line in self.axes.lines if line.get_label() != GUIDING_CENTRE_LABEL
+        ]
+        line = lines[-1] if lines else None
+        for trace in self.traces:
+            if trace.line is line:
+                trace.set_positions(positions)
+                self.redraw()
+                return
+
+        # Otherwise the last trace is animated, or there isn't one
+        colour = None
+        if self.animation is not None:
+            colour = self.animation.remove()
+            self.animation = None
+        self.plot_all(positions, colour)
 
     def set_view_xy(self):
+        if not self.is_3d:
+            return
         self.axes.view_init(90, -90, 0)
-        self.canvas.draw()
+        self.redraw()
 
     def set_view_xz(self):
+        if not self.is_3d:
+            return
         self.axes.view_init(0, -90, 0)
-        self.canvas.draw()
+        self.redraw()
 
     def set_view_yz(self):
+        if not self.is_3d:
+            return
         self.axes.view_init(0, 0, 0)
-        self.canvas.draw()
+        self.redraw()
 
     def set_perspective(self):
+        if not self.is_3d:
+            return
         self.axes.set_proj_type("persp")
-        self.canvas.draw()
+        self.redraw()
 
     def set_orthographic(self):
+        if not self.is_3d:
+            return
         self.axes.set_proj_type("ortho")
-        self.canvas.draw()
+        self.redraw()
 
     def adjust_axis(self, limits):
         self.axes.axis(limits)
-        self.canvas.draw()
+        self.redraw()
 
     def get_axis(self):
         return self.axes.axis()
@@ -152,4 +275,4 @@ class MatplotlibWidget:
     def reset_axis(self):
         self.axes.axis("tight")
         self.axes.axis("auto")
-        self.canvas.draw()
+        self.redraw()
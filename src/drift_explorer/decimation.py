@@ -0,0 +1,100 @@
+import numpy as np
+from mpl_toolkits.mplot3d import proj3d
+
+# Number of positions projected at once while decimating, which bounds
+# the temporary memory for very long trajectories
+DECIMATION_CHUNK_SIZE = 1_000_000
+
+
+def display_coordinates(ax, positions):
+    """Project ``(N, 3)`` positions onto the canvas of the 3D axes
+    ``ax``, returning ``(N, 2)`` pixel coordinates"""
+    xs, ys, _ = proj3d.proj_transform(
+        positions[:, 0], positions[:, 1], positions[:, 2], ax.get_proj()
+    )
+    return ax.transData.transform(np.column_stack((xs, ys)))
+
+
+def decimate(ax, positions, tolerance=1.0):
+    """Indices of the ``positions`` needed to draw them on ``ax``.
+
+    The canvas is split into square cells ``tolerance`` pixels across,
+    and each run of consecutive positions inside one cell is replaced
+    by the first and last of the run. The line between those stays in
+    the cell, so no dropped position is more than ``sqrt(2) *
+    tolerance`` pixels from what is drawn. The number of positions kept
+    depends on how many cells the trajectory crosses on screen, not on
+    how finely it was sampled.
+
+    Parameters
+    ----------
+    ax : plt.Axes
+        3D axes the positions are drawn on, in its current view
+    positions : np.ndarray
+        ``(N, 3)`` array of positions
+    tolerance : float
+        Cell size in pixels
+
+    Returns
+    -------
+    np.ndarray
+        Sorted indices into ``positions``, always including the first
+        and last
+
+    """
+    num_positions = len(positions)
+    if num_positions <= 2:
+        return np.arange(num_positions)
+
+    keep = [[0, num_positions - 1]]
+    for start in range(0, num_positions - 1, DECIMATION_CHUNK_SIZE):
+        # Overlap by one, to compare across the chunk boundary
+        block = positions[start : start + DECIMATION_CHUNK_SIZE + 1]
+        cells = np.floor(display_coordinates(ax, block) / tolerance)
+        changed = start + np.flatnonzero(np.any(cells[1:] != cells[:-1], axis=1))
+        # Last position in the old cell and first in the new one
+        keep.extend((changed, changed + 1))
+
+    return np.unique(np.concatenate(keep))
+
+
+class DecimatedTrace:
+    """Particle trace drawn with only the positions the canvas can show.
+
+    Call `refresh` whenever the view changes, to decimate again for
+    the new projection and axis limits.
+
+    Parameters
+    ----------
+    ax : plt.Axes
+        3D axes to draw on
+    positions : np.ndarray
+        ``(N, 3)`` array of positions
+    tolerance : float
+        Cell size in pixels, see `decimate`
+    **kwargs
+        Passed on to `plot3D`
+
+    """
+
+    def __init__(self, ax, positions, tolerance=1.0, **kwargs):
+        self.ax = ax
+        self.tolerance = tolerance
+        self.line = ax.plot3D([], [], [], **kwargs)[0]
+        self.set_positions(positions)
+
+    def set_positions(self, positions):
+        """Replace the trajectory, rescaling the axes to include it"""
+        self.positions = positions
+        if len(positions):
+            # Only the bounding box is needed to rescale
+            bounds = np.stack((positions.min(axis=0), positions.max(axis=0)))
+            self.ax.auto_scale_xyz(
+                bounds[:, 0], bounds[:, 1], bounds[:, 2], had_data=True
+            )
+        self.refresh()
+
+    def refresh(self):
+        """Decimate the trajectory for the current view"""
+        shown = self.positions[decimate(self.ax, self.positions, self.tolerance)]
+        self.line.set_data_3d(shown[:, 0], shown[:, 1], shown[:, 2])
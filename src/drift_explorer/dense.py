@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class DenseTrajectory:
+    """Trajectory that can be sampled at any time during its run.
+
+    Instead of positions on a fixed grid, this keeps only what is
+    needed to reconstruct them: the interpolant from each integrator
+    step, the positions at every Boris step, or nothing at all for the
+    exact solution. Sampling at a different resolution, or over part of
+    the run, is then only an interpolation.
+
+    Parameters
+    ----------
+    interpolant : callable
+        Function of an array of ``T`` times returning a ``(T, 3)``
+        array of positions
+    duration : float
+        Length of the run, which starts at time 0
+    final_state : np.ndarray
+        Position and velocity at the end of the run
+
+    Examples
+    --------
+    >>> trajectory = compute_dense_motion(initial_conditions, 0.0, 1, 1, B)
+    >>> coarse = trajectory.sample(1000)
+    >>> fine = trajectory.sample(100_000, stop=0.1 * trajectory.duration)
+
+    """
+
+    def __init__(self, interpolant, duration, final_state):
+        self.interpolant = interpolant
+        self.duration = duration
+        self.final_state = final_state
+
+    def __call__(self, t):
+        """Positions at times ``t``, as a ``(len(t), 3)`` array"""
+        return self.interpolant(np.asarray(t, dtype=float))
+
+    def sample(self, num_samples, start=0.0, stop=None):
+        """``num_samples`` evenly spaced positions from time ``start`` to
+        ``stop``, which defaults to the end of the run"""
+        if stop is None:
+            stop = self.duration
+        return self(np.linspace(start, stop, num_samples))
+
+    def extended(self, extension):
+        """This trajectory followed by ``extension``, another
+        `DenseTrajectory` starting from this one's final state"""
+        duration = self.duration
+
+        def interpolant(t):
+            later = t > duration
+            positions = np.empty((len(t), 3))
+            positions[~later] = self.interpolant(t[~later])
+            positions[later] = extension.interpolant(t[later] - duration)
+            return positions
+
+        return DenseTrajectory(
+            interpolant, duration + extension.duration, extension.final_state
+        )
+
+
+class UniformSpline:
+    """Cubic spline through positions at evenly spaced times.
+
+    Only the knots around the times asked for are fitted on each call,
+    so evaluating a short window of a long run is cheap, and nothing
+    but the knots themselves is stored.
+
+    Parameters
+    ----------
+    dt : float
+        Time between knots, the first of which is at time 0
+    positions : np.ndarray
+        ``(K, 3)`` array of positions at the knots
+
+    """
+
+    # Extra knots fitted either side of the window, so the end
+    # conditions of the fit don't affect it
+    margin = 4
+
+    def __init__(self, dt, positions):
+        self.dt = dt
+        self.positions = positions
+
+    def __call__(self, t):
+        if len(t) == 0:
+            return np.empty((0, 3))
+
+        index = t / self.dt
+        first = max(0, int(np.floor(index.min())) - self.margin)
+        last = min(len(self.positions), int(np.ceil(index.max())) + self.margin + 1)
+        # Imported here as SciPy is slow to import, see `solver`
+        from scipy.interpolate import CubicSpline
+
+        spline = CubicSpline(
+            self.dt * np.arange(first, last), self.positions[first:last]
+        )
+        return spline(t)
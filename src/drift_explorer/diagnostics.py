@@ -0,0 +1,131 @@
+import numpy as np
+
+from .fields import drift_terms, field_at, from_time, gyration_split, norm
+from .stepping import run_length
+
+
+def gyro_average(positions, times, gyroperiod):
+    """Guiding centre of a trajectory: its ``(T, 3)`` positions,
+    sampled at the evenly spaced ``times``, averaged over a window one
+    ``gyroperiod`` long sliding along them.
+
+    The average is the integral of the straight lines between the
+    samples over the window, all windows taken at once from the
+    cumulative sums of their trapezoids. The window needn't span a
+    whole number of samples.
+
+    Returns
+    -------
+    np.ndarray
+        ``(K,)`` times of the middle of each window
+    np.ndarray
+        ``(K, 3)`` average positions over each window
+
+    """
+    positions = np.asarray(positions, dtype=float)
+    times = np.asarray(times, dtype=float)
+    dt = times[1] - times[0]
+    window = gyroperiod / dt
+    if window > len(positions) - 1:
+        raise ValueError("The trajectory must last at least a gyroperiod")
+
+    # Relative to the start, so the sums stay small for rounding error
+    origin = positions[0]
+    relative = positions - origin
+    integral = np.zeros_like(relative)
+    np.cumsum(0.5 * dt * (relative[1:] + relative[:-1]), axis=0, out=integral[1:])
+
+    # Integral up to the fractional sample each window ends at
+    starts = np.arange(int(np.floor(len(positions) - 1 - window)) + 1)
+    ends = starts + window
+    whole = np.minimum(ends.astype(int), len(positions) - 2)
+    fraction = (ends - whole)[:, np.newaxis]
+    slope = relative[whole + 1] - relative[whole]
+    end_integral = integral[whole] + dt * fraction * (
+        relative[whole] + 0.5 * fraction * slope
+    )
+
+    centres = origin + (end_integral - integral[starts]) / gyroperiod
+    return times[starts] + 0.5 * gyroperiod, centres
+
+
+def theoretical_drift(initial_conditions, t0, charge, mass, B, F=[0, 0, 0]):
+    """Drift velocity across the field of the guiding centre of a
+    particle starting with ``initial_conditions``: the F x B drift and,
+    for callable B, the grad-B and curvature drifts, as followed by
+    `compute_guiding_centre`"""
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    B, F = from_time(B, t0), from_time(F, t0)
+    X0, v_parallel, mu, _, _ = gyration_split(initial_conditions, charge, mass, B, F)
+    return drift_terms(0.0, X0, v_parallel, charge, mass, mu, B, F)[2]
+
+
+class DriftDiagnostics:
+    """Drift of a particle measured from its trajectory, and the drift
+    expected from guiding-centre theory.
+
+    Attributes
+    ----------
+    times : np.ndarray
+        ``(K,)`` times of the guiding centres, from the start of the run
+    centres : np.ndarray
+        ``(K, 3)`` guiding-centre trajectory, from `gyro_average`
+    velocity : np.ndarray
+        Average velocity of the guiding centre, fitted to its trajectory
+        by least squares
+    drift : np.ndarray
+        Part of ``velocity`` across the field at the start
+    theory : np.ndarray
+        `theoretical_drift` at the start
+
+    """
+
+    def __init__(self, times, centres, direction, theory):
+        self.times = times
+        self.centres = centres
+        offsets = times - times.mean()
+        self.velocity = offsets @ (centres - centres.mean(axis=0)) / (offsets @ offsets)
+        self.drift = self.velocity - np.dot(self.velocity, direction) * direction
+        self.theory = theory
+
+    def summary(self):
+        """Description of the measured and theoretical drifts"""
+        drift = ", ".join(f"{value:.4g}" for value in self.drift)
+        theory = ", ".join(f"{value:.4g}" for value in self.theory)
+        return f"Drift ({drift}), theory ({theory})"
+
+
+def measure_drift(
+    positions, initial_conditions, t0, charge, mass, B, F=[0, 0, 0], num_periods=10
+):
+    """Measure the drift of a particle from the ``(T, 3)`` positions
+    computed by `compute_motion` with the same arguments, which are
+    evenly spaced over the run.
+
+    The positions are averaged over the gyroperiod at the start with
+    `gyro_average`, which removes the gyration and leaves the guiding
+    centre, so a few gyroperiods are enough to measure the drift. In
+    fields that change along the orbit, the gyroperiod does too, and
+    some of the gyration is left in the guiding centre.
+
+    Returns
+    -------
+    DriftDiagnostics
+
+    """
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    shifted_B = from_time(B, t0)
+    periods, t1 = run_length(initial_conditions, charge, mass, shifted_B, num_periods)
+    times, centres = gyro_average(
+        positions, np.linspace(0, t1, len(positions)), t1 / periods
+    )
+    if len(times) < 2:
+        raise ValueError("The trajectory must last longer than a gyroperiod")
+
+    B0 = field_at(shifted_B, initial_conditions[np.newaxis, :3])[0]
+    return DriftDiagnostics(
+        times,
+        centres,
+        B0 / norm(B0),
+        theoretical_drift(initial_conditions, t0, charge, mass, B, F),
+    )
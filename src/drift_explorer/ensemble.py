@@ -0,0 +1,283 @@
+import numpy as np
+
+from .fields import from_time
+from .solver import compute_motion_batch
+from .stepping import batch_run_lengths
+
+# Memory budget for the positions of each chunk of particles pushed
+ENSEMBLE_CHUNK_BYTES = 64 * 2**20
+# Most particles pushed at once, which also bounds the solver's own
+# working memory
+MAX_CHUNK_SIZE = 100_000
+# Half-width of the histograms, in standard deviations of the first
+# chunk, when no range is given
+HISTOGRAM_WIDTH = 5
+
+
+def maxwellian(num_particles, mean_velocity, thermal_speed, rng=None):
+    """``(num_particles, 3)`` velocities drawn from a drifting Maxwellian
+    distribution, centred on ``mean_velocity``, with each component
+    spread by ``thermal_speed``, which is ``sqrt(kT / m)``"""
+    rng = np.random.default_rng(rng)
+    return np.asarray(mean_velocity, dtype=float) + thermal_speed * rng.standard_normal(
+        (num_particles, 3)
+    )
+
+
+class EnsembleStatistics:
+    """Running statistics of the average velocities of an ensemble of
+    particles, each its displacement over the run divided by the run's
+    length, so that the gyration averages out and the drift is left.
+
+    Particles are added in chunks with `add`, and only the statistics
+    are kept: the count, mean and covariance, updated as in Chan et
+    al.'s parallel algorithm, and a histogram of each component.
+
+    Attributes
+    ----------
+    count : int
+        Number of particles that lasted the whole run
+    lost : int
+        Number of particles that stopped early
+    edges : np.ndarray
+        ``(3, bins + 1)`` edges of the histograms of each component
+    histograms : np.ndarray
+        ``(3, bins)`` counts of the particles in each bin
+    outside : np.ndarray
+        Number of particles beyond the edges, for each component
+    orbits : np.ndarray | None
+        ``(K, T, 3)`` positions of a few of the particles, if kept by
+        `compute_ensemble`
+
+    """
+
+    def __init__(self, bins=50, histogram_range=None):
+        self.bins = bins
+        self.histogram_range = histogram_range
+        self.count = 0
+        self.lost = 0
+        self.mean = np.zeros(3)
+        # Sum of the outer products of the deviations from the mean
+        self._deviations = np.zeros((3, 3))
+        self.edges = None
+        self.histograms = np.zeros((3, bins), dtype=int)
+        self.outside = np.zeros(3, dtype=int)
+        self.orbits = None
+
+    @property
+    def total(self):
+        return self.count + self.lost
+
+    @property
+    def loss_fraction(self):
+        return self.lost / self.total if self.total else 0.0
+
+    @property
+    def covariance(self):
+        if self.count < 2:
+            return np.full((3, 3), np.nan)
+        return self._deviations / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(np.diag(self.covariance))
+
+    def add(self, velocities, lost=0):
+        """Add the ``(k, 3)`` average velocities of the particles in a
+        chunk that lasted the run, and the number ``lost`` that didn't"""
+        velocities = np.asarray(velocities, dtype=float).reshape(-1, 3)
+        self.lost += lost
+        count = len(velocities)
+        if not count:
+            return
+
+        if self.edges is None:
+            self.edges = self._histogram_edges(velocities)
+        for component in range(3):
+            values = velocities[:, component]
+            low, high = self.edges[component, [0, -1]]
+            self.histograms[component] += np.histogram(values, self.edges[component])[0]
+            self.outside[component] += np.count_nonzero(
+                (values < low) | (values > high)
+            )
+
+        mean = velocities.mean(axis=0)
+        deviations = velocities - mean
+        delta = mean - self.mean
+        total = self.count + count
+        self._deviations += deviations.T @ deviations + np.outer(delta, delta) * (
+            self.count * count / total
+        )
+        self.mean = self.mean + delta * (count / total)
+        self.count = total
+
+    def _histogram_edges(self, velocities):
+        if self.histogram_range is not None:
+            low, high = np.broadcast_arrays(*self.histogram_range)
+        else:
+            centre = velocities.mean(axis=0)
+            spread = velocities.std(axis=0)
+            # A single particle, or no spread, still gets a bin width
+            spread = np.where(spread > 0, spread, np.maximum(np.abs(centre), 1.0))
+            low = centre - HISTOGRAM_WIDTH * spread
+            high = centre + HISTOGRAM_WIDTH * spread
+        return np.linspace(low, high, self.bins + 1, axis=1)
+
+    def summary(self):
+        """Description of the drift, its spread and the losses"""
+        mean = ", ".join(f"{value:.4g}" for value in self.mean)
+        std = ", ".join(f"{value:.3g}" for value in self.std)
+        return (
+            f"{self.total:,} particles, {100 * self.loss_fraction:.3g}% lost\n"
+            f"Mean velocity ({mean})\n"
+            f"Spread ({std})"
+        )
+
+
+def _chunk_size(num_samples):
+    """Particles per chunk whose positions fit in `ENSEMBLE_CHUNK_BYTES`,
+    allowing for the solvers' temporary copies"""
+    per_particle = 4 * num_samples * 3 * np.dtype(float).itemsize
+    return int(np.clip(ENSEMBLE_CHUNK_BYTES // per_particle, 1, MAX_CHUNK_SIZE))
+
+
+def compute_ensemble(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    num_particles=1000,
+    thermal_speed=0.1,
+    num_periods=10,
+    points_per_period=100,
+    method="auto",
+    rtol=None,
+    atol=None,
+    steps_per_period=20,
+    stop=None,
+    num_orbits=5,
+    chunk_size=None,
+    bins=50,
+    seed=None,
+    progress=None,
+    stats=None,
+):
+    """Push an ensemble of particles starting at the position of
+    ``initial_conditions``, with velocities drawn from a `maxwellian`
+    around its velocity, and gather their `EnsembleStatistics`.
+
+    The particles are pushed in chunks with `compute_motion_batch`, each
+    only sampled once per gyroperiod and dropped once its statistics
+    are added, so the memory used doesn't grow with
+    ``num_particles``. The first ``num_orbits`` particles are also
+    computed at ``points_per_period``, and kept as the statistics'
+    `orbits`.
+
+    Parameters
+    ----------
+    initial_conditions, t0, charge, mass, B, F
+        As for `compute_motion`, the velocity being the mean of the
+        distribution
+    num_particles : int
+        Size of the ensemble
+    thermal_speed : float
+        Spread of each velocity component, see `maxwellian`
+    num_periods, points_per_period, method, rtol, atol, steps_per_period
+        As for `compute_motion_batch`
+    stop : StopCondition | callable | sequence, optional
+        Particles that meet it are counted as lost, see `compute_motion`
+    num_orbits : int
+        Number of orbits to keep
+    chunk_size : int, optional
+        Particles pushed at once, by default as many as fit in
+        `ENSEMBLE_CHUNK_BYTES`
+    bins : int
+        Number of bins in the histograms
+    seed : int, optional
+        Seed of the random velocities, for a repeatable ensemble
+    progress : callable, optional
+        Called with the fraction of the particles pushed, and may raise
+        to abort the run
+    stats : dict, optional
+        Filled in with the number of ``particles``
+
+    Returns
+    -------
+    EnsembleStatistics
+
+    """
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    rng = np.random.default_rng(seed)
+    statistics = EnsembleStatistics(bins)
+    if stats is not None:
+        stats["particles"] = num_particles
+
+    # Enough samples for the displacement over the run
+    periods = int(num_periods / mass)
+    sample_rate = 1 if periods >= 2 else 2
+    if chunk_size is None:
+        chunk_size = _chunk_size(periods * sample_rate)
+
+    settings = dict(
+        method=method, rtol=rtol, atol=atol, steps_per_period=steps_per_period
+    )
+    shifted_B = from_time(B, t0)
+    pushed = 0
+    while pushed < num_particles:
+        size = min(chunk_size, num_particles - pushed)
+        chunk = np.empty((size, 6))
+        chunk[:, :3] = initial_conditions[:3]
+        chunk[:, 3:] = maxwellian(size, initial_conditions[3:], thermal_speed, rng)
+
+        def chunk_progress(fraction):
+            if progress is not None:
+                progress((pushed + fraction * size) / num_particles)
+
+        positions = compute_motion_batch(
+            chunk,
+            t0,
+            charge,
+            mass,
+            B,
+            F,
+            num_periods=num_periods,
+            points_per_period=sample_rate,
+            progress=chunk_progress,
+            stop=stop,
+            **settings,
+        )
+
+        # Stopped particles end in NaN, and the run is cut short if
+        # they all stopped
+        final = positions[:, -1]
+        lasted = ~np.isnan(final).any(axis=1)
+        if positions.shape[1] < periods * sample_rate:
+            lasted[:] = False
+        _, t1 = batch_run_lengths(chunk, charge, mass, shifted_B, num_periods)
+        t1 = np.broadcast_to(t1, (size,))
+        statistics.add(
+            (final[lasted] - chunk[lasted, :3]) / t1[lasted, np.newaxis],
+            lost=size - np.count_nonzero(lasted),
+        )
+
+        if statistics.orbits is None and num_orbits:
+            statistics.orbits = compute_motion_batch(
+                chunk[:num_orbits],
+                t0,
+                charge,
+                mass,
+                B,
+                F,
+                num_periods=num_periods,
+                points_per_period=points_per_period,
+                stop=stop,
+                **settings,
+            )
+
+        pushed += size
+        if progress is not None:
+            progress(pushed / num_particles)
+
+    return statistics
@@ -0,0 +1,164 @@
+import ast
+import functools
+
+import numpy as np
+
+# Names an expression can use besides the coordinates
+NAMESPACE = {
+    "pi": np.pi,
+    "e": np.e,
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "arcsin": np.arcsin,
+    "arccos": np.arccos,
+    "arctan": np.arctan,
+    "arctan2": np.arctan2,
+    "sinh": np.sinh,
+    "cosh": np.cosh,
+    "tanh": np.tanh,
+    "hypot": np.hypot,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "where": np.where,
+}
+VARIABLES = ("x", "y", "z", "t")
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.Tuple,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+)
+
+
+def _parse(text):
+    """Check ``text`` is three comma separated arithmetic expressions of
+    `VARIABLES` and `NAMESPACE`, returning their syntax trees"""
+    try:
+        # "^" is the more familiar way to write a power
+        tree = ast.parse(text.replace("^", "**"), mode="eval")
+    except SyntaxError as error:
+        raise ValueError(f"Invalid expression '{text}': {error.msg}") from None
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"'{ast.unparse(node)}' is not allowed in expressions")
+        if isinstance(node, ast.Name) and node.id not in (*VARIABLES, *NAMESPACE):
+            raise ValueError(f"Unknown name '{node.id}' in expression '{text}'")
+        if isinstance(node, ast.Call) and (
+            not isinstance(node.func, ast.Name) or node.func.id not in NAMESPACE
+        ):
+            raise ValueError(f"'{ast.unparse(node.func)}' can't be called")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            raise ValueError(
+                f"Only numbers are allowed in expressions, not {node.value!r}"
+            )
+
+    components = tree.body.elts if isinstance(tree.body, ast.Tuple) else [tree.body]
+    if len(components) != 3:
+        raise ValueError(
+            f"Expected three components separated by commas (got {len(components)})"
+        )
+    return components
+
+
+@functools.lru_cache(maxsize=64)
+def compile_expression(text):
+    """Compile the vector expression ``text`` into a function of
+    ``(x, y, z, t)``, which returns a tuple of the three components.
+
+    The expression is parsed only once, into an ordinary Python
+    function whose operations act on whole arrays, so evaluating it
+    costs the same as the equivalent NumPy code. Compiled functions
+    are cached on the text.
+
+    Returns
+    -------
+    function, bool
+        The function, and whether the expression depends on ``t``
+
+    """
+    components = _parse(text)
+    kernel = ast.Expression(
+        ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(name) for name in VARIABLES],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=ast.Tuple(elts=components, ctx=ast.Load()),
+        )
+    )
+    ast.fix_missing_locations(kernel)
+    function = eval(
+        compile(kernel, "<expression>", "eval"), {"__builtins__": {}, **NAMESPACE}
+    )
+    time_dependent = any(
+        isinstance(node, ast.Name) and node.id == "t"
+        for component in components
+        for node in ast.walk(component)
+    )
+    return function, time_dependent
+
+
+class FieldExpression:
+    """Field given by a formula for each component.
+
+    Use it in place of a uniform field, such as ``B`` or ``F`` in
+    `compute_motion`. The formulas are written as NumPy expressions of
+    the position ``x``, ``y``, ``z`` and the time ``t``, separated by
+    commas, and can use the functions and constants in `NAMESPACE`.
+    They are compiled once, see `compile_expression`, and then
+    evaluated for a whole batch of positions at a time.
+
+    Parameters
+    ----------
+    text : str
+        The three components, such as ``"0, 0, 1 + 0.1 * x"``
+
+    Examples
+    --------
+    >>> B = FieldExpression("0, 0, 1 + 0.1 * sin(t)")
+    >>> positions = compute_motion(initial_conditions, 0.0, 1, 1, B)
+
+    """
+
+    def __init__(self, text):
+        self.text = text.strip()
+        self._function, self.time_dependent = compile_expression(self.text)
+
+    def __call__(self, position, t=0.0):
+        x, y, z = position
+        components = self._function(x, y, z, t)
+        # Components that are constant, or don't depend on every
+        # coordinate, are broadcast to the shape of the rest
+        field = np.empty((3, *np.broadcast(x, t).shape))
+        field[0], field[1], field[2] = components
+        return field
+
+    # Expressions with the same text are the same field, so runs with
+    # them compare equal, as when continuing a run
+    def __eq__(self, other):
+        return isinstance(other, FieldExpression) and self.text == other.text
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __repr__(self):
+        return f"FieldExpression({self.text!r})"
@@ -0,0 +1,222 @@
+import math
+
+import numpy as np
+
+# The weights work on floats as well as arrays, for `FieldMap._at_point`
+
+
+def _linear_weights(f):
+    return (1 - f, f)
+
+
+def _cubic_weights(f):
+    # Catmull-Rom, which passes through the grid values and has a
+    # continuous first derivative
+    f2 = f * f
+    f3 = f2 * f
+    return (
+        0.5 * (-f3 + 2 * f2 - f),
+        0.5 * (3 * f3 - 5 * f2 + 2),
+        0.5 * (-3 * f3 + 4 * f2 + f),
+        0.5 * (f3 - f2),
+    )
+
+
+# Distance outside the grid, in cells, still treated as inside, so
+# positions on its faces aren't lost to rounding
+EDGE_TOLERANCE = 1e-9
+
+# Weights of the grid points around a position, and the first of those
+# points relative to the cell the position is in
+_KERNELS = {
+    1: (_linear_weights, 0),
+    3: (_cubic_weights, -1),
+}
+
+
+class FieldMap:
+    """Vector field interpolated from values on a regular 3D grid.
+
+    Use it in place of a uniform field, such as ``B`` in
+    `compute_motion`, to push particles through a measured or simulated
+    field. It is called with the positions to evaluate at as ``(3,)``
+    or ``(3, N)`` arrays, and returns the field in the same shape, so a
+    whole batch of positions costs one call.
+
+    The grid values are kept as one flat array per component. Each grid
+    point's index in it comes from its cell index and fixed strides, so
+    finding the points around every position is a few vectorised
+    operations. Single positions, as the `solve_ivp` methods ask for,
+    skip the vectorisation, which would cost more than it saves.
+
+    Trilinear interpolation uses the 8 points of each cell. Tricubic
+    uses the 64 around it, which also gives a continuous gradient for
+    the guiding-centre drifts. Beyond the outermost cells, the missing
+    points are replaced by the nearest ones on the edge.
+
+    Parameters
+    ----------
+    x, y, z : array_like
+        Evenly spaced, increasing coordinates of the grid along each axis
+    values : array_like
+        ``(len(x), len(y), len(z), 3)`` array of the field at each grid
+        point
+    order : int
+        1 for trilinear or 3 for tricubic interpolation
+    fill_value : array_like | None
+        Field outside the grid. If None, evaluating outside the grid
+        raises a `ValueError`, which stops the run
+
+    Examples
+    --------
+    >>> field = FieldMap.load("coil.npz")
+    >>> positions = compute_motion(initial_conditions, 0.0, 1, 1, field)
+
+    """
+
+    def __init__(self, x, y, z, values, order=1, fill_value=None):
+        if order not in _KERNELS:
+            raise ValueError(f"`order` must be 1 or 3 (got {order})")
+
+        axes = [np.asarray(axis, dtype=float) for axis in (x, y, z)]
+        values = np.asarray(values, dtype=float)
+        shape = tuple(len(axis) for axis in axes)
+        if values.shape != (*shape, 3):
+            raise ValueError(
+                f"`values` must have shape {(*shape, 3)} to match the axes (got {values.shape})"
+            )
+
+        for name, axis in zip("xyz", axes):
+            if len(axis) < 2:
+                raise ValueError(f"Need at least 2 grid points along {name}")
+            steps = np.diff(axis)
+            if np.any(steps <= 0) or not np.allclose(steps, steps[0], rtol=1e-6):
+                raise ValueError(f"The {name} grid points must be evenly spaced")
+
+        self.axes = axes
+        self.values = values
+        self.order = order
+        self.fill_value = (
+            None if fill_value is None else np.asarray(fill_value, dtype=float)
+        )
+
+        self._origin = np.array([axis[0] for axis in axes])[:, np.newaxis]
+        self._inverse_spacing = np.array(
+            [(len(axis) - 1) / (axis[-1] - axis[0]) for axis in axes]
+        )[:, np.newaxis]
+        self._shape = np.array(shape)[:, np.newaxis]
+        self._strides = np.array([shape[1] * shape[2], shape[2], 1])
+        # One contiguous array per component, indexed by flat grid point
+        self._components = np.ascontiguousarray(values.reshape(-1, 3).T)
+        self._weights, self._first_tap = _KERNELS[order]
+        self._taps = np.arange(order + 1) + self._first_tap
+        self._tap_list = self._taps.tolist()
+        self._grid = list(
+            zip(
+                self._origin[:, 0].tolist(),
+                self._inverse_spacing[:, 0].tolist(),
+                shape,
+                self._strides.tolist(),
+            )
+        )
+        self._flat_values = np.ascontiguousarray(values).reshape(-1, 3)
+
+    @classmethod
+    def from_function(cls, function, lower, upper, shape, **kwargs):
+        """Sample ``function`` on a grid of ``shape`` points from
+        ``lower`` to ``upper``. It is called once with the ``(3, N)``
+        grid positions, like `FieldMap` itself"""
+        axes = [np.linspace(*bounds) for bounds in zip(lower, upper, shape)]
+        grid = np.stack(np.meshgrid(*axes, indexing="ij"))
+        values = np.asarray(function(grid.reshape(3, -1)), dtype=float)
+        return cls(*axes, values.T.reshape(*shape, 3), **kwargs)
+
+    @classmethod
+    def load(cls, path, field="B", **kwargs):
+        """Read a field map from a ``.npz`` file with the arrays ``x``,
+        ``y`` and ``z``, and the values of ``field`` on the grid"""
+        with np.load(path) as data:
+            return cls(data["x"], data["y"], data["z"], data[field], **kwargs)
+
+    def save(self, path, field="B"):
+        """Write the field map to a ``.npz`` file, see `load`"""
+        x, y, z = self.axes
+        np.savez(path, x=x, y=y, z=z, **{field: self.values})
+
+    def __call__(self, position):
+        position = np.asarray(position, dtype=float)
+        points = position.reshape(3, -1)
+        if points.shape[1] == 1:
+            return self._at_point(*points[:, 0].tolist()).reshape(position.shape)
+
+        # Position in units of grid cells, and the cell it is in
+        scaled = (points - self._origin) * self._inverse_spacing
+        outside = np.any(
+            (scaled < -EDGE_TOLERANCE) | (scaled > self._shape - 1 + EDGE_TOLERANCE),
+            axis=0,
+        )
+        if np.any(outside) and self.fill_value is None:
+            index = np.flatnonzero(outside)[0]
+            raise ValueError(f"Position {points[:, index]} is outside the field map")
+        cell = np.clip(np.floor(scaled), 0, self._shape - 2).astype(np.intp)
+        weights = np.stack(self._weights(scaled - cell))
+
+        # Grid points around each position along each axis, as flat
+        # offsets, clamped to the edges for the tricubic stencil
+        taps = np.clip(
+            cell[:, :, np.newaxis] + self._taps, 0, self._shape[:, :, np.newaxis] - 1
+        )
+        offsets = taps * self._strides[:, np.newaxis, np.newaxis]
+        index = (
+            offsets[0, :, :, np.newaxis, np.newaxis]
+            + offsets[1, :, np.newaxis, :, np.newaxis]
+            + offsets[2, :, np.newaxis, np.newaxis, :]
+        )
+        weight = (
+            weights[:, 0].T[:, :, np.newaxis, np.newaxis]
+            * weights[:, 1].T[:, np.newaxis, :, np.newaxis]
+            * weights[:, 2].T[:, np.newaxis, np.newaxis, :]
+        )
+
+        num_points = points.shape[1]
+        field = np.einsum(
+            "cnk,nk->cn",
+            self._components[:, index.reshape(num_points, -1)],
+            weight.reshape(num_points, -1),
+        )
+        if np.any(outside):
+            field[:, outside] = self.fill_value.reshape(-1, 1)
+        return field.reshape(position.shape)
+
+    def _at_point(self, *position):
+        """`__call__` for a single position, in plain Python"""
+        axis_weights = []
+        axis_offsets = []
+        for coordinate, (origin, inverse_spacing, size, stride) in zip(
+            position, self._grid
+        ):
+            scaled = (coordinate - origin) * inverse_spacing
+            if not -EDGE_TOLERANCE <= scaled <= size - 1 + EDGE_TOLERANCE:
+                if self.fill_value is None:
+                    raise ValueError(
+                        f"Position {np.array(position)} is outside the field map"
+                    )
+                return np.broadcast_to(self.fill_value, (3,)).copy()
+            cell = min(max(math.floor(scaled), 0), size - 2)
+            axis_weights.append(self._weights(scaled - cell))
+            axis_offsets.append(
+                [min(max(cell + tap, 0), size - 1) * stride for tap in self._tap_list]
+            )
+
+        weights = []
+        index = []
+        x_weights, y_weights, z_weights = axis_weights
+        x_offsets, y_offsets, z_offsets = axis_offsets
+        for x_weight, x_offset in zip(x_weights, x_offsets):
+            for y_weight, y_offset in zip(y_weights, y_offsets):
+                xy_weight = x_weight * y_weight
+                xy_offset = x_offset + y_offset
+                for z_weight, z_offset in zip(z_weights, z_offsets):
+                    weights.append(xy_weight * z_weight)
+                    index.append(xy_offset + z_offset)
+        return np.array(weights) @ self._flat_values[index]
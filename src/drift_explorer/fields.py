@@ -0,0 +1,144 @@
+import numpy as np
+
+# Relative step, and the ``(3, 6, 1)`` directions, of the central
+# differences in `field_gradient`
+_GRADIENT_STEP = np.cbrt(np.finfo(float).eps)
+_GRADIENT_OFFSETS = np.concatenate((np.eye(3), -np.eye(3))).T[:, :, np.newaxis]
+
+
+def norm(A):
+    Ax, Ay, Az = A
+    return np.sqrt(Ax**2 + Ay**2 + Az**2)
+
+
+def cross(a, b):
+    """Cross product over the last axis. For the small arrays in the
+    pushers this is much cheaper than `np.cross`"""
+    a0, a1, a2 = a[..., 0], a[..., 1], a[..., 2]
+    b0, b1, b2 = b[..., 0], b[..., 1], b[..., 2]
+    return np.stack((a1 * b2 - a2 * b1, a2 * b0 - a0 * b2, a0 * b1 - a1 * b0), axis=-1)
+
+
+def evaluate(field, position, t):
+    """Call the callable ``field`` at ``position``, and at time ``t`` if
+    it has a true ``time_dependent`` attribute, like `FieldExpression`"""
+    if getattr(field, "time_dependent", False):
+        return field(position, t)
+    return field(position)
+
+
+class TimeShifted:
+    """Time dependent ``field`` with its clock started at ``t0``"""
+
+    time_dependent = True
+
+    def __init__(self, field, t0):
+        self.field = field
+        self.t0 = t0
+
+    def __call__(self, position, t):
+        return self.field(position, self.t0 + t)
+
+    def gradient(self, position, t):
+        return gradient_of(self.field, position, self.t0 + t)
+
+
+def from_time(field, t0):
+    """``field`` as seen by a run whose time 0 is ``t0``"""
+    if getattr(field, "time_dependent", False) and np.any(t0 != 0):
+        return TimeShifted(field, t0)
+    return field
+
+
+def field_at(field, position, t=0.0):
+    """Evaluate a constant or callable field at ``(N, 3)`` positions,
+    and time ``t``, returning an ``(N, 3)`` array"""
+    num_particles = position.shape[0]
+    if callable(field):
+        components = evaluate(field, position.T, t)
+    else:
+        components = field
+    return np.stack(
+        [np.broadcast_to(component, (num_particles,)) for component in components],
+        axis=1,
+    )
+
+
+def gradient_of(field, position, t):
+    """Gradient ``dB_i/dx_j`` of the callable ``field`` at ``(3, ...)``
+    positions, as a ``(3, 3, ...)`` array.
+
+    Fields can provide this as a ``gradient`` method, called like the
+    field itself. Otherwise it is found by `field_gradient`.
+    """
+    gradient = getattr(field, "gradient", None)
+    if gradient is None:
+        return field_gradient(field, position, t=t)
+    if getattr(field, "time_dependent", False):
+        return gradient(position, t)
+    return gradient(position)
+
+
+def field_gradient(B, position, step=None, t=0.0):
+    """Gradient of the callable field B by central differences.
+
+    Returns the ``(3, 3)`` array ``dB_i/dx_j`` at the ``(3,)`` position
+    and time ``t``, or a ``(3, 3, N)`` array for ``(3, N)`` positions.
+    B is evaluated at all six offset points around every position in
+    one call.
+    """
+    position = np.asarray(position, dtype=float)
+    points = position.reshape(3, -1)
+    if step is None:
+        step = _GRADIENT_STEP * max(1.0, np.abs(position).max())
+    shifted = points[:, np.newaxis, :] + step * _GRADIENT_OFFSETS
+    # Each particle's own time at each of its offset points
+    times = np.tile(t, 6) if np.ndim(t) else t
+    B_ = np.asarray(evaluate(B, shifted.reshape(3, -1), times)).reshape(3, 6, -1)
+    gradient = (B_[:, :3] - B_[:, 3:]) / (2 * step)
+    return gradient.reshape(3, 3, *position.shape[1:])
+
+
+def drift_terms(t, position, v_parallel, q, m, mu, B, F):
+    """Field strength and direction ``b`` at a guiding centre's
+    ``(3,)`` position, its drift across the field, and the force along
+    it, as in `guiding_centre`"""
+    B_ = field_at(B, position[np.newaxis, :], t)[0]
+    B_magnitude = norm(B_)
+    b = B_ / B_magnitude
+    F = field_at(F, position[np.newaxis, :], t)[0]
+    qB = q * B_magnitude
+
+    drift = np.cross(F, b) / qB
+    force_parallel = np.dot(F, b)
+
+    if callable(B):
+        gradient = gradient_of(B, position, t)
+        grad_B = b @ gradient
+        curvature = (gradient @ b - b * np.dot(b, gradient @ b)) / B_magnitude
+        drift += (
+            mu * np.cross(b, grad_B) + m * v_parallel**2 * np.cross(b, curvature)
+        ) / qB
+        force_parallel -= mu * np.dot(b, grad_B)
+
+    return B_magnitude, b, drift, force_parallel
+
+
+def gyration_split(initial_conditions, charge, mass, B, F):
+    """Guiding centre, parallel velocity, magnetic moment and
+    perpendicular velocity in the drifting frame of a particle, from its
+    ``(6,)`` initial conditions in the fields at time zero. Also returns
+    the signed gyrofrequency"""
+    x0, v0 = initial_conditions[:3], initial_conditions[3:]
+    B0 = field_at(B, x0[np.newaxis, :])[0]
+    F0 = field_at(F, x0[np.newaxis, :])[0]
+    B_magnitude = norm(B0)
+    b = B0 / B_magnitude
+    omega = charge * B_magnitude / mass
+
+    # Split the velocity into parallel, drift and gyration parts
+    v_parallel = np.dot(v0, b)
+    w0 = v0 - v_parallel * b - np.cross(F0, b) / (charge * B_magnitude)
+    mu = mass * np.dot(w0, w0) / (2 * B_magnitude)
+    X0 = x0 - np.cross(b, w0) / omega
+    return X0, v_parallel, mu, w0, omega
@@ -1,10 +1,25 @@
-from PyQt6.QtWidgets import QMainWindow
+from PyQt6.QtCore import QThread
+from PyQt6.QtWidgets import QFileDialog, QMainWindow, QProgressBar
+
+from pathlib import Path
+import tempfile
 
 import numpy as np
 
 from .mainwindow import Ui_MainWindow
-from .solver import compute_motion
+from .cache import TrajectoryCache
+from .dense import DenseTrajectory
+from .diagnostics import measure_drift
+from .ensemble import EnsembleStatistics, compute_ensemble
+from .expressions import FieldExpression
+from .profiling import PROFILE_FILTER, RunProfile
+from .section import Plane, compute_section
+from .solver import compute_dense_motion
+from .stepping import SOLVE_IVP_METHODS, num_samples, run_duration
+from .storage import allocate_positions, copy_positions
+from .trajectory_file import FILE_FILTER, load_trajectory, save_trajectory
 from .custom_widgets import MatplotlibWidget
+from .worker import SolverWorker
 
 
 class DriftExplorer(QMainWindow, Ui_MainWindow):
@@ -17,19 +32,55 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
         self.field_plot = None
         self.force_plot = None
 
-        self.method_box.addItems(["RK45", "RK23", "DOP853", "Radau", "BDF", "LSODA"])
+        self.worker = None
+        self.worker_thread = None
+        self.on_sim_finished = None
+        # Number of positions streamed into the animation so far
+        self.num_streamed = 0
+
+        # Where the last full-orbit run finished, and the settings it
+        # used, so that it can be extended
+        self.final_state = None
+        self.run_settings = None
+        self.pending_settings = None
+        # The last run in dense output mode, which can be resampled
+        self.trajectory = None
+        # Timings and solver statistics of the last run
+        self.profile = None
+        # Statistics of the last ensemble run
+        self.ensemble = None
+
+        # Only in memory, so the GUI never fills the disk behind the
+        # user's back
+        self.cache = TrajectoryCache()
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.statusbar.addPermanentWidget(self.progress_bar)
+
+        self.method_box.addItems(
+            ["auto", "analytic", *SOLVE_IVP_METHODS, "boris", "splitting"]
+        )
 
         self.reset()
 
         self.clear_fig_button.clicked.connect(self.plot.clear_fig)
         self.reset_button.clicked.connect(self.reset)
+        self.points_per_period_spinbox.valueChanged.connect(self.resample)
+        self.method_box.currentTextChanged.connect(self.update_method_options)
         self.run_button.clicked.connect(self.run)
         self.stop_button.clicked.connect(self.stop)
         self.end_button.clicked.connect(self.run_to_end)
+        self.extend_button.clicked.connect(self.extend)
 
         self.actionExit.triggered.connect(self.close)
         self.action_Run.triggered.connect(self.run)
         self.action_Reset.triggered.connect(self.reset)
+        self.action_Open.triggered.connect(self.open_run)
+        self.action_Save.triggered.connect(self.save_run)
+        self.action_Save_Profile.triggered.connect(self.save_profile)
+        self.action_Measure_Drift.triggered.connect(self.measure_drift)
 
         self.xy_axis_view_button.clicked.connect(self.plot.set_view_xy)
         self.xz_axis_view_button.clicked.connect(self.plot.set_view_xz)
@@ -68,16 +119,26 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
         self.b_y_spin_box.setValue(0.0)
         self.b_z_spin_box.setValue(1.0)
 
+        self.b_expression_box.clear()
+        self.f_expression_box.clear()
+
         self.method_box.setCurrentIndex(0)
         self.rtol_box.setValue(1.0e-3)
         self.atol_box.setValue(1.0e-6)
 
+        self.ensemble_particles_spinbox.setValue(10000)
+        self.thermal_speed_box.setValue(0.1)
+
         self.plot.clear_fig()
 
         self.update_axis_boxes()
 
     @property
     def magnetic_field(self):
+        """The field expression, if one is entered, or else the uniform
+        field"""
+        if text := self.b_expression_box.text().strip():
+            return FieldExpression(text)
         return [
             self.b_x_spin_box.value(),
             self.b_y_spin_box.value(),
@@ -86,13 +147,35 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
 
     @property
     def force(self):
+        """The force expression, if one is entered, or else the uniform
+        force"""
+        if text := self.f_expression_box.text().strip():
+            return FieldExpression(text)
         return [
             self.f_x_spin_box.value(),
             self.f_y_spin_box.value(),
             self.f_z_spin_box.value(),
         ]
 
-    def run_sim(self):
+    @property
+    def section_plane(self):
+        """The plane chosen for Poincaré sections"""
+        normal = np.eye(3)[self.section_normal_box.currentIndex()]
+        return Plane(self.section_offset_box.value() * normal, normal)
+
+    def check_expressions(self):
+        """Whether the field expressions are valid, reporting why not in
+        the status bar"""
+        try:
+            self.magnetic_field
+            self.force
+        except ValueError as error:
+            self.statusbar.showMessage(f"Invalid expression: {error}")
+            return False
+        return True
+
+    def sim_settings(self):
+        """Solver arguments for the current inputs, as ``(args, kwargs)``"""
         initial_conditions = [
             self.x_spin_box.value(),
             self.y_spin_box.value(),
@@ -102,13 +185,15 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
             self.v_z_spin_box.value(),
         ]
 
-        self.positions = compute_motion(
+        args = (
             initial_conditions,
             0.0,
             self.charge_spin_box.value(),
             self.mass_spin_box.value(),
             self.magnetic_field,
             self.force,
+        )
+        kwargs = dict(
             num_periods=self.num_gyroperiods_spinbox.value(),
             points_per_period=self.points_per_period_spinbox.value(),
             method=self.method_box.currentText(),
@@ -116,7 +201,261 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
             atol=self.atol_box.value(),
         )
 
-    def single_vector_as_field(self, vector):
+        if self.ensemble_group.isChecked():
+            kwargs["steps_per_period"] = self.steps_per_period_spinbox.value()
+            kwargs["num_particles"] = self.ensemble_particles_spinbox.value()
+            kwargs["thermal_speed"] = self.thermal_speed_box.value()
+        elif self.section_group.isChecked():
+            del kwargs["points_per_period"]
+            kwargs["steps_per_period"] = self.steps_per_period_spinbox.value()
+            kwargs["plane"] = self.section_plane
+        elif self.guiding_centre_box.isChecked():
+            # The drift equations always go through solve_ivp
+            if kwargs["method"] not in SOLVE_IVP_METHODS:
+                kwargs["method"] = "auto"
+            kwargs["gyrophase"] = self.gyrophase_box.isChecked()
+        else:
+            kwargs["steps_per_period"] = self.steps_per_period_spinbox.value()
+            if self.dense_output_box.isChecked():
+                # Only used to sample the result
+                del kwargs["points_per_period"]
+
+        return args, kwargs
+
+    def update_method_options(self, method):
+        """Turn off the options that ``method`` doesn't support"""
+        # Splitting has no interpolant to keep, nor to find section
+        # crossings with
+        splitting = method == "splitting"
+        for option in (self.dense_output_box, self.section_group):
+            if splitting:
+                option.setChecked(False)
+            option.setEnabled(not splitting)
+
+    def apply_settings(self, parameters, settings):
+        """Set the inputs to those of a saved run"""
+        boxes = (
+            self.x_spin_box,
+            self.y_spin_box,
+            self.z_spin_box,
+            self.v_x_spin_box,
+            self.v_y_spin_box,
+            self.v_z_spin_box,
+        )
+        for box, value in zip(boxes, parameters["initial_conditions"]):
+            box.setValue(value)
+        self.charge_spin_box.setValue(parameters["charge"])
+        self.mass_spin_box.setValue(parameters["mass"])
+        for vector, boxes, expression_box in (
+            (
+                parameters["B"],
+                (self.b_x_spin_box, self.b_y_spin_box, self.b_z_spin_box),
+                self.b_expression_box,
+            ),
+            (
+                parameters["F"],
+                (self.f_x_spin_box, self.f_y_spin_box, self.f_z_spin_box),
+                self.f_expression_box,
+            ),
+        ):
+            # Expressions are saved as their text
+            if isinstance(vector, str):
+                expression_box.setText(vector)
+                continue
+            expression_box.clear()
+            for box, value in zip(boxes, vector):
+                box.setValue(value)
+
+        self.num_gyroperiods_spinbox.setValue(settings["num_periods"])
+        self.points_per_period_spinbox.setValue(settings["points_per_period"])
+        self.method_box.setCurrentText(settings["method"])
+        self.rtol_box.setValue(settings["rtol"])
+        self.atol_box.setValue(settings["atol"])
+        if "steps_per_period" in settings:
+            self.steps_per_period_spinbox.setValue(settings["steps_per_period"])
+        self.guiding_centre_box.setChecked(settings.get("guiding_centre", False))
+        self.gyrophase_box.setChecked(settings.get("gyrophase", False))
+        # Only the sampled positions are saved
+        self.dense_output_box.setChecked(False)
+
+    def saved_run_settings(self, parameters, settings):
+        """The arguments a saved run was computed with, as given by
+        `sim_settings`"""
+        B, F = (
+            FieldExpression(value) if isinstance(value, str) else value
+            for value in (parameters["B"], parameters["F"])
+        )
+        args = (
+            list(parameters["initial_conditions"]),
+            parameters["t0"],
+            parameters["charge"],
+            parameters["mass"],
+            B,
+            F,
+        )
+        kwargs = dict(settings)
+        kwargs.pop("guiding_centre", None)
+        return args, kwargs
+
+    def position_buffer(self, length, origin):
+        """Buffer for a full-orbit run of ``length`` positions starting
+        at ``origin``, stored compactly if chosen"""
+        if not self.compact_storage_box.isChecked():
+            return np.empty((length, 3))
+        # The file is unnamed, so it is removed once the buffer is freed
+        with tempfile.TemporaryFile(prefix="drift_explorer-") as file:
+            return allocate_positions(length, np.float32, origin=origin, file=file)
+
+    def run_sim(self, on_finished, stream=False, settings=None, out=None, start=0):
+        """Compute the trajectory on a worker thread, then call
+        ``on_finished`` once `positions` is set. If ``stream`` is True,
+        the trajectory is also fed to the running animation as it is
+        computed. ``settings`` overrides `sim_settings`.
+
+        Full-orbit runs are written into ``out`` from index ``start``,
+        or a new `position_buffer`, which becomes `positions`"""
+        self.cancel_sim()
+
+        args, kwargs = self.sim_settings() if settings is None else settings
+        profile = RunProfile(capture=self.action_Capture_Profile.isChecked())
+
+        if "num_particles" in kwargs:
+            self.worker = SolverWorker(
+                compute_ensemble, *args, profile=profile, **kwargs
+            )
+        elif "plane" in kwargs:
+            self.worker = SolverWorker(
+                self.cache.call, compute_section, *args, profile=profile, **kwargs
+            )
+        elif self.guiding_centre_box.isChecked():
+            self.worker = SolverWorker(
+                self.cache.compute_guiding_centre, *args, profile=profile, **kwargs
+            )
+        elif self.dense_output_box.isChecked():
+            self.worker = SolverWorker(
+                compute_dense_motion, *args, profile=profile, **kwargs
+            )
+        else:
+            if out is None:
+                out = self.position_buffer(
+                    num_samples(
+                        kwargs["num_periods"], args[3], kwargs["points_per_period"]
+                    ),
+                    args[0][:3],
+                )
+            # Always stream from the solver, so the final state comes
+            # back for `extend`
+            self.worker = SolverWorker(
+                self.cache.iter_motion,
+                *args,
+                stream=True,
+                out=out,
+                start=start,
+                profile=profile,
+                **kwargs,
+            )
+            if stream:
+                self.num_streamed = start
+                self.worker.chunk.connect(self.sim_chunk)
+
+        self.pending_settings = (args, kwargs)
+        self.on_sim_finished = on_finished
+
+        self.worker_thread = QThread(self)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.sim_progress)
+        self.worker.finished.connect(self.sim_finished)
+        self.worker.failed.connect(self.sim_failed)
+        for signal in (self.worker.finished, self.worker.failed, self.worker.cancelled):
+            signal.connect(self.worker_thread.quit)
+        self.worker_thread.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.statusbar.showMessage("Computing trajectory...")
+        self.worker_thread.start()
+
+    def cancel_sim(self):
+        """Abort any trajectory still being computed"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+            self.on_sim_finished = None
+
+    def _sim_ended(self, message):
+        # Ignore signals from workers that have since been replaced
+        if self.sender() is not self.worker:
+            return False
+        self.worker = None
+        self.progress_bar.hide()
+        self.statusbar.showMessage(message)
+        return True
+
+    def sim_progress(self, percent):
+        if self.sender() is self.worker:
+            self.progress_bar.setValue(percent)
+
+    def sim_chunk(self, chunk):
+        if self.sender() is self.worker:
+            # The worker has already written the chunk into the
+            # animation's buffer
+            self.num_streamed += len(chunk)
+            self.plot.fill_animation([self.num_streamed])
+
+    def sim_finished(self, positions):
+        final_state = self.sender().result
+        profile = self.sender().profile
+        if not self._sim_ended("Done"):
+            return
+        self.run_settings = self.pending_settings
+
+        self.ensemble = None
+        if isinstance(positions, DenseTrajectory):
+            self.trajectory = positions
+            final_state = positions.final_state
+            positions = self.sample_trajectory()
+        else:
+            self.trajectory = None
+        if isinstance(positions, EnsembleStatistics):
+            # Only a few orbits are kept, and can't be extended
+            self.ensemble = positions
+            final_state = None
+            positions = self.ensemble.orbits
+
+        self.positions = positions
+        self.final_state = final_state
+        on_finished, self.on_sim_finished = self.on_sim_finished, None
+
+        # Time the plotting too, but not anything drawn after
+        self.plot.profile = profile
+        try:
+            on_finished()
+        finally:
+            self.plot.profile = None
+        profile.memory["positions"] = positions.nbytes
+        self.profile = profile
+        self.statusbar.showMessage(profile.summary())
+
+    def sim_failed(self, message):
+        self._sim_ended(f"Computation failed: {message}")
+
+    def closeEvent(self, event):
+        self.cancel_sim()
+        # Its timer would otherwise go on drawing on the closed canvas
+        if self.plot.animation is not None:
+            self.plot.animation.pause()
+        # The workers' own requests to quit are queued on this thread,
+        # so can't be handled while we block here
+        for thread in self.findChildren(QThread):
+            thread.quit()
+            thread.wait()
+        super().closeEvent(event)
+
+    def field_on_grid(self, field):
+        """Arrows of ``field`` at the start of the run, on a grid
+        spanning the axes"""
         x_min, x_max, y_min, y_max, z_min, z_max = self.plot.get_axis()
 
         x = np.linspace(x_min, x_max, 5)
@@ -124,40 +463,309 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
         z = np.linspace(z_min, z_max, 5)
 
         X, Y, Z = np.meshgrid(x, y, z, indexing="ij")
-        U = np.ones_like(X) * vector[0]
-        V = np.ones_like(Y) * vector[1]
-        W = np.ones_like(Z) * vector[2]
+        if callable(field):
+            U, V, W = field(np.stack((X, Y, Z)).reshape(3, -1)).reshape(3, *X.shape)
+        else:
+            U = np.ones_like(X) * field[0]
+            V = np.ones_like(Y) * field[1]
+            W = np.ones_like(Z) * field[2]
 
         return (X, Y, Z, U, V, W)
 
     def run(self):
-        self.run_sim()
+        if not self.check_expressions():
+            return
+        if self.ensemble_group.isChecked():
+            self.run_sim(self.plot_ensemble)
+            return
+        if self.section_group.isChecked():
+            self.run_sim(self.plot_section)
+            return
+        if self.guiding_centre_box.isChecked() or self.dense_output_box.isChecked():
+            self.run_sim(self.animate_positions)
+            return
+
+        # Start animating straight away, and add to it as the
+        # trajectory comes in
+        expected_length = num_samples(
+            self.num_gyroperiods_spinbox.value(),
+            self.mass_spin_box.value(),
+            self.points_per_period_spinbox.value(),
+        )
+        settings = self.sim_settings()
+        buffer = self.position_buffer(expected_length, settings[0][0][:3])
+        self.plot.animate(
+            [np.empty((0, 3))], expected_lengths=[expected_length], buffers=[buffer]
+        )
+        self.run_sim(self.finish_animation, stream=True, settings=settings, out=buffer)
 
+    def finish_animation(self):
+        self.plot.finish_animation()
+        self.plot_field_and_force()
+        self.update_axis_boxes()
+
+    def animate_positions(self):
         self.plot.animate([self.positions])
         self.plot_field_and_force()
         self.update_axis_boxes()
 
     def stop(self):
+        if self.worker is not None:
+            self.cancel_sim()
+            self.progress_bar.hide()
+            self.statusbar.showMessage("Cancelled")
+
         if self.plot.animation is not None:
             self.plot.animation.pause()
 
     def run_to_end(self):
-        self.run_sim()
+        if not self.check_expressions():
+            return
+        if self.ensemble_group.isChecked():
+            self.run_sim(self.plot_ensemble)
+        elif self.section_group.isChecked():
+            self.run_sim(self.plot_section)
+        else:
+            self.run_sim(self.plot_positions)
+
+    def extend(self):
+        """Continue the last run up to the current number of
+        gyroperiods, only computing the added time. Falls back to a
+        fresh `run` if anything else has changed since"""
+        if not self.check_expressions():
+            return
+        args, kwargs = self.sim_settings()
+
+        if self.final_state is None or self.run_settings is None:
+            self.run()
+            return
+
+        run_args, run_kwargs = self.run_settings
+        run_periods = run_kwargs["num_periods"]
+        added_periods = kwargs["num_periods"] - run_periods
+        unchanged = (
+            args == run_args and {**kwargs, "num_periods": run_periods} == run_kwargs
+        )
+        if not unchanged or added_periods <= 0:
+            self.run()
+            return
+
+        # The extension picks up the fields' clock where the last run
+        # stopped it
+        t0, charge, mass, B = args[1:5]
+        end_time = t0 + run_duration(args[0], charge, mass, B, run_periods, t0=t0)
+        extension_args = (list(self.final_state), end_time, *args[2:])
+
+        # The solver counts gyroperiods in the field where a run starts,
+        # so convert the added periods from those of the first run
+        first_period = run_duration(args[0], charge, mass, B, 1, t0=t0)
+        period = run_duration(extension_args[0], charge, mass, B, 1, t0=end_time)
+        added_periods *= first_period / period
+
+        previous_trajectory = self.trajectory
+        out = None
+        start = 0
+        if not self.dense_output_box.isChecked():
+            # The extension starts where the last run finished, so
+            # overwrites its last position
+            start = len(self.positions) - 1
+            out = self.position_buffer(
+                start + num_samples(added_periods, mass, kwargs["points_per_period"]),
+                args[0][:3],
+            )
+            copy_positions(self.positions, out)
+
+        def append_extension():
+            self.run_settings = (args, kwargs)
+            if previous_trajectory is not None and self.trajectory is not None:
+                self.trajectory = previous_trajectory.extended(self.trajectory)
+                self.positions = self.sample_trajectory()
+            else:
+                self.trajectory = None
+            self.plot.redraw_trace(self.positions)
+            self.update_axis_boxes()
+
+        self.run_sim(
+            append_extension,
+            settings=(extension_args, {**kwargs, "num_periods": added_periods}),
+            out=out,
+            start=start,
+        )
 
+    def save_run(self):
+        """Write the last run to a trajectory file, along with the
+        settings it was computed with"""
+        if self.positions is None or self.run_settings is None:
+            self.statusbar.showMessage("No trajectory to save")
+            return
+        if "plane" in self.run_settings[1]:
+            self.statusbar.showMessage("Poincaré sections can't be saved")
+            return
+        if self.ensemble is not None:
+            self.statusbar.showMessage("Ensembles can't be saved")
+            return
+
+        path, _ = QFileDialog.getSaveFileName(self, "Save trajectory", "", FILE_FILTER)
+        if not path:
+            return
+
+        args, kwargs = self.run_settings
+        initial_conditions, t0, charge, mass, B, F = args
+        settings = dict(kwargs, guiding_centre="gyrophase" in kwargs)
+        if self.trajectory is not None:
+            # Dense output is saved as it is currently sampled
+            settings["points_per_period"] = self.points_per_period_spinbox.value()
+
+        # Runs here only keep their positions, so there are no
+        # velocities to save, but the final state is, to continue from
+        try:
+            save_trajectory(
+                path,
+                self.positions,
+                final_state=self.final_state,
+                duration=run_duration(
+                    initial_conditions, charge, mass, B, kwargs["num_periods"]
+                ),
+                parameters=dict(
+                    initial_conditions=initial_conditions,
+                    t0=t0,
+                    charge=charge,
+                    mass=mass,
+                    B=B.text if isinstance(B, FieldExpression) else B,
+                    F=F.text if isinstance(F, FieldExpression) else F,
+                ),
+                settings=settings,
+            )
+        except (OSError, TypeError) as error:
+            self.statusbar.showMessage(f"Saving failed: {error}")
+            return
+        self.statusbar.showMessage(f"Saved {path}")
+
+    def open_run(self):
+        """Replay a run from a trajectory file, restoring its settings
+        so that it can be extended"""
+        path, _ = QFileDialog.getOpenFileName(self, "Open trajectory", "", FILE_FILTER)
+        if not path:
+            return
+
+        try:
+            saved = load_trajectory(path)
+        except (OSError, ValueError, KeyError) as error:
+            self.statusbar.showMessage(f"Opening failed: {error}")
+            return
+
+        self.cancel_sim()
+        self.progress_bar.hide()
+        self.apply_settings(saved.parameters, saved.settings)
+        # Ticked modes that can't be saved, like ensembles, leave the
+        # inputs describing another run than this one
+        self.run_settings = self.saved_run_settings(saved.parameters, saved.settings)
+        self.positions = saved.positions
+        self.final_state = saved.final_state
+        self.trajectory = None
+        self.animate_positions()
+        self.statusbar.showMessage(f"Opened {path}")
+
+    def save_profile(self):
+        """Write the timings and solver statistics of the last run, or
+        its cProfile capture if one was taken"""
+        if self.profile is None:
+            self.statusbar.showMessage("No run to report on")
+            return
+
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Save profile report", "", PROFILE_FILTER
+        )
+        if not path:
+            return
+        if not Path(path).suffix:
+            path += ".prof" if "*.prof" in selected_filter else ".json"
+
+        try:
+            self.profile.save(path)
+        except (OSError, ValueError) as error:
+            self.statusbar.showMessage(f"Saving failed: {error}")
+            return
+        self.statusbar.showMessage(f"Saved {path}")
+
+    def measure_drift(self):
+        """Plot the guiding centre of the last full-orbit run, and show
+        its drift alongside the theory's"""
+        if self.positions is None or self.run_settings is None:
+            self.statusbar.showMessage("No trajectory to measure")
+            return
+        args, kwargs = self.run_settings
+        if "plane" in kwargs or "gyrophase" in kwargs or self.ensemble is not None:
+            self.statusbar.showMessage("The drift can only be measured on full orbits")
+            return
+
+        try:
+            diagnostics = measure_drift(
+                self.positions, *args, num_periods=kwargs["num_periods"]
+            )
+        except ValueError as error:
+            self.statusbar.showMessage(f"Measuring the drift failed: {error}")
+            return
+        self.plot.plot_guiding_centre(diagnostics.centres)
+        self.update_axis_boxes()
+        self.statusbar.showMessage(diagnostics.summary())
+
+    def sample_trajectory(self):
+        """Sample the dense output of the last run at the current
+        number of points per gyroperiod"""
+        args, kwargs = self.run_settings
+        return self.trajectory.sample(
+            num_samples(
+                kwargs["num_periods"],
+                args[3],
+                self.points_per_period_spinbox.value(),
+            )
+        )
+
+    def resample(self):
+        """Redraw the last run at the new number of points per
+        gyroperiod. In dense output mode this only interpolates, without
+        recomputing the trajectory"""
+        if self.trajectory is None or self.worker is not None:
+            return
+        self.positions = self.sample_trajectory()
+        self.plot.redraw_trace(self.positions)
+
+    def plot_positions(self):
         self.plot.plot_all(self.positions)
         self.plot_field_and_force()
         self.update_axis_boxes()
 
+    def plot_section(self):
+        """Plot the crossings of the last run's plane, in the plane's
+        own coordinates"""
+        plane = self.run_settings[1]["plane"]
+        # The section planes are normal to a coordinate axis, so the
+        # other two are the plane's coordinates
+        normal = int(np.argmax(np.abs(plane.normal)))
+        labels = tuple(f"{'xyz'[(normal + i) % 3]} [m]" for i in (1, 2))
+        self.plot.plot_section(plane.coordinates(self.positions), labels)
+
+    def plot_ensemble(self):
+        """Plot the orbits kept from the last ensemble, and show its
+        statistics"""
+        for orbit in self.positions:
+            # Orbits of lost particles end in NaN
+            self.plot.plot_all(orbit[~np.isnan(orbit).any(axis=1)])
+        self.plot_field_and_force()
+        self.update_axis_boxes()
+        self.ensemble_statistics_label.setText(self.ensemble.summary())
+
     def plot_field_and_force(self):
         if self.plot_field_box.isChecked():
-            self.field_plot = self.plot.plot_field(
-                *self.single_vector_as_field(self.magnetic_field)
-            )
+            with self.plot.stage("field grid"):
+                grid = self.field_on_grid(self.magnetic_field)
+            self.field_plot = self.plot.plot_field(*grid)
 
         if self.plot_force_box.isChecked():
-            self.force_plot = self.plot.plot_field(
-                *self.single_vector_as_field(self.force), colour="red"
-            )
+            with self.plot.stage("field grid"):
+                grid = self.field_on_grid(self.force)
+            self.force_plot = self.plot.plot_field(*grid, colour="red")
 
     def adjust_axis(self):
         limits = (
@@ -169,13 +777,16 @@ class DriftExplorer(QMainWindow, Ui_MainWindow):
             self.z_axis_max_box.value(),
         )
 
-        self.plot.adjust_axis(limits)
+        if self.plot.is_3d:
+            self.plot.adjust_axis(limits)
 
     def equal_axis(self):
         self.plot.adjust_axis("equal")
         self.update_axis_boxes()
 
     def update_axis_boxes(self):
+        if not self.plot.is_3d:
+            return
         x_min, x_max, y_min, y_max, z_min, z_max = self.plot.get_axis()
 
         self.x_axis_min_box.setValue(x_min)
@@ -1,6 +1,6 @@
 # Form implementation generated from reading ui file 'src/drift_explorer/mainwindow.ui'
 #
-# Created by: PyQt6 UI code generator 6.10.0
+# Created by: PyQt6 UI code generator 6.11.0
 #
 # WARNING: Any manual changes made to this file will be lost when pyuic6 is
 # run again.  Do not edit this file unless you know what you are doing.
@@ -28,7 +28,7 @@ class Ui_MainWindow(object):
         self.physics_tab = QtWidgets.QWidget()
         self.physics_tab.setObjectName("physics_tab")
         self.verticalLayoutWidget = QtWidgets.QWidget(parent=self.physics_tab)
-        self.verticalLayoutWidget.setGeometry(QtCore.QRect(10, 10, 400, 292))
+        self.verticalLayoutWidget.setGeometry(QtCore.QRect(10, 10, 400, 380))
         self.verticalLayoutWidget.setObjectName("verticalLayoutWidget")
         self.verticalLayout = QtWidgets.QVBoxLayout(self.verticalLayoutWidget)
         self.verticalLayout.setContentsMargins(0, 0, 0, 0)
@@ -154,12 +154,27 @@ class Ui_MainWindow(object):
         self.y0_label = QtWidgets.QLabel(parent=self.verticalLayoutWidget)
         self.y0_label.setObjectName("y0_label")
         self.gridLayout.addWidget(self.y0_label, 3, 3, 1, 1)
+        self.expressions_label = QtWidgets.QLabel(parent=self.verticalLayoutWidget)
+        self.expressions_label.setObjectName("expressions_label")
+        self.gridLayout.addWidget(self.expressions_label, 10, 0, 1, 6)
+        self.b_expression_box = QtWidgets.QLineEdit(parent=self.verticalLayoutWidget)
+        self.b_expression_box.setObjectName("b_expression_box")
+        self.gridLayout.addWidget(self.b_expression_box, 11, 0, 1, 5)
+        self.b_expression_label = QtWidgets.QLabel(parent=self.verticalLayoutWidget)
+        self.b_expression_label.setObjectName("b_expression_label")
+        self.gridLayout.addWidget(self.b_expression_label, 11, 5, 1, 1)
+        self.f_expression_box = QtWidgets.QLineEdit(parent=self.verticalLayoutWidget)
+        self.f_expression_box.setObjectName("f_expression_box")
+        self.gridLayout.addWidget(self.f_expression_box, 12, 0, 1, 5)
+        self.f_expression_label = QtWidgets.QLabel(parent=self.verticalLayoutWidget)
+        self.f_expression_label.setObjectName("f_expression_label")
+        self.gridLayout.addWidget(self.f_expression_label, 12, 5, 1, 1)
         self.verticalLayout.addLayout(self.gridLayout)
         self.tabWidget.addTab(self.physics_tab, "")
         self.numerics_tab = QtWidgets.QWidget()
         self.numerics_tab.setObjectName("numerics_tab")
         self.formLayoutWidget = QtWidgets.QWidget(parent=self.numerics_tab)
-        self.formLayoutWidget.setGeometry(QtCore.QRect(0, 0, 331, 221))
+        self.formLayoutWidget.setGeometry(QtCore.QRect(0, 0, 331, 291))
         self.formLayoutWidget.setObjectName("formLayoutWidget")
         self.formLayout = QtWidgets.QFormLayout(self.formLayoutWidget)
         self.formLayout.setContentsMargins(0, 0, 0, 0)
@@ -196,6 +211,29 @@ class Ui_MainWindow(object):
         self.atol_label = QtWidgets.QLabel(parent=self.formLayoutWidget)
         self.atol_label.setObjectName("atol_label")
         self.formLayout.setWidget(4, QtWidgets.QFormLayout.ItemRole.FieldRole, self.atol_label)
+        self.steps_per_period_spinbox = QtWidgets.QDoubleSpinBox(parent=self.formLayoutWidget)
+        self.steps_per_period_spinbox.setDecimals(2)
+        self.steps_per_period_spinbox.setMinimum(0.01)
+        self.steps_per_period_spinbox.setMaximum(1000000.0)
+        self.steps_per_period_spinbox.setStepType(QtWidgets.QAbstractSpinBox.StepType.AdaptiveDecimalStepType)
+        self.steps_per_period_spinbox.setProperty("value", 20.0)
+        self.steps_per_period_spinbox.setObjectName("steps_per_period_spinbox")
+        self.formLayout.setWidget(5, QtWidgets.QFormLayout.ItemRole.LabelRole, self.steps_per_period_spinbox)
+        self.steps_per_period_label = QtWidgets.QLabel(parent=self.formLayoutWidget)
+        self.steps_per_period_label.setObjectName("steps_per_period_label")
+        self.formLayout.setWidget(5, QtWidgets.QFormLayout.ItemRole.FieldRole, self.steps_per_period_label)
+        self.guiding_centre_box = QtWidgets.QCheckBox(parent=self.formLayoutWidget)
+        self.guiding_centre_box.setObjectName("guiding_centre_box")
+        self.formLayout.setWidget(6, QtWidgets.QFormLayout.ItemRole.LabelRole, self.guiding_centre_box)
+        self.gyrophase_box = QtWidgets.QCheckBox(parent=self.formLayoutWidget)
+        self.gyrophase_box.setObjectName("gyrophase_box")
+        self.formLayout.setWidget(6, QtWidgets.QFormLayout.ItemRole.FieldRole, self.gyrophase_box)
+        self.dense_output_box = QtWidgets.QCheckBox(parent=self.formLayoutWidget)
+        self.dense_output_box.setObjectName("dense_output_box")
+        self.formLayout.setWidget(7, QtWidgets.QFormLayout.ItemRole.LabelRole, self.dense_output_box)
+        self.compact_storage_box = QtWidgets.QCheckBox(parent=self.formLayoutWidget)
+        self.compact_storage_box.setObjectName("compact_storage_box")
+        self.formLayout.setWidget(7, QtWidgets.QFormLayout.ItemRole.FieldRole, self.compact_storage_box)
         self.points_per_period_spinbox = QtWidgets.QSpinBox(parent=self.formLayoutWidget)
         self.points_per_period_spinbox.setMaximum(1000000)
         self.points_per_period_spinbox.setSingleStep(10)
@@ -210,7 +248,7 @@ class Ui_MainWindow(object):
         self.plot_tab = QtWidgets.QWidget()
         self.plot_tab.setObjectName("plot_tab")
         self.widget = QtWidgets.QWidget(parent=self.plot_tab)
-        self.widget.setGeometry(QtCore.QRect(10, 0, 236, 426))
+        self.widget.setGeometry(QtCore.QRect(10, 0, 236, 620))
         self.widget.setObjectName("widget")
         self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.widget)
         self.verticalLayout_3.setContentsMargins(0, 0, 0, 0)
@@ -321,6 +359,59 @@ class Ui_MainWindow(object):
         self.horizontalLayout_3.addWidget(self.plot_force_box)
         self.horizontalLayout_7.addLayout(self.horizontalLayout_3)
         self.verticalLayout_3.addWidget(self.plot_vectors_group)
+        self.section_group = QtWidgets.QGroupBox(parent=self.widget)
+        self.section_group.setCheckable(True)
+        self.section_group.setChecked(False)
+        self.section_group.setObjectName("section_group")
+        self.horizontalLayout_8 = QtWidgets.QHBoxLayout(self.section_group)
+        self.horizontalLayout_8.setObjectName("horizontalLayout_8")
+        self.section_plane_label = QtWidgets.QLabel(parent=self.section_group)
+        self.section_plane_label.setObjectName("section_plane_label")
+        self.horizontalLayout_8.addWidget(self.section_plane_label)
+        self.section_normal_box = QtWidgets.QComboBox(parent=self.section_group)
+        self.section_normal_box.setObjectName("section_normal_box")
+        self.section_normal_box.addItem("")
+        self.section_normal_box.addItem("")
+        self.section_normal_box.addItem("")
+        self.horizontalLayout_8.addWidget(self.section_normal_box)
+        self.section_offset_box = QtWidgets.QDoubleSpinBox(parent=self.section_group)
+        self.section_offset_box.setMinimum(-1000.0)
+        self.section_offset_box.setMaximum(1000.0)
+        self.section_offset_box.setObjectName("section_offset_box")
+        self.horizontalLayout_8.addWidget(self.section_offset_box)
+        self.verticalLayout_3.addWidget(self.section_group)
+        self.ensemble_group = QtWidgets.QGroupBox(parent=self.widget)
+        self.ensemble_group.setCheckable(True)
+        self.ensemble_group.setChecked(False)
+        self.ensemble_group.setObjectName("ensemble_group")
+        self.gridLayout_4 = QtWidgets.QGridLayout(self.ensemble_group)
+        self.gridLayout_4.setObjectName("gridLayout_4")
+        self.ensemble_particles_label = QtWidgets.QLabel(parent=self.ensemble_group)
+        self.ensemble_particles_label.setObjectName("ensemble_particles_label")
+        self.gridLayout_4.addWidget(self.ensemble_particles_label, 0, 0, 1, 1)
+        self.ensemble_particles_spinbox = QtWidgets.QSpinBox(parent=self.ensemble_group)
+        self.ensemble_particles_spinbox.setMinimum(1)
+        self.ensemble_particles_spinbox.setMaximum(100000000)
+        self.ensemble_particles_spinbox.setSingleStep(1000)
+        self.ensemble_particles_spinbox.setStepType(QtWidgets.QAbstractSpinBox.StepType.AdaptiveDecimalStepType)
+        self.ensemble_particles_spinbox.setProperty("value", 10000)
+        self.ensemble_particles_spinbox.setObjectName("ensemble_particles_spinbox")
+        self.gridLayout_4.addWidget(self.ensemble_particles_spinbox, 0, 1, 1, 1)
+        self.thermal_speed_label = QtWidgets.QLabel(parent=self.ensemble_group)
+        self.thermal_speed_label.setObjectName("thermal_speed_label")
+        self.gridLayout_4.addWidget(self.thermal_speed_label, 1, 0, 1, 1)
+        self.thermal_speed_box = ScientificDoubleSpinBox(parent=self.ensemble_group)
+        self.thermal_speed_box.setDecimals(6)
+        self.thermal_speed_box.setSingleStep(0.01)
+        self.thermal_speed_box.setProperty("value", 0.1)
+        self.thermal_speed_box.setObjectName("thermal_speed_box")
+        self.gridLayout_4.addWidget(self.thermal_speed_box, 1, 1, 1, 1)
+        self.ensemble_statistics_label = QtWidgets.QLabel(parent=self.ensemble_group)
+        self.ensemble_statistics_label.setText("")
+        self.ensemble_statistics_label.setWordWrap(True)
+        self.ensemble_statistics_label.setObjectName("ensemble_statistics_label")
+        self.gridLayout_4.addWidget(self.ensemble_statistics_label, 2, 0, 1, 2)
+        self.verticalLayout_3.addWidget(self.ensemble_group)
         self.tabWidget.addTab(self.plot_tab, "")
         self.verticalLayout_2.addWidget(self.tabWidget)
         self.animation_control_layout = QtWidgets.QHBoxLayout()
@@ -348,6 +439,11 @@ class Ui_MainWindow(object):
         self.end_button.setIcon(icon)
         self.end_button.setObjectName("end_button")
         self.animation_control_layout.addWidget(self.end_button)
+        self.extend_button = QtWidgets.QPushButton(parent=self.horizontalLayoutWidget)
+        icon = QtGui.QIcon.fromTheme(QtGui.QIcon.ThemeIcon.MediaSeekForward)
+        self.extend_button.setIcon(icon)
+        self.extend_button.setObjectName("extend_button")
+        self.animation_control_layout.addWidget(self.extend_button)
         self.verticalLayout_2.addLayout(self.animation_control_layout)
         self.horizontalLayout.addLayout(self.verticalLayout_2)
         self.plot_widget = QtWidgets.QWidget(parent=self.horizontalLayoutWidget)
@@ -362,6 +458,8 @@ class Ui_MainWindow(object):
         self.menubar.setObjectName("menubar")
         self.menu_File = QtWidgets.QMenu(parent=self.menubar)
         self.menu_File.setObjectName("menu_File")
+        self.menu_Tools = QtWidgets.QMenu(parent=self.menubar)
+        self.menu_Tools.setObjectName("menu_Tools")
         MainWindow.setMenuBar(self.menubar)
         self.statusbar = QtWidgets.QStatusBar(parent=MainWindow)
         self.statusbar.setObjectName("statusbar")
@@ -376,12 +474,38 @@ class Ui_MainWindow(object):
         self.action_Reset.setIcon(icon)
         self.action_Reset.setMenuRole(QtGui.QAction.MenuRole.NoRole)
         self.action_Reset.setObjectName("action_Reset")
+        self.action_Open = QtGui.QAction(parent=MainWindow)
+        icon = QtGui.QIcon.fromTheme(QtGui.QIcon.ThemeIcon.DocumentOpen)
+        self.action_Open.setIcon(icon)
+        self.action_Open.setMenuRole(QtGui.QAction.MenuRole.NoRole)
+        self.action_Open.setObjectName("action_Open")
+        self.action_Save = QtGui.QAction(parent=MainWindow)
+        icon = QtGui.QIcon.fromTheme(QtGui.QIcon.ThemeIcon.DocumentSave)
+        self.action_Save.setIcon(icon)
+        self.action_Save.setMenuRole(QtGui.QAction.MenuRole.NoRole)
+        self.action_Save.setObjectName("action_Save")
+        self.action_Capture_Profile = QtGui.QAction(parent=MainWindow)
+        self.action_Capture_Profile.setCheckable(True)
+        self.action_Capture_Profile.setMenuRole(QtGui.QAction.MenuRole.NoRole)
+        self.action_Capture_Profile.setObjectName("action_Capture_Profile")
+        self.action_Save_Profile = QtGui.QAction(parent=MainWindow)
+        self.action_Save_Profile.setMenuRole(QtGui.QAction.MenuRole.NoRole)
+        self.action_Save_Profile.setObjectName("action_Save_Profile")
+        self.action_Measure_Drift = QtGui.QAction(parent=MainWindow)
+        self.action_Measure_Drift.setMenuRole(QtGui.QAction.MenuRole.NoRole)
+        self.action_Measure_Drift.setObjectName("action_Measure_Drift")
         self.actionExit = QtGui.QAction(parent=MainWindow)
         self.actionExit.setObjectName("actionExit")
         self.menu_File.addAction(self.action_Run)
         self.menu_File.addAction(self.action_Reset)
+        self.menu_File.addAction(self.action_Open)
+        self.menu_File.addAction(self.action_Save)
         self.menu_File.addAction(self.actionExit)
+        self.menu_Tools.addAction(self.action_Capture_Profile)
+        self.menu_Tools.addAction(self.action_Save_Profile)
+        self.menu_Tools.addAction(self.action_Measure_Drift)
         self.menubar.addAction(self.menu_File.menuAction())
+        self.menubar.addAction(self.menu_Tools.menuAction())
 
         self.retranslateUi(MainWindow)
         self.tabWidget.setCurrentIndex(0)
@@ -408,12 +532,29 @@ class Ui_MainWindow(object):
         self.bz_label.setText(_translate("MainWindow", "B_z"))
         self.vx_label.setText(_translate("MainWindow", "vx"))
         self.y0_label.setText(_translate("MainWindow", "y0"))
+        self.expressions_label.setText(_translate("MainWindow", "Field Expressions"))
+        self.b_expression_box.setToolTip(_translate("MainWindow", "Components of B as functions of x, y, z and t, separated by commas, which replace the constant field when given"))
+        self.b_expression_box.setPlaceholderText(_translate("MainWindow", "Constant, or e.g. 0, 0, 1 + 0.1*x"))
+        self.b_expression_label.setText(_translate("MainWindow", "B"))
+        self.f_expression_box.setToolTip(_translate("MainWindow", "Components of the force as functions of x, y, z and t, separated by commas, which replace the constant force when given"))
+        self.f_expression_box.setPlaceholderText(_translate("MainWindow", "Constant, or e.g. 0.1*sin(t), 0, 0"))
+        self.f_expression_label.setText(_translate("MainWindow", "F"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.physics_tab), _translate("MainWindow", "&Physics"))
         self.numerics_tab.setAccessibleName(_translate("MainWindow", "&Numerics"))
         self.num_gyroperiods_label.setText(_translate("MainWindow", "Number of gyroperiods"))
         self.method_label.setText(_translate("MainWindow", "Method"))
         self.rtol_label.setText(_translate("MainWindow", "Relative tolerance"))
         self.atol_label.setText(_translate("MainWindow", "Absolute tolerance"))
+        self.steps_per_period_spinbox.setToolTip(_translate("MainWindow", "Time steps per gyroperiod for the fixed-step methods. Boris needs more than 2, splitting can take less than 1"))
+        self.steps_per_period_label.setText(_translate("MainWindow", "Steps per gyroperiod"))
+        self.guiding_centre_box.setToolTip(_translate("MainWindow", "Integrate the drift equations for the guiding centre instead of the full orbit"))
+        self.guiding_centre_box.setText(_translate("MainWindow", "&Guiding centre"))
+        self.gyrophase_box.setToolTip(_translate("MainWindow", "Add the gyration back on top of the guiding centre"))
+        self.gyrophase_box.setText(_translate("MainWindow", "Show g&yration"))
+        self.dense_output_box.setToolTip(_translate("MainWindow", "Keep the solver\'s interpolant, so the points per gyroperiod can be changed without recomputing"))
+        self.dense_output_box.setText(_translate("MainWindow", "&Dense output"))
+        self.compact_storage_box.setToolTip(_translate("MainWindow", "Store positions in single precision relative to the start, in a temporary file rather than memory, for runs too long to fit otherwise"))
+        self.compact_storage_box.setText(_translate("MainWindow", "Co&mpact storage"))
         self.points_per_gyroperiod_label.setText(_translate("MainWindow", "Points per gyroperiod"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.numerics_tab), _translate("MainWindow", "&Numerics"))
         self.projection_group.setTitle(_translate("MainWindow", "Projection"))
@@ -440,15 +581,42 @@ class Ui_MainWindow(object):
         self.plot_vectors_group.setTitle(_translate("MainWindow", "Plot vector fields"))
         self.plot_field_box.setText(_translate("MainWindow", "Plot &B field"))
         self.plot_force_box.setText(_translate("MainWindow", "Plot &force"))
+        self.section_group.setToolTip(_translate("MainWindow", "Plot only the points where the orbit crosses a plane, instead of the whole orbit, so that very long runs fit in memory"))
+        self.section_group.setTitle(_translate("MainWindow", "Poincaré section"))
+        self.section_plane_label.setText(_translate("MainWindow", "Plane"))
+        self.section_normal_box.setToolTip(_translate("MainWindow", "Coordinate that is constant on the plane"))
+        self.section_normal_box.setItemText(0, _translate("MainWindow", "x ="))
+        self.section_normal_box.setItemText(1, _translate("MainWindow", "y ="))
+        self.section_normal_box.setItemText(2, _translate("MainWindow", "z ="))
+        self.ensemble_group.setToolTip(_translate("MainWindow", "Run many particles from the initial position, with velocities spread around the initial velocity, and show the statistics of their drifts along with a few of their orbits"))
+        self.ensemble_group.setTitle(_translate("MainWindow", "Ensemble"))
+        self.ensemble_particles_label.setText(_translate("MainWindow", "Particles"))
+        self.thermal_speed_label.setText(_translate("MainWindow", "Thermal speed"))
+        self.thermal_speed_box.setToolTip(_translate("MainWindow", "Spread of each component of the velocities, sqrt(kT/m)"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.plot_tab), _translate("MainWindow", "P&lot"))
         self.clear_fig_button.setText(_translate("MainWindow", "&Clear figure"))
         self.reset_button.setText(_translate("MainWindow", "&Reset"))
         self.run_button.setText(_translate("MainWindow", "&Run"))
         self.stop_button.setText(_translate("MainWindow", "&Stop"))
         self.end_button.setText(_translate("MainWindow", "&End"))
+        self.extend_button.setToolTip(_translate("MainWindow", "Continue the last run up to the number of gyroperiods"))
+        self.extend_button.setText(_translate("MainWindow", "Ex&tend"))
         self.menu_File.setTitle(_translate("MainWindow", "&File"))
         self.action_Run.setText(_translate("MainWindow", "&Run"))
         self.action_Reset.setText(_translate("MainWindow", "R&eset"))
+        self.action_Open.setText(_translate("MainWindow", "&Open..."))
+        self.action_Open.setToolTip(_translate("MainWindow", "Replay a saved trajectory without recomputing it"))
+        self.action_Open.setShortcut(_translate("MainWindow", "Ctrl+O"))
+        self.action_Save.setText(_translate("MainWindow", "&Save..."))
+        self.action_Save.setToolTip(_translate("MainWindow", "Save the last trajectory along with its settings"))
+        self.action_Save.setShortcut(_translate("MainWindow", "Ctrl+S"))
+        self.menu_Tools.setTitle(_translate("MainWindow", "&Tools"))
+        self.action_Capture_Profile.setText(_translate("MainWindow", "Capture &Profile"))
+        self.action_Capture_Profile.setToolTip(_translate("MainWindow", "Run the solver under cProfile, to include in the profile report"))
+        self.action_Save_Profile.setText(_translate("MainWindow", "Save Profile &Report..."))
+        self.action_Save_Profile.setToolTip(_translate("MainWindow", "Save the timings and solver statistics of the last run, or its cProfile capture"))
+        self.action_Measure_Drift.setText(_translate("MainWindow", "Measure &Drift"))
+        self.action_Measure_Drift.setToolTip(_translate("MainWindow", "Average the last orbit over each gyroperiod to plot its guiding centre, and compare its drift with the theory"))
         self.actionExit.setText(_translate("MainWindow", "E&xit"))
         self.actionExit.setToolTip(_translate("MainWindow", "Exit Drift Explorer"))
         self.actionExit.setShortcut(_translate("MainWindow", "Ctrl+Q"))
@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+import cProfile
+import json
+from pathlib import Path
+import pstats
+import time
+
+# Number of functions listed in a report from a cProfile capture
+REPORT_FUNCTIONS = 30
+# Profile reports are written as JSON, or the raw capture as ``.prof``
+PROFILE_FILTER = "Profile reports (*.json);;cProfile captures (*.prof)"
+
+
+def _format_bytes(nbytes):
+    for unit in ("B", "KiB", "MiB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} GiB"
+
+
+class RunProfile:
+    """Where the time of a run went, from the solver to the plot.
+
+    Each stage, such as ``"solve"`` or ``"draw"``, is timed with
+    `stage`, and repeated stages add up. The solver fills in `solver`
+    through the ``stats`` argument of `compute_motion` and friends, and
+    the memory taken by the result is noted in `memory`. If
+    ``capture`` is True, the stages run in `capture` are also profiled
+    with `cProfile`, which slows them down.
+
+    Attributes
+    ----------
+    stages : dict[str, float]
+        Wall time in seconds of each stage
+    solver : dict
+        Steps taken and evaluation counts, see `compute_motion`
+    memory : dict[str, int]
+        Size in bytes of what the run produced, such as ``positions``
+
+    """
+
+    def __init__(self, capture=False):
+        self.stages = {}
+        self.solver = {}
+        self.memory = {}
+        self.profiler = cProfile.Profile() if capture else None
+
+    @contextmanager
+    def stage(self, name):
+        """Time the code run inside, adding it to the stage ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    @contextmanager
+    def capture(self):
+        """Profile the code run inside, if capturing"""
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    @property
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def summary(self):
+        """One line description, for the status bar"""
+        parts = []
+        for name, seconds in self.stages.items():
+            part = f"{name} {seconds:.3g} s"
+            if name == "solve":
+                part += self._solver_summary()
+            parts.append(part)
+        if self.memory:
+            parts.append(_format_bytes(sum(self.memory.values())))
+        return f"Done in {self.total_seconds:.3g} s: " + ", ".join(parts)
+
+    def _solver_summary(self):
+        if self.solver.get("cached"):
+            return " (cached)"
+        counts = [
+            f"{self.solver[key]:,} {label}"
+            for key, label in (
+                ("particles", "particles"),
+                ("steps", "steps"),
+                ("nfev", "evaluations"),
+                ("njev", "Jacobians"),
+            )
+            if self.solver.get(key)
+        ]
+        return f" ({', '.join(counts)})" if counts else ""
+
+    def functions(self, limit=REPORT_FUNCTIONS):
+        """The ``limit`` functions with the most cumulative time in the
+        cProfile capture, or None if there isn't one"""
+        if self.profiler is None:
+            return None
+        stats = pstats.Stats(self.profiler)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        functions = []
+        for function in stats.fcn_list[:limit]:
+            calls, primitive_calls, total, cumulative, _ = stats.stats[function]
+            filename, line, name = function
+            functions.append(
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "total_seconds": total,
+                    "cumulative_seconds": cumulative,
+                }
+            )
+        return functions
+
+    def to_dict(self):
+        return {
+            "total_seconds": self.total_seconds,
+            "stages": self.stages,
+            "solver": self.solver,
+            "memory_bytes": self.memory,
+            "functions": self.functions(),
+        }
+
+    def save(self, path):
+        """Write the report to ``path`` as JSON, or the cProfile
+        capture itself if it ends with ``.prof``, for tools such as
+        `pstats` or snakeviz"""
+        if Path(path).suffix == ".prof":
+            if self.profiler is None:
+                raise ValueError("The run wasn't captured with cProfile")
+            self.profiler.dump_stats(path)
+            return
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
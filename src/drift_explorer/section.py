@@ -0,0 +1,352 @@
+import numpy as np
+
+from .boris import iter_boris
+from .fields import from_time, norm
+from .solver import ANALYTIC_CHUNK_SIZE, analytic_motion, newton, newton_jacobian
+from .stepping import (
+    iter_steps,
+    ode_solver,
+    resolve_method,
+    run_length,
+    solver_jacobian,
+)
+
+# Most false position iterations used to find a crossing, far more than
+# it takes to reach rounding error
+SECTION_ITERATIONS = 60
+# Points inside each `scipy.integrate.solve_ivp` step that are also
+# checked for crossings, so one crossed and recrossed in a step is found
+STEP_SUBDIVISIONS = 4
+
+
+class Plane:
+    """Plane through ``point`` with normal ``normal``, for
+    `compute_section`.
+
+    Points in the plane are given by their coordinates along two
+    orthonormal in-plane `axes`. For a normal along x, y or z these are
+    the other two coordinate axes, in cyclic order, so the plane
+    ``Plane([0, 0, 0], [1, 0, 0])`` has the coordinates ``(y, z)``.
+
+    Examples
+    --------
+    >>> plane = Plane([0, 0, 0], [1, 0, 0])
+    >>> plane.coordinates([[0, 2, 3]])
+    array([[2., 3.]])
+
+    """
+
+    def __init__(self, point, normal):
+        self.point = np.asarray(point, dtype=float).reshape(3)
+        normal = np.asarray(normal, dtype=float).reshape(3)
+        length = norm(normal)
+        if length == 0:
+            raise ValueError("The normal of a plane must be non-zero")
+        self.normal = normal / length
+
+        # The coordinate axis after the normal's largest component, made
+        # perpendicular to the normal
+        first = np.eye(3)[(np.argmax(np.abs(self.normal)) + 1) % 3]
+        first = first - np.dot(first, self.normal) * self.normal
+        first /= norm(first)
+        self.axes = np.stack((first, np.cross(self.normal, first)))
+
+    def distance(self, position):
+        """Signed distance of ``(..., 3)`` positions from the plane,
+        positive on the side the normal points to"""
+        return (np.asarray(position, dtype=float) - self.point) @ self.normal
+
+    def coordinates(self, position):
+        """``(..., 2)`` coordinates of ``(..., 3)`` positions, projected
+        onto the plane"""
+        return (np.asarray(position, dtype=float) - self.point) @ self.axes.T
+
+    def _parameters(self):
+        return (*self.point.tolist(), *self.normal.tolist())
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._parameters() == other._parameters()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self._parameters()))
+
+    def __repr__(self):
+        return f"Plane({self.point.tolist()}, {self.normal.tolist()})"
+
+
+def _crossed(before, after, direction):
+    """Whether the plane was crossed between the signed distances
+    ``before`` and ``after``, in the ``direction`` wanted"""
+    upward = (before < 0) & (after >= 0)
+    downward = (before > 0) & (after <= 0)
+    if direction > 0:
+        return upward
+    if direction < 0:
+        return downward
+    return upward | downward
+
+
+def _locate_crossings(distance_at, t_start, t_end, d_start, d_end):
+    """Times at which the signed distance ``distance_at(t)`` passes
+    through zero, each bracketed by ``t_start`` and ``t_end`` where it
+    was ``d_start`` and ``d_end``. All of them are found together, by
+    the Illinois variant of false position"""
+    # Which end of each bracket was kept by the last iteration
+    kept = np.zeros(len(t_start), dtype=int)
+    t = t_end
+    for _ in range(SECTION_ITERATIONS):
+        t = (t_start * d_end - t_end * d_start) / (d_end - d_start)
+        d = distance_at(t)
+        replace_end = np.sign(d) == np.sign(d_end)
+
+        # Halve the distance at an end kept twice in a row, so that it
+        # doesn't hold up convergence
+        d_start = np.where(replace_end & (kept < 0), 0.5 * d_start, d_start)
+        d_end = np.where(~replace_end & (kept > 0), 0.5 * d_end, d_end)
+
+        t_start, d_start = np.where(replace_end, (t_start, d_start), (t, d))
+        t_end, d_end = np.where(replace_end, (t, d), (t_end, d_end))
+        kept = np.where(replace_end, -1, 1)
+
+        width = np.abs(t_end - t_start)
+        if np.all((d == 0) | (width <= 4 * np.finfo(float).eps * np.abs(t))):
+            break
+    return t
+
+
+def _step_crossings(plane, direction, times, distances, position_at):
+    """Times and positions of the crossings of ``plane`` between
+    consecutive ``times``, at which the particle was the signed
+    ``distances`` from it. ``position_at(t)`` gives the ``(k, 3)``
+    positions at ``(k,)`` times, to find them exactly"""
+    crossed = np.flatnonzero(_crossed(distances[:-1], distances[1:], direction))
+    if not len(crossed):
+        return np.empty(0), np.empty((0, 3))
+    t = _locate_crossings(
+        lambda t: plane.distance(position_at(t)),
+        times[crossed],
+        times[crossed + 1],
+        distances[crossed],
+        distances[crossed + 1],
+    )
+    return t, position_at(t)
+
+
+def _analytic_crossings(
+    plane, direction, initial_conditions, t1, num_steps, charge, mass, B, F, progress
+):
+    """Crossings of the exact motion, checked for between
+    ``num_steps`` evenly spaced samples, ``ANALYTIC_CHUNK_SIZE`` at a
+    time. Yields the ``(times, positions)`` of the crossings"""
+    initial_conditions = initial_conditions.reshape(1, 6)
+
+    def position_at(t):
+        return analytic_motion(initial_conditions, t, charge, mass, B, F)[0]
+
+    for start in range(0, num_steps, ANALYTIC_CHUNK_SIZE):
+        end = min(start + ANALYTIC_CHUNK_SIZE, num_steps)
+        # Overlapping the next chunk by a sample, so no step is missed
+        times = t1 * np.arange(start, end + 1) / num_steps
+        yield _step_crossings(
+            plane, direction, times, plane.distance(position_at(times)), position_at
+        )
+        if progress is not None:
+            progress(end / num_steps)
+
+
+def _boris_crossings(
+    plane, direction, initial_conditions, t1, num_steps, charge, mass, B, F, progress
+):
+    """Crossings of the Boris pusher's path, which is a straight line
+    between each of its ``num_steps`` steps, so the crossings are
+    interpolated exactly. Yields as `_analytic_crossings`"""
+    dt = t1 / num_steps
+    blocks = iter_boris(
+        initial_conditions.reshape(1, 6),
+        np.array([dt]),
+        num_steps + 1,
+        1,
+        np.array([charge], dtype=float),
+        np.array([mass], dtype=float),
+        B,
+        F,
+        progress,
+    )
+
+    # The last position of the previous block, and the number of the
+    # step that starts the current one
+    previous = None
+    step = 0
+    for block in blocks:
+        block = block[0]
+        if previous is not None:
+            block = np.concatenate((previous[np.newaxis], block))
+            step -= 1
+        distances = plane.distance(block)
+        crossed = np.flatnonzero(_crossed(distances[:-1], distances[1:], direction))
+        fraction = distances[crossed] / (distances[crossed] - distances[crossed + 1])
+        yield (
+            (step + crossed + fraction) * dt,
+            block[crossed]
+            + fraction[:, np.newaxis] * (block[crossed + 1] - block[crossed]),
+        )
+        previous = block[-1]
+        step += len(block)
+
+
+def _solve_ivp_crossings(
+    plane,
+    direction,
+    initial_conditions,
+    t1,
+    method,
+    charge,
+    mass,
+    B,
+    F,
+    rtol,
+    atol,
+    progress,
+    stats,
+):
+    """Crossings of a `scipy.integrate.solve_ivp` method's path, found on
+    the dense output of each step as it is taken. Yields as
+    `_analytic_crossings`"""
+    solver = ode_solver(
+        newton,
+        [0, t1],
+        initial_conditions,
+        method,
+        args=(charge, mass, B, F),
+        rtol=rtol,
+        atol=atol,
+        jac=solver_jacobian(
+            method, newton_jacobian, initial_conditions, charge, mass, B, F
+        ),
+    )
+
+    for _ in iter_steps(solver, progress, stats):
+        interpolant = solver.dense_output()
+
+        def position_at(t):
+            return interpolant(t)[:3].T
+
+        times = np.linspace(solver.t_old, solver.t, STEP_SUBDIVISIONS + 2)
+        yield _step_crossings(
+            plane, direction, times, plane.distance(position_at(times)), position_at
+        )
+
+
+def compute_section(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    plane=None,
+    num_periods=10,
+    method="auto",
+    rtol=None,
+    atol=None,
+    steps_per_period=20,
+    direction=1,
+    progress=None,
+    return_times=False,
+    stats=None,
+):
+    """Poincaré section of a single particle's motion: the points where
+    it crosses ``plane``.
+
+    The run lasts as long as for `compute_motion`, but instead of
+    sampling the trajectory, only the crossings are kept, so the memory
+    used grows with the number of crossings rather than the length of
+    the run. Each crossing is found to within rounding error on the
+    path the method takes: the dense output of each
+    `scipy.integrate.solve_ivp` step, the exact solution for
+    ``"analytic"``, or the straight line between Boris steps.
+
+    The analytic solution is checked for crossings ``steps_per_period``
+    times per gyroperiod, as many times as the Boris pusher steps, and
+    the `scipy.integrate.solve_ivp` methods a few times within each
+    step. Crossing and crossing back between checks isn't seen.
+
+    Parameters
+    ----------
+    initial_conditions, t0, charge, mass, B, F
+        As for `compute_motion`
+    plane : Plane
+        Plane to cross, by default the one through the initial position
+        perpendicular to x
+    num_periods, method, rtol, atol, steps_per_period, progress, stats
+        As for `compute_motion`
+    direction : int
+        Only count crossings in the direction of the plane's normal if
+        positive, against it if negative, or both if zero
+    return_times : bool
+        Also return the times of the crossings
+
+    Returns
+    -------
+    np.ndarray
+        ``(K, 3)`` array of the crossing positions. Use
+        `Plane.coordinates` for their coordinates in the plane
+    np.ndarray
+        ``(K,)`` times of the crossings, if ``return_times`` is True
+
+    """
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    if plane is None:
+        plane = Plane(initial_conditions[:3], [1, 0, 0])
+    B, F = from_time(B, t0), from_time(F, t0)
+    num_periods, t1 = run_length(initial_conditions, charge, mass, B, num_periods)
+    method = resolve_method(method, B, F)
+    if method == "splitting":
+        raise ValueError("Sections can't be taken with the splitting method")
+
+    if method in ("analytic", "boris"):
+        if np.any(steps_per_period <= 2):
+            raise ValueError(
+                f"Sections need more than 2 steps per gyroperiod (got {steps_per_period})"
+            )
+        num_steps = max(1, int(np.ceil(num_periods * steps_per_period)))
+        if method == "boris" and stats is not None:
+            stats["steps"] = num_steps
+        crossings = (_analytic_crossings if method == "analytic" else _boris_crossings)(
+            plane,
+            direction,
+            initial_conditions,
+            t1,
+            num_steps,
+            charge,
+            mass,
+            B,
+            F,
+            progress,
+        )
+    else:
+        crossings = _solve_ivp_crossings(
+            plane,
+            direction,
+            initial_conditions,
+            t1,
+            method,
+            charge,
+            mass,
+            B,
+            F,
+            rtol,
+            atol,
+            progress,
+            stats,
+        )
+
+    times, positions = [np.empty(0)], [np.empty((0, 3))]
+    for block_times, block_positions in crossings:
+        if len(block_times):
+            times.append(block_times)
+            positions.append(block_positions)
+    positions = np.concatenate(positions)
+    if return_times:
+        return positions, t0 + np.concatenate(times)
+    return positions
@@ -1,10 +1,37 @@
 import numpy as np
-from scipy.integrate import ode, solve_ivp
 
+# SciPy is slow to import, so its modules are imported where they're
+# used, the first time a run needs them
 
-def norm(A):
-    Ax, Ay, Az = A
-    return np.sqrt(Ax**2 + Ay**2 + Az**2)
+from .boris import iter_boris
+from .dense import DenseTrajectory, UniformSpline
+from .fields import (
+    cross,
+    drift_terms,
+    evaluate,
+    field_at,
+    from_time,
+    gradient_of,
+    gyration_split,
+    norm,
+)
+from .stepping import (
+    batch_run_lengths,
+    iter_steps,
+    num_samples,
+    ode_solver,
+    resolve_method,
+    run_length,
+    solver_jacobian,
+)
+from .storage import CompactTrajectory
+
+
+# Number of samples the analytic solution evaluates at once
+ANALYTIC_CHUNK_SIZE = 100_000
+# Bisections of a step to find when a particle stopped, enough to pin
+# the time down to rounding error
+STOP_BISECTIONS = 60
 
 
 def newton(t, Y, q, m, B, F):
@@ -16,12 +43,16 @@ def newton(t, Y, q, m, B, F):
     ux, uy, uz = Y[3], Y[4], Y[5]
 
     if callable(B):
-        B_ = B([x, y, z])  # avoids evaluating B(x, y, z) three times
+        B_ = evaluate(B, [x, y, z], t)  # avoids evaluating B(x, y, z) three times
         Bx, By, Bz = B_[0], B_[1], B_[2]
     else:
         Bx, By, Bz = B
 
-    Fx, Fy, Fz = F
+    if callable(F):
+        F_ = evaluate(F, [x, y, z], t)
+        Fx, Fy, Fz = F_[0], F_[1], F_[2]
+    else:
+        Fx, Fy, Fz = F
 
     inverse_mass = 1 / m
     charge_mass_ratio = q * inverse_mass
@@ -33,6 +64,1143 @@ def newton(t, Y, q, m, B, F):
     return np.array([ux, uy, uz, ax, ay, az])
 
 
+def newton_batch(t, Y, q, m, B, F):
+    """Vectorised version of `newton` for a batch of ``N`` particles.
+
+    Y is the flattened state array of shape ``(6 * N,)``, stored as
+    six contiguous blocks ``(x, y, z, u, v, w)`` of ``N`` values each.
+    q and m are arrays of length ``N``. A callable B or F is evaluated
+    once for the whole batch, so it must accept a ``(3, N)`` array of
+    positions and return a ``(3, N)`` array. t may be an array of each
+    particle's time.
+    returns dY/dt in the same layout as Y.
+    """
+    state = Y.reshape(6, -1)
+    ux, uy, uz = state[3], state[4], state[5]
+
+    if callable(B):
+        Bx, By, Bz = evaluate(B, state[:3], t)
+    else:
+        Bx, By, Bz = B
+
+    if callable(F):
+        Fx, Fy, Fz = evaluate(F, state[:3], t)
+    else:
+        Fx, Fy, Fz = F
+
+    inverse_mass = 1 / m
+    charge_mass_ratio = q * inverse_mass
+
+    dY = np.empty_like(state)
+    dY[:3] = state[3:]
+    dY[3] = charge_mass_ratio * (uy * Bz - uz * By) + inverse_mass * Fx
+    dY[4] = charge_mass_ratio * (uz * Bx - ux * Bz) + inverse_mass * Fy
+    dY[5] = charge_mass_ratio * (ux * By - uy * Bx) + inverse_mass * Fz
+
+    return dY.ravel()
+
+
+def _cross_matrix(v):
+    """``(3, 3, ...)`` matrices ``M`` with ``M @ a == cross(v, a)`` for
+    the ``(3, ...)`` vectors ``v``"""
+    vx, vy, vz = v
+    zero = np.zeros_like(vx)
+    return np.array([[zero, -vz, vy], [vz, zero, -vx], [-vy, vx, zero]])
+
+
+def _jacobian_blocks(t, position, velocity, q, m, B, F):
+    """``(N, 6, 6)`` Jacobians of `newton` for ``N`` particles, at
+    ``(3, N)`` positions and velocities"""
+    num_particles = position.shape[1]
+    charge_mass_ratio = q / m
+    blocks = np.zeros((num_particles, 6, 6))
+    blocks[:, :3, 3:] = np.eye(3)
+
+    # a = (q / m) (u x B) + F / m
+    B_ = evaluate(B, position, t) if callable(B) else np.reshape(B, (3, 1))
+    blocks[:, 3:, 3:] = -(charge_mass_ratio * _cross_matrix(B_)).transpose(2, 0, 1)
+    if callable(B):
+        blocks[:, 3:, :3] = charge_mass_ratio[:, np.newaxis, np.newaxis] * np.einsum(
+            "ijn,jkn->nik", _cross_matrix(velocity), gradient_of(B, position, t)
+        )
+    if callable(F):
+        blocks[:, 3:, :3] += (gradient_of(F, position, t) / m).transpose(2, 0, 1)
+    return blocks
+
+
+def newton_jacobian(t, Y, q, m, B, F):
+    """Computes the ``(6, 6)`` Jacobian ``d(dY/dt)/dY`` of `newton`.
+    A callable B or F contributes its gradient, see `gradient_of`.
+    """
+    x, y, z = Y[0], Y[1], Y[2]
+    ux, uy, uz = Y[3], Y[4], Y[5]
+
+    if callable(B):
+        Bx, By, Bz = evaluate(B, [x, y, z], t)
+    else:
+        Bx, By, Bz = B
+
+    inverse_mass = 1 / m
+    charge_mass_ratio = q * inverse_mass
+
+    # Built directly rather than with `_jacobian_blocks`, which costs
+    # more than the solver's own estimate for a single particle
+    jacobian = np.zeros((6, 6))
+    jacobian[0, 3] = jacobian[1, 4] = jacobian[2, 5] = 1
+    jacobian[3:, 3:] = charge_mass_ratio * np.array(
+        [[0, Bz, -By], [-Bz, 0, Bx], [By, -Bx, 0]]
+    )
+    if callable(B):
+        velocity_cross = np.array([[0, -uz, uy], [uz, 0, -ux], [-uy, ux, 0]])
+        jacobian[3:, :3] = (
+            charge_mass_ratio * velocity_cross @ gradient_of(B, np.array([x, y, z]), t)
+        )
+    if callable(F):
+        jacobian[3:, :3] += inverse_mass * gradient_of(F, np.array([x, y, z]), t)
+    return jacobian
+
+
+def newton_batch_jacobian(t, Y, q, m, B, F):
+    """Jacobian of `newton_batch`, as a sparse ``(6N, 6N)`` matrix in the
+    same layout as Y, with a ``(6, 6)`` block for each particle"""
+    from scipy import sparse
+
+    state = Y.reshape(6, -1)
+    num_particles = state.shape[1]
+    blocks = _jacobian_blocks(t, state[:3], state[3:], q, m, B, F)
+
+    particle = np.arange(num_particles)[:, np.newaxis, np.newaxis]
+    rows = np.arange(6)[:, np.newaxis] * num_particles + particle
+    columns = np.arange(6) * num_particles + particle
+    shape = (6 * num_particles, 6 * num_particles)
+    return sparse.csr_array(
+        (
+            blocks.ravel(),
+            (
+                np.broadcast_to(rows, blocks.shape).ravel(),
+                np.broadcast_to(columns, blocks.shape).ravel(),
+            ),
+        ),
+        shape=shape,
+    )
+
+
+def _next_or_result(generator):
+    """``(True, block)`` for the next block from ``generator``, or
+    ``(False, value)`` with its return value once it is exhausted"""
+    try:
+        return True, next(generator)
+    except StopIteration as stop:
+        return False, stop.value
+
+
+def _truncated(positions, length, axis=0):
+    """The first ``length`` samples of ``positions`` along ``axis``,
+    without copying them"""
+    if length == positions.shape[axis]:
+        return positions
+    if isinstance(positions, CompactTrajectory):
+        return CompactTrajectory(positions.offsets[:length], positions.origin)
+    index = [slice(None)] * positions.ndim
+    index[axis] = slice(length)
+    return positions[tuple(index)]
+
+
+def _collect_result(blocks, out, axis=0, truncate=False):
+    """Copy consecutive ``blocks`` from a generator into ``out`` along
+    ``axis``, returning ``out`` and the generator's return value. If
+    ``truncate``, for runs that can stop early, ``out`` is cut short to
+    the blocks there were"""
+    start = 0
+    index = [slice(None)] * out.ndim
+    while True:
+        more, block = _next_or_result(blocks)
+        if not more:
+            return (_truncated(out, start, axis) if truncate else out), block
+        end = start + block.shape[axis]
+        index[axis] = slice(start, end)
+        out[tuple(index)] = block
+        start = end
+
+
+def _collect(blocks, out, axis=0, truncate=False):
+    """Copy consecutive ``blocks`` into ``out`` along ``axis``"""
+    return _collect_result(blocks, out, axis, truncate)[0]
+
+
+def _map_blocks(function, blocks, final):
+    """Generator of ``function(block)`` for each of ``blocks``,
+    returning ``final`` applied to their return value"""
+    while True:
+        more, block = _next_or_result(blocks)
+        if not more:
+            return final(block)
+        yield function(block)
+
+
+def _split_velocities(blocks, velocities):
+    """Generator of the positions in ``(k, 6)`` blocks of states,
+    copying their velocities into consecutive rows of ``velocities``,
+    and returning the return value of ``blocks``"""
+    start = 0
+    while True:
+        more, block = _next_or_result(blocks)
+        if not more:
+            return block
+        velocities[start : start + len(block)] = block[:, 3:]
+        start += len(block)
+        yield block[:, :3]
+
+
+def _rechunk(blocks, chunk_size):
+    """Regroup ``blocks`` of samples into chunks of ``chunk_size`` samples
+    (the last may be shorter), returning the return value of ``blocks``"""
+    pending = []
+    count = 0
+    while True:
+        more, block = _next_or_result(blocks)
+        if not more:
+            result = block
+            break
+        pending.append(block)
+        count += len(block)
+        while count >= chunk_size:
+            combined = np.concatenate(pending)
+            yield combined[:chunk_size]
+            pending = [combined[chunk_size:]]
+            count -= chunk_size
+    if count:
+        yield np.concatenate(pending)
+    return result
+
+
+def _stop_function(stop, t0):
+    """Combine the conditions ``stop``, one or a sequence of them, into
+    a function of the run time, ``(6, N)`` states and ``(N,)`` masses
+    giving which particles stop, or None if there are none. Conditions
+    are given the time since ``t0``, as the fields are"""
+    if stop is None:
+        return None
+    conditions = [stop] if callable(stop) else list(stop)
+    if not conditions:
+        return None
+
+    def stops(t, state, mass):
+        stopped = np.zeros(state.shape[1], dtype=bool)
+        for condition in conditions:
+            stopped |= np.broadcast_to(condition(t0 + t, state, mass), stopped.shape)
+        return stopped
+
+    return stops
+
+
+def _locate_stop(stops, state_at, t_start, t_end):
+    """Earliest time in ``(t_start, t_end]`` at which ``stops(t, state)``
+    holds, given that it doesn't at ``t_start`` but does at ``t_end``.
+    Found by bisection, with ``state_at(t)`` interpolating the states.
+    Returns the time and the state then"""
+    for _ in range(STOP_BISECTIONS):
+        middle = 0.5 * (t_start + t_end)
+        if middle in (t_start, t_end):
+            break
+        if stops(middle, state_at(middle)):
+            t_end = middle
+        else:
+            t_start = middle
+    return t_end, state_at(t_end)
+
+
+def _iter_integrate(
+    fun,
+    t_span,
+    y0,
+    t_eval,
+    method,
+    args=(),
+    rtol=None,
+    atol=None,
+    jac=None,
+    progress=None,
+    stats=None,
+    stop=None,
+):
+    """Step a `scipy.integrate.solve_ivp` method over ``t_span``,
+    sampling its dense output at ``t_eval``.
+
+    This is the same loop `solve_ivp` runs, but the samples are yielded
+    as ``(k, len(y0))`` blocks after each step that produces any, and
+    ``progress`` is called with the fraction of ``t_span`` completed
+    after every step. A progress callback may raise to abort the
+    integration. ``stats`` is filled in as for `iter_steps`.
+
+    If ``stop(t, y)`` is given, the integration ends as soon as it is
+    true, like a terminal event of `solve_ivp`: the step where it first
+    holds is bisected to find when, and only the samples up to then are
+    yielded.
+
+    Returns the final time and state.
+    """
+    solver = ode_solver(fun, t_span, y0, method, args, rtol, atol, jac)
+    next_sample = 0
+
+    if stop is not None and stop(solver.t, solver.y):
+        end = np.searchsorted(t_eval, solver.t, side="right")
+        if end:
+            yield np.tile(solver.y, (end, 1))
+        return solver.t, solver.y
+
+    for _ in iter_steps(solver, progress, stats):
+        t, y = solver.t, solver.y
+        stopped = stop is not None and stop(t, y)
+        if stopped:
+            t, y = _locate_stop(stop, solver.dense_output(), solver.t_old, t)
+
+        end = np.searchsorted(t_eval, t, side="right")
+        if end > next_sample:
+            yield solver.dense_output()(t_eval[next_sample:end]).T
+            next_sample = end
+        if stopped:
+            return t, y
+
+    return solver.t, solver.y
+
+
+def _dense_integrate(
+    fun,
+    t_span,
+    y0,
+    method,
+    args=(),
+    rtol=None,
+    atol=None,
+    jac=None,
+    progress=None,
+    stats=None,
+):
+    """Integrate like `_iter_integrate`, but keep the interpolant from
+    every step instead of sampling it. Returns the
+    `scipy.integrate.OdeSolution` and the final state"""
+    solver = ode_solver(fun, t_span, y0, method, args, rtol, atol, jac)
+    times = [solver.t]
+    interpolants = []
+
+    for _ in iter_steps(solver, progress, stats):
+        times.append(solver.t)
+        interpolants.append(solver.dense_output())
+
+    from scipy import integrate
+
+    return integrate.OdeSolution(times, interpolants), solver.y
+
+
+def _integrate(fun, t_span, y0, t_eval, method, **kwargs):
+    """`_iter_integrate`, returning the ``(len(t_eval), len(y0))``
+    array of all the samples"""
+    return _collect(
+        _iter_integrate(fun, t_span, y0, t_eval, method, **kwargs),
+        np.empty((len(t_eval), len(y0))),
+    )
+
+
+def boris(
+    initial_conditions,
+    sample_dt,
+    num_samples,
+    substeps,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    progress=None,
+    stop=None,
+    min_particles=1,
+):
+    """Fixed-step Boris (leapfrog velocity-rotation) pusher.
+
+    Pushes ``N`` particles together, taking ``substeps`` steps of
+    ``sample_dt / substeps`` between each of the ``num_samples`` stored
+    positions. Position and velocity are staggered by half a step, so
+    the initial velocity is first pushed back half a step.
+
+    Parameters
+    ----------
+    initial_conditions : np.ndarray
+        ``(N, 6)`` array of initial states
+    sample_dt : np.ndarray
+        Time between samples for each particle
+    num_samples : int
+        Number of positions to store, including the initial one
+    substeps : int
+        Number of Boris steps between samples
+    charge, mass : np.ndarray
+        Particle charges and masses
+    B : array_like or callable
+        Magnetic field vector, or a function of ``(3, N)`` positions
+    F : array_like or callable
+        Force vector, or a function of positions like B
+    progress : callable, optional
+        Called periodically with the fraction of samples completed, and
+        may raise to abort the push
+    stop : callable, optional
+        Function of the times, ``(6, N)`` states and ``(N,)`` masses of
+        the particles, returning which of them stop. They are checked
+        after every step, and dropped from the push once they stop
+    min_particles : int
+        End the push once fewer than this many particles are left
+
+    Returns
+    -------
+    np.ndarray
+        ``(N, num_samples, 3)`` array of positions. The positions of
+        particles after they stop are NaN, and the samples after the
+        last particle stops are dropped
+
+    """
+    return _collect(
+        iter_boris(
+            initial_conditions,
+            sample_dt,
+            num_samples,
+            substeps,
+            charge,
+            mass,
+            B,
+            F,
+            progress,
+            stop=stop,
+            min_particles=min_particles,
+        ),
+        np.empty((len(initial_conditions), num_samples, 3)),
+        axis=1,
+        truncate=stop is not None,
+    )
+
+
+def _frozen_field_motion(position, velocity, tau, charge_mass_ratio, B, acceleration):
+    """Exact motion of ``N`` particles in uniform fields, the same
+    solution as `analytic_motion`, but with fields that differ between
+    particles.
+
+    Starting from ``(N, 3)`` positions and velocities, gives the
+    ``(N, k, 3)`` positions and velocities after the ``(N, k)`` times
+    ``tau``, in the ``(N, 3)`` fields ``B`` and the accelerations due to
+    the force. Particles without a field, or charge, move in parabolas.
+    """
+    B_magnitude = norm(B.T)
+    free = (B_magnitude == 0) | (charge_mass_ratio == 0)
+    B_magnitude = np.where(free, 1.0, B_magnitude)
+    b = B / B_magnitude[:, np.newaxis]
+    # Signed gyrofrequency, so the sense of rotation follows the charge
+    omega = np.where(free, 1.0, charge_mass_ratio * B_magnitude)
+
+    drift = cross(acceleration, b) / omega[:, np.newaxis]
+    parallel_acceleration = np.sum(acceleration * b, axis=1)
+    v_parallel = np.sum(velocity * b, axis=1)
+    # Perpendicular velocity in the drifting frame, which rotates about b
+    w = velocity - v_parallel[:, np.newaxis] * b - drift
+    w_cross_b = cross(w, b)
+
+    omega = omega[:, np.newaxis]
+    phase = omega * tau
+    sin, cos = np.sin(phase), np.cos(phase)
+    along = v_parallel[:, np.newaxis] + parallel_acceleration[:, np.newaxis] * tau
+
+    def combine(parallel, drifting, gyration, gyration_cross_b):
+        return (
+            parallel[..., np.newaxis] * b[:, np.newaxis]
+            + drifting[..., np.newaxis] * drift[:, np.newaxis]
+            + gyration[..., np.newaxis] * w[:, np.newaxis]
+            + gyration_cross_b[..., np.newaxis] * w_cross_b[:, np.newaxis]
+        )
+
+    positions = position[:, np.newaxis] + combine(
+        0.5 * (v_parallel[:, np.newaxis] + along) * tau,
+        tau,
+        sin / omega,
+        (1 - cos) / omega,
+    )
+    velocities = combine(along, np.ones_like(tau), cos, sin)
+
+    if free.any():
+        tau = tau[free][..., np.newaxis]
+        positions[free] = (
+            position[free, np.newaxis]
+            + velocity[free, np.newaxis] * tau
+            + 0.5 * acceleration[free, np.newaxis] * tau**2
+        )
+        velocities[free] = (
+            velocity[free, np.newaxis] + acceleration[free, np.newaxis] * tau
+        )
+    return positions, velocities
+
+
+def _iter_splitting(
+    initial_conditions,
+    t1,
+    num_samples,
+    num_steps,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    progress=None,
+    block_size=1000,
+    stop=None,
+    min_particles=1,
+    with_velocity=False,
+):
+    """Generator form of `splitting`, yielding ``(N, k, 3)`` blocks of up
+    to ``block_size`` samples as the steps proceed, and returning the
+    final ``(N, 6)`` state. If ``with_velocity``, the blocks are of
+    ``(N, k, 6)`` states"""
+    charge_mass_ratio = charge / mass
+    dt = t1 / num_steps
+
+    position = np.array(initial_conditions[:, :3], dtype=float)
+    velocity = np.array(initial_conditions[:, 3:], dtype=float)
+    num_particles = len(position)
+    time = np.zeros(num_particles)
+
+    # Particles still being stepped, and the states of those that stopped
+    active = np.arange(num_particles)
+    final_state = np.array(initial_conditions, dtype=float)
+    if stop is not None:
+        keep = ~stop(time, final_state.T, mass)
+        active, position, velocity, time = (
+            active[keep],
+            position[keep],
+            velocity[keep],
+            time[keep],
+        )
+        t1, dt = t1[keep], dt[keep]
+        charge_mass_ratio, mass = charge_mass_ratio[keep], mass[keep]
+
+    uniform = not (callable(B) or callable(F))
+
+    def fields(position, time):
+        return (
+            field_at(B, position, time),
+            field_at(F, position, time) / mass[:, np.newaxis],
+        )
+
+    if uniform:
+        frozen = fields(position, time)
+
+    def state_at(row):
+        """State of the particle in ``row`` a time into the step, which
+        is exactly the motion in the step's fields"""
+
+        def state(tau):
+            positions, velocities = _frozen_field_motion(
+                position[row : row + 1],
+                velocity[row : row + 1],
+                np.array([[tau]]),
+                charge_mass_ratio[row : row + 1],
+                *(field[row : row + 1] for field in step_fields),
+            )
+            return np.concatenate((positions[0, 0], velocities[0, 0]))
+
+        return state
+
+    def stops_at(row):
+        return lambda tau, state: stop(
+            time[row : row + 1] + tau, state[:, np.newaxis], mass[row : row + 1]
+        )[0]
+
+    width = 6 if with_velocity else 3
+
+    def new_block(length):
+        # Stopped particles have no more positions
+        if stop is None:
+            return np.empty((num_particles, length, width))
+        return np.full((num_particles, length, width), np.nan)
+
+    progress_interval = max(1, num_steps // 1000)
+    block = new_block(min(block_size, num_samples))
+    block[:, 0] = initial_conditions[:, :width]
+    filled = 1
+    # Samples computed so far
+    sample = 1
+    ended = len(active) < min_particles
+
+    for step in range(num_steps):
+        if ended:
+            break
+        if uniform:
+            step_fields = frozen
+        else:
+            # The fields at the midpoint of the step, reached in the
+            # fields at its start, make the step second order
+            half_dt = 0.5 * dt[:, np.newaxis]
+            middle, _ = _frozen_field_motion(
+                position, velocity, half_dt, charge_mass_ratio, *fields(position, time)
+            )
+            step_fields = fields(middle[:, 0], time + 0.5 * dt)
+
+        # The samples taken during the step, whose times are at the
+        # fractions ``sample / (num_samples - 1)`` of each particle's run
+        last = (step + 1) * (num_samples - 1) // num_steps
+        # Fraction of the step that has been checked for stops
+        checked = 0.0
+        while True:
+            if filled == block.shape[1] and sample <= last:
+                yield block
+                block = new_block(min(block_size, num_samples - sample))
+                filled = 0
+            end = min(last + 1, sample + block.shape[1] - filled)
+            fractions = np.arange(sample, end) / (num_samples - 1) - step / num_steps
+            finished = end > last
+            if finished:
+                # Along with the end of the step, to start the next from
+                fractions = np.append(fractions, 1 / num_steps)
+            tau = np.outer(t1, fractions)
+            positions, velocities = _frozen_field_motion(
+                position, velocity, tau, charge_mass_ratio, *step_fields
+            )
+
+            if stop is not None:
+                # Check the samples, and the end of the step, for stops,
+                # bisecting the exact motion from the one before each
+                num_active, length = tau.shape
+                stopped = stop(
+                    (time[:, np.newaxis] + tau).ravel(),
+                    np.concatenate((positions, velocities), axis=2).reshape(-1, 6).T,
+                    np.repeat(mass, length),
+                ).reshape(num_active, length)
+                first = np.where(stopped.any(axis=1), stopped.argmax(axis=1), length)
+
+                # When each particle stopped, as a fractional sample index
+                # so that particles on different time scales can be compared
+                stop_index = np.full(num_active, np.inf)
+                for row in np.flatnonzero(first < length):
+                    before = (
+                        tau[row, first[row] - 1] if first[row] else checked * t1[row]
+                    )
+                    stop_tau, final_state[active[row]] = _locate_stop(
+                        stops_at(row), state_at(row), before, tau[row, first[row]]
+                    )
+                    stop_index[row] = (step / num_steps + stop_tau / t1[row]) * (
+                        num_samples - 1
+                    )
+
+                # The run ends with the stop that leaves too few particles
+                ended = num_active - np.count_nonzero(first < length) < min_particles
+                if ended:
+                    end_index = np.sort(stop_index)[max(0, num_active - min_particles)]
+                    for row in np.flatnonzero(stop_index > end_index):
+                        end_tau = t1[row] * (
+                            end_index / (num_samples - 1) - step / num_steps
+                        )
+                        final_state[active[row]] = state_at(row)(end_tau)
+                    stop_index = np.minimum(stop_index, end_index)
+
+            samples = positions[:, : end - sample]
+            if with_velocity:
+                samples = np.concatenate(
+                    (samples, velocities[:, : end - sample]), axis=2
+                )
+            if stop is not None:
+                samples[np.arange(sample, end) > stop_index[:, np.newaxis]] = np.nan
+            block[active, filled : filled + end - sample] = samples
+            filled += end - sample
+            sample = end
+
+            if ended:
+                length = int(np.floor(end_index)) - (sample - filled) + 1
+                if length > 0:
+                    yield block[:, :length]
+                return final_state
+
+            if stop is not None and np.isfinite(stop_index).any():
+                # Drop the particles that stopped
+                keep = np.isinf(stop_index)
+                active, position, velocity, time = (
+                    active[keep],
+                    position[keep],
+                    velocity[keep],
+                    time[keep],
+                )
+                t1, dt = t1[keep], dt[keep]
+                charge_mass_ratio, mass = charge_mass_ratio[keep], mass[keep]
+                step_fields = tuple(field[keep] for field in step_fields)
+                if uniform:
+                    frozen = step_fields
+                positions, velocities = positions[keep], velocities[keep]
+            checked = fractions[-1]
+            if finished:
+                break
+
+        position, velocity = positions[:, -1], velocities[:, -1]
+        time = time + dt
+
+        if progress is not None and step % progress_interval == 0:
+            progress((step + 1) / num_steps)
+
+    if filled:
+        yield block[:, :filled]
+    final_state[active] = np.concatenate((position, velocity), axis=1)
+    return final_state
+
+
+def splitting(
+    initial_conditions,
+    t1,
+    num_samples,
+    num_steps,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    progress=None,
+    stop=None,
+    min_particles=1,
+):
+    """Operator splitting integrator that solves the gyration exactly.
+
+    Each step splits the motion into the exact motion in uniform fields
+    (gyration about B, acceleration along it and the F x B drift, as in
+    `analytic_motion`) and the change of the fields along the way, which
+    is accounted for by freezing them at the midpoint of the step. This
+    is exact in uniform fields for any step, and otherwise second order,
+    and the speed is conserved in a magnetic field alone. The steps
+    needn't resolve the gyration, so can span many gyroperiods, as
+    long as the fields change little over them. Drifts that come from
+    the field changing across the gyro-orbit, such as the grad-B drift,
+    do need steps shorter than a gyroperiod.
+
+    The samples between steps are taken from the same exact motion, so
+    cost little more than the field evaluations of the steps.
+
+    Parameters
+    ----------
+    initial_conditions : np.ndarray
+        ``(N, 6)`` array of initial states
+    t1 : np.ndarray
+        Length of each particle's run
+    num_samples : int
+        Number of positions to store, evenly spaced over each run and
+        including the initial one
+    num_steps : int
+        Number of steps to take over each run
+    charge, mass : np.ndarray
+        Particle charges and masses
+    B : array_like or callable
+        Magnetic field vector, or a function of ``(3, N)`` positions
+    F : array_like or callable
+        Force vector, or a function of positions like B
+    progress : callable, optional
+        Called periodically with the fraction of steps completed, and
+        may raise to abort the run
+    stop : callable, optional
+        Function of the times, ``(6, N)`` states and ``(N,)`` masses of
+        the particles, returning which of them stop, as for `boris`.
+        They are checked at each sample and the end of each step, and
+        the exact motion of the step bisected to find when they stopped
+    min_particles : int
+        End the run once fewer than this many particles are left
+
+    Returns
+    -------
+    np.ndarray
+        ``(N, num_samples, 3)`` array of positions. The positions of
+        particles after they stop are NaN, and the samples after the
+        last particle stops are dropped
+
+    """
+    return _collect(
+        _iter_splitting(
+            initial_conditions,
+            t1,
+            num_samples,
+            num_steps,
+            charge,
+            mass,
+            B,
+            F,
+            progress,
+            stop=stop,
+            min_particles=min_particles,
+        ),
+        np.empty((len(initial_conditions), num_samples, 3)),
+        axis=1,
+        truncate=stop is not None,
+    )
+
+
+def analytic_motion(initial_conditions, t, charge, mass, B, F=[0, 0, 0]):
+    """Exact motion in a uniform magnetic field B and constant force F.
+
+    The motion is a gyration about B, uniform acceleration along B, and
+    the F x B drift across it. All of the sample times are evaluated in
+    one vectorised expression, so the cost is proportional to the
+    number of samples and independent of the run length.
+
+    Parameters
+    ----------
+    initial_conditions : array_like
+        ``(N, 6)`` array of initial states
+    t : array_like
+        Times since the initial state, either ``(T,)`` or ``(N, T)``
+    charge, mass : float or array_like
+        Particle charges and masses
+    B : array_like
+        Magnetic field vector, must be non-zero
+    F : array_like
+        Force vector
+
+    Returns
+    -------
+    np.ndarray
+        ``(N, T, 3)`` array of positions
+
+    """
+    x0, b, drift, w0, v_parallel, parallel_acceleration, omega, t = _analytic_terms(
+        initial_conditions, t, charge, mass, B, F
+    )
+
+    phase = omega * t
+    coefficients = np.stack(
+        np.broadcast_arrays(
+            v_parallel[:, np.newaxis] * t + 0.5 * parallel_acceleration * t**2,
+            t,
+            np.sin(phase) / omega,
+            (1 - np.cos(phase)) / omega,
+        ),
+        axis=-1,
+    )
+    directions = np.stack(np.broadcast_arrays(b, drift, w0, np.cross(w0, b)), axis=1)
+
+    return x0[:, np.newaxis, :] + coefficients @ directions
+
+
+def _analytic_terms(initial_conditions, t, charge, mass, B, F):
+    """Split the initial states into the parts of the exact motion used
+    by `analytic_motion` and `_analytic_velocity`"""
+    initial_conditions = np.asarray(initial_conditions, dtype=float).reshape(-1, 6)
+    x0, v0 = initial_conditions[:, :3], initial_conditions[:, 3:]
+    num_particles = len(initial_conditions)
+
+    charge = np.broadcast_to(np.asarray(charge, dtype=float), (num_particles,))
+    mass = np.broadcast_to(np.asarray(mass, dtype=float), (num_particles,))
+    t = np.atleast_2d(np.asarray(t, dtype=float))
+
+    B = np.asarray(B, dtype=float)
+    F = np.asarray(F, dtype=float)
+    B_magnitude = norm(B)
+    b = B / B_magnitude
+
+    # Signed gyrofrequency, so the sense of rotation follows the charge
+    omega = (charge * B_magnitude / mass)[:, np.newaxis]
+    parallel_acceleration = (np.dot(F, b) / mass)[:, np.newaxis]
+    drift = np.cross(F, B) / (charge * B_magnitude**2)[:, np.newaxis]
+
+    v_parallel = v0 @ b
+    # Perpendicular velocity in the drifting frame, which rotates about b
+    w0 = v0 - np.outer(v_parallel, b) - drift
+
+    return x0, b, drift, w0, v_parallel, parallel_acceleration, omega, t
+
+
+def _analytic_velocity(initial_conditions, t, charge, mass, B, F):
+    """Time derivative of `analytic_motion`, giving the ``(N, T, 3)``
+    array of velocities"""
+    _, b, drift, w0, v_parallel, parallel_acceleration, omega, t = _analytic_terms(
+        initial_conditions, t, charge, mass, B, F
+    )
+
+    phase = omega * t
+    coefficients = np.stack(
+        np.broadcast_arrays(
+            v_parallel[:, np.newaxis] + parallel_acceleration * t,
+            np.ones_like(t),
+            np.cos(phase),
+            np.sin(phase),
+        ),
+        axis=-1,
+    )
+    directions = np.stack(np.broadcast_arrays(b, drift, w0, np.cross(w0, b)), axis=1)
+
+    return coefficients @ directions
+
+
+def _iter_analytic_motion(
+    initial_conditions,
+    t,
+    charge,
+    mass,
+    B,
+    F,
+    progress=None,
+    stop=None,
+    min_particles=1,
+    with_velocity=False,
+):
+    """`analytic_motion` evaluated ``ANALYTIC_CHUNK_SIZE`` samples at a
+    time, yielding ``(N, k, 3)`` blocks, or ``(N, k, 6)`` states if
+    ``with_velocity``. This bounds the temporary memory and lets
+    ``progress`` report on (and abort) very long runs. Returns the
+    ``(N, 6)`` state at the last sample"""
+    if stop is not None:
+        return (
+            yield from _iter_analytic_stopping(
+                initial_conditions,
+                t,
+                charge,
+                mass,
+                B,
+                F,
+                progress,
+                stop,
+                min_particles,
+                with_velocity,
+            )
+        )
+
+    t = np.atleast_2d(t)
+    num_samples = t.shape[1]
+
+    for start in range(0, num_samples, ANALYTIC_CHUNK_SIZE):
+        end = start + ANALYTIC_CHUNK_SIZE
+        args = (initial_conditions, t[:, start:end], charge, mass, B, F)
+        block = analytic_motion(*args)
+        if with_velocity:
+            block = np.concatenate((block, _analytic_velocity(*args)), axis=-1)
+        yield block
+        if progress is not None:
+            progress(min(end, num_samples) / num_samples)
+
+    velocity = _analytic_velocity(initial_conditions, t[:, -1:], charge, mass, B, F)
+    return np.concatenate((block[:, -1, :3], velocity[:, -1]), axis=1)
+
+
+def _iter_analytic_stopping(
+    initial_conditions,
+    t,
+    charge,
+    mass,
+    B,
+    F,
+    progress,
+    stop,
+    min_particles,
+    with_velocity=False,
+):
+    """`_iter_analytic_motion` for particles that can stop, as in
+    `iter_boris`. Each chunk of samples is checked for stops, and the
+    exact solution bisected between the samples either side of each"""
+    initial_conditions = np.asarray(initial_conditions, dtype=float).reshape(-1, 6)
+    num_particles = len(initial_conditions)
+    charge = np.broadcast_to(np.asarray(charge, dtype=float), (num_particles,))
+    mass = np.broadcast_to(np.asarray(mass, dtype=float), (num_particles,))
+    t = np.atleast_2d(np.asarray(t, dtype=float))
+    t = np.broadcast_to(t, (num_particles, t.shape[1]))
+    num_samples = t.shape[1]
+    sample_indices = np.arange(num_samples)
+
+    def states(particles, times):
+        """``(len(particles), k, 6)`` states at ``(len(particles), k)`` times"""
+        args = (
+            initial_conditions[particles],
+            times,
+            charge[particles],
+            mass[particles],
+            B,
+            F,
+        )
+        return np.concatenate((analytic_motion(*args), _analytic_velocity(*args)), -1)
+
+    def stops_at(particle):
+        return lambda time, state: stop(
+            np.array([time]), state[:, np.newaxis], mass[particle : particle + 1]
+        )[0]
+
+    active = np.arange(num_particles)
+    final_state = initial_conditions.copy()
+
+    for start in range(0, num_samples, ANALYTIC_CHUNK_SIZE):
+        if len(active) < min_particles or not len(active):
+            break
+        times = t[active, start : start + ANALYTIC_CHUNK_SIZE]
+        chunk = states(active, times)
+        num_active, length = times.shape
+        stopped = stop(
+            times.ravel(),
+            chunk.reshape(-1, 6).T,
+            np.repeat(mass[active], length),
+        ).reshape(num_active, length)
+        first = np.where(stopped.any(axis=1), stopped.argmax(axis=1), length)
+
+        # When each particle stopped, as a fractional sample index so
+        # that particles on different time scales can be compared
+        stop_index = np.full(num_active, np.inf)
+        for row in np.flatnonzero(first < length):
+            particle, sample = active[row], start + first[row]
+            if sample == 0:
+                stop_index[row] = 0
+                continue
+            time, final_state[particle] = _locate_stop(
+                stops_at(particle),
+                lambda time: states([particle], [[time]])[0, 0],
+                t[particle, sample - 1],
+                t[particle, sample],
+            )
+            stop_index[row] = np.interp(time, t[particle], sample_indices)
+
+        # The run ends with the stop that leaves too few particles
+        num_stopped = np.count_nonzero(first < length)
+        ended = num_active - num_stopped < min_particles
+        if ended:
+            end_index = np.sort(stop_index)[max(0, num_active - min_particles)]
+            for row in np.flatnonzero(stop_index > end_index):
+                particle = active[row]
+                time = np.interp(end_index, sample_indices, t[particle])
+                final_state[particle] = states([particle], [[time]])[0, 0]
+            stop_index = np.minimum(stop_index, end_index)
+
+        samples = chunk if with_velocity else chunk[..., :3]
+        samples[start + np.arange(length) > stop_index[:, np.newaxis]] = np.nan
+        block = np.full((num_particles, length, samples.shape[2]), np.nan)
+        block[active] = samples
+        if ended:
+            block = block[:, : int(np.floor(end_index)) - start + 1]
+        if block.shape[1]:
+            yield block
+        if ended:
+            return final_state
+
+        running = np.isinf(stop_index)
+        final_state[active[running]] = chunk[running, -1]
+        active = active[running]
+        if progress is not None:
+            progress(min(start + length, num_samples) / num_samples)
+
+    return final_state
+
+
+def _boris_substeps(steps_per_period, num_periods, num_samples):
+    """Number of Boris steps between samples to give at least
+    ``steps_per_period`` steps per gyroperiod"""
+    if np.any(steps_per_period <= 2):
+        raise ValueError(
+            f"Boris pusher needs more than 2 steps per gyroperiod (got {steps_per_period})"
+        )
+    samples_per_period = (num_samples - 1) / num_periods
+    return max(1, int(np.ceil(np.max(steps_per_period / samples_per_period))))
+
+
+def _splitting_steps(steps_per_period, num_periods):
+    """Number of `splitting` steps giving ``steps_per_period`` steps per
+    gyroperiod, which may be fewer than one"""
+    if np.any(steps_per_period <= 0):
+        raise ValueError(
+            f"Splitting needs a positive number of steps per gyroperiod (got {steps_per_period})"
+        )
+    return max(1, int(np.ceil(np.max(steps_per_period * num_periods))))
+
+
+def _motion_blocks(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F,
+    num_periods,
+    points_per_period,
+    method,
+    rtol,
+    atol,
+    steps_per_period,
+    progress,
+    stats,
+    stop,
+    with_velocity=False,
+):
+    """Generator of ``(k, 3)`` blocks of positions for `compute_motion`
+    and `iter_motion`, in the order the chosen method produces them,
+    returning the final ``(6,)`` state. If ``with_velocity``, the blocks
+    are ``(k, 6)`` states instead"""
+    B, F = from_time(B, t0), from_time(F, t0)
+    total_samples = num_samples(num_periods, mass, points_per_period)
+    num_periods, t1 = run_length(initial_conditions, charge, mass, B, num_periods)
+    method = resolve_method(method, B, F)
+    stops = _stop_function(stop, t0)
+
+    if method == "analytic":
+        blocks = _iter_analytic_motion(
+            np.asarray(initial_conditions, dtype=float).reshape(1, 6),
+            np.linspace(0, t1, total_samples),
+            charge,
+            mass,
+            B,
+            F,
+            progress,
+            stops,
+            with_velocity=with_velocity,
+        )
+    elif method == "splitting":
+        num_steps = _splitting_steps(steps_per_period, num_periods)
+        if stats is not None:
+            stats["steps"] = num_steps
+        blocks = _iter_splitting(
+            np.asarray(initial_conditions, dtype=float).reshape(1, 6),
+            np.array([t1]),
+            total_samples,
+            num_steps,
+            np.array([charge], dtype=float),
+            np.array([mass], dtype=float),
+            B,
+            F,
+            progress,
+            stop=stops,
+            with_velocity=with_velocity,
+        )
+    elif method == "boris":
+        substeps = _boris_substeps(steps_per_period, num_periods, total_samples)
+        if stats is not None:
+            stats["steps"] = substeps * (total_samples - 1)
+        blocks = iter_boris(
+            np.asarray(initial_conditions, dtype=float).reshape(1, 6),
+            np.array([t1 / (total_samples - 1)]),
+            total_samples,
+            substeps,
+            np.array([charge], dtype=float),
+            np.array([mass], dtype=float),
+            B,
+            F,
+            progress,
+            stop=stops,
+            with_velocity=with_velocity,
+        )
+    else:
+        if stops is not None:
+            masses = np.array([mass], dtype=float)
+
+            def single_stops(t, y):
+                return stops(t, y[:, np.newaxis], masses)[0]
+
+        blocks = _iter_integrate(
+            newton,
+            [0, t1],
+            initial_conditions,
+            np.linspace(0, t1, total_samples),
+            method,
+            args=(charge, mass, B, F),
+            rtol=rtol,
+            atol=atol,
+            jac=solver_jacobian(
+                method, newton_jacobian, initial_conditions, charge, mass, B, F
+            ),
+            progress=progress,
+            stats=stats,
+            stop=None if stops is None else single_stops,
+        )
+        width = 6 if with_velocity else 3
+        return _map_blocks(lambda block: block[:, :width], blocks, lambda end: end[1])
+
+    return _map_blocks(lambda block: block[0], blocks, lambda state: state[0])
+
+
 def compute_motion(
     initial_conditions,
     t0,
@@ -42,39 +1210,625 @@ def compute_motion(
     F=[0, 0, 0],
     num_periods=10,
     points_per_period=100,
-    method="RK45",
+    method="auto",
     rtol=None,
     atol=None,
+    steps_per_period=20,
+    progress=None,
+    return_state=False,
+    out=None,
+    stats=None,
+    stop=None,
+    velocities=None,
 ):
-    # Particle pusher
-    x0, y0, z0 = initial_conditions[:3]
+    """Follow a single particle through the fields B and F.
 
-    if callable(B):
-        wc = np.abs(charge) * norm(B([x0, y0, z0])) / mass
-    else:
-        wc = np.abs(charge) * norm(B) / mass
+    The run lasts ``num_periods / mass`` gyroperiods, sampled at
+    ``points_per_period`` positions per period. See
+    `compute_motion_batch` for ``method``.
 
-    # number of gyroperiods. dividing by m insures electrons go as far
-    # as ions despite gyrating faster
-    num_periods = num_periods / mass
-    gyroperiod = 2 * np.pi / wc
-    t1 = num_periods * gyroperiod
+    If ``return_state`` is True, also return the final ``(6,)`` state
+    (position and velocity). Passing that back as the initial
+    conditions continues the run, so only the added time is computed.
+
+    The positions are written into ``out`` as they are computed, if it
+    is given. Use `allocate_positions` to make one that stores them
+    more compactly, or in a file. The velocity at each position is
+    likewise written into ``velocities``, a ``(T, 3)`` array, if it is
+    given.
+
+    If ``stats`` is given, it is a dict that is filled in with the
+    number of ``steps`` taken and, for the `scipy.integrate.solve_ivp`
+    methods, the evaluations of the equations of motion ``nfev``, of
+    their Jacobian ``njev``, and the LU decompositions ``nlu``.
+
+    ``stop`` ends the run early, as soon as the particle meets it. It
+    is a `StopCondition`, such as leaving a `Box`, any function called
+    like one, or a sequence of them, any of which stops the particle.
+    The `scipy.integrate.solve_ivp` methods, the analytic solution and
+    the splitting method find the moment it stops to within rounding
+    error, and the Boris pusher stops at the end of the step where it
+    is first met. Only the positions up to then are returned, and the
+    final state is the particle's when it stopped.
+
+    Returns
+    -------
+    np.ndarray | CompactTrajectory
+        ``(T, 3)`` array of positions, which is ``out`` if given, or the
+        start of it if the run stopped early
+
+    """
+    blocks = _motion_blocks(
+        initial_conditions,
+        t0,
+        charge,
+        mass,
+        B,
+        F,
+        num_periods,
+        points_per_period,
+        method,
+        rtol,
+        atol,
+        steps_per_period,
+        progress,
+        stats,
+        stop,
+        with_velocity=velocities is not None,
+    )
+    if velocities is not None:
+        blocks = _split_velocities(blocks, velocities)
+    if out is None:
+        out = np.empty((num_samples(num_periods, mass, points_per_period), 3))
+    positions, state = _collect_result(blocks, out, truncate=stop is not None)
+    if return_state:
+        return positions, state
+    return positions
+
+
+def iter_motion(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    num_periods=10,
+    points_per_period=100,
+    method="auto",
+    rtol=None,
+    atol=None,
+    steps_per_period=20,
+    progress=None,
+    chunk_size=1000,
+    stats=None,
+    stop=None,
+):
+    """Generator form of `compute_motion`.
+
+    Takes the same arguments, but yields the trajectory as ``(k, 3)``
+    arrays of ``chunk_size`` positions (the last may be shorter) while
+    the integration proceeds, so the start of a long run can be used
+    before the end has been computed. Concatenating the chunks gives
+    the result of `compute_motion`; `num_samples` gives the total
+    length up front, or the most there can be if the run can ``stop``.
+    Returns the final state, as for ``return_state`` in
+    `compute_motion`.
+    """
+    state = yield from _rechunk(
+        _motion_blocks(
+            initial_conditions,
+            t0,
+            charge,
+            mass,
+            B,
+            F,
+            num_periods,
+            points_per_period,
+            method,
+            rtol,
+            atol,
+            steps_per_period,
+            progress,
+            stats,
+            stop,
+        ),
+        chunk_size,
+    )
+    return state
+
+
+def compute_dense_motion(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    num_periods=10,
+    method="auto",
+    rtol=None,
+    atol=None,
+    steps_per_period=20,
+    progress=None,
+    stats=None,
+):
+    """`compute_motion` without a fixed sample grid.
+
+    Takes the same arguments, except ``points_per_period``, and returns
+    a `DenseTrajectory` that can be sampled at any resolution without
+    integrating again. The `scipy.integrate.solve_ivp` methods keep the
+    interpolant from each step, the Boris pusher keeps its position at
+    every step and interpolates between them with a cubic spline, and
+    the analytic solution is evaluated directly. The splitting method
+    isn't available.
+
+    Returns
+    -------
+    DenseTrajectory
+        Positions over the ``num_periods / mass`` gyroperiods of the run
+
+    """
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    B, F = from_time(B, t0), from_time(F, t0)
+    num_periods, t1 = run_length(initial_conditions, charge, mass, B, num_periods)
+    method = resolve_method(method, B, F)
+    if method == "splitting":
+        raise ValueError("The splitting method has no dense output")
 
-    # Only pass these arguments if set
-    kwargs = {}
-    if rtol is not None:
-        kwargs["rtol"] = rtol
-    if atol is not None:
-        kwargs["atol"] = atol
+    if method == "analytic":
+        final_state = np.concatenate(
+            (
+                analytic_motion(initial_conditions, [t1], charge, mass, B, F)[0, -1],
+                _analytic_velocity(initial_conditions, [t1], charge, mass, B, F)[0, -1],
+            )
+        )
+        return DenseTrajectory(
+            lambda t: analytic_motion(initial_conditions, t, charge, mass, B, F)[0],
+            t1,
+            final_state,
+        )
 
-    solution = solve_ivp(
+    if method == "boris":
+        num_steps = int(np.ceil(steps_per_period * num_periods))
+        substeps = _boris_substeps(steps_per_period, num_periods, num_steps + 1)
+        if stats is not None:
+            stats["steps"] = substeps * num_steps
+        positions, final_state = _collect_result(
+            iter_boris(
+                initial_conditions.reshape(1, 6),
+                np.array([t1 / num_steps]),
+                num_steps + 1,
+                substeps,
+                np.array([charge], dtype=float),
+                np.array([mass], dtype=float),
+                B,
+                F,
+                progress,
+            ),
+            np.empty((1, num_steps + 1, 3)),
+            axis=1,
+        )
+        return DenseTrajectory(
+            UniformSpline(t1 / num_steps, positions[0]), t1, final_state[0]
+        )
+
+    solution, final_state = _dense_integrate(
         newton,
         [0, t1],
         initial_conditions,
+        method,
         args=(charge, mass, B, F),
-        t_eval=np.linspace(0, t1, int(num_periods) * points_per_period),
-        method=method,
-        **kwargs,
+        rtol=rtol,
+        atol=atol,
+        jac=solver_jacobian(
+            method, newton_jacobian, initial_conditions, charge, mass, B, F
+        ),
+        progress=progress,
+        stats=stats,
+    )
+    return DenseTrajectory(lambda t: solution(t)[:3].T, t1, final_state)
+
+
+def guiding_centre(t, Y, q, m, mu, B, F):
+    """Computes the derivative of the guiding-centre state vector.
+    Y is (X, Y, Z, v_parallel, gyrophase), and mu is the magnetic moment.
+    Includes the F x B drift and, for callable B, the grad-B and
+    curvature drifts and the mirror force.
+    returns dY/dt.
+    """
+    position, v_parallel = Y[:3], Y[3]
+    B_magnitude, b, drift, force_parallel = drift_terms(
+        t, position, v_parallel, q, m, mu, B, F
+    )
+
+    dY = np.empty(5)
+    dY[:3] = v_parallel * b + drift
+    dY[3] = force_parallel / m
+    dY[4] = q * B_magnitude / m
+    return dY
+
+
+def compute_guiding_centre(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    num_periods=10,
+    points_per_period=1,
+    method="auto",
+    rtol=None,
+    atol=None,
+    gyrophase=False,
+    progress=None,
+    stats=None,
+):
+    """Follow the guiding centre of a particle instead of its full orbit.
+
+    Integrates the drift equations (`guiding_centre`), whose solution
+    varies on the drift timescale rather than the gyroperiod, so the
+    integrator can take steps spanning many gyroperiods. Arguments are
+    as for `compute_motion`, except that ``points_per_period`` may be
+    less than one, and ``method`` must be a `scipy.integrate.solve_ivp`
+    method, with ``"auto"`` meaning ``"RK45"``. ``stats`` is filled in
+    as by `compute_motion`.
+
+    Parameters
+    ----------
+    gyrophase : bool
+        If True, add the gyration back on top of the guiding centre
+        using the integrated gyrophase and conserved magnetic moment.
+        Use enough ``points_per_period`` to resolve it
+
+    Returns
+    -------
+    np.ndarray
+        ``(T, 3)`` array of guiding-centre (or reconstructed particle)
+        positions
+
+    """
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    B, F = from_time(B, t0), from_time(F, t0)
+    X0, v_parallel, mu, w0, omega = gyration_split(
+        initial_conditions, charge, mass, B, F
+    )
+
+    num_periods = num_periods / mass
+    t1 = num_periods * 2 * np.pi / abs(omega)
+    total_samples = max(2, int(num_periods * points_per_period))
+
+    solution = _integrate(
+        guiding_centre,
+        [0, t1],
+        np.concatenate((X0, [v_parallel, 0.0])),
+        np.linspace(0, t1, total_samples),
+        "RK45" if method == "auto" else method,
+        args=(charge, mass, mu, B, F),
+        rtol=rtol,
+        atol=atol,
+        progress=progress,
+        stats=stats,
     )
 
-    return solution.y[:3].T
+    centres = solution[:, :3]
+    if not gyrophase:
+        return centres
+
+    # Gyration in the local perpendicular plane, measured from the
+    # initial gyration direction
+    B_ = field_at(B, centres, np.linspace(0, t1, total_samples))
+    B_magnitude = norm(B_.T)[:, np.newaxis]
+    b = B_ / B_magnitude
+    reference = w0 if np.any(w0) else np.cross(b[0], [1.0, 0.0, 0.0])
+    e1 = reference - (b @ reference)[:, np.newaxis] * b
+    e1 /= norm(e1.T)[:, np.newaxis]
+    e2 = np.cross(b, e1)
+
+    phase = solution[:, 4:]
+    larmor_radius = np.sqrt(2 * mu * B_magnitude / mass) * mass / (charge * B_magnitude)
+    return centres + larmor_radius * (e2 * np.cos(phase) + e1 * np.sin(phase))
+
+
+def compute_motion_batch(
+    initial_conditions,
+    t0,
+    charge,
+    mass,
+    B,
+    F=[0, 0, 0],
+    num_periods=10,
+    points_per_period=100,
+    method="auto",
+    rtol=None,
+    atol=None,
+    steps_per_period=20,
+    progress=None,
+    stop=None,
+    min_particles=1,
+):
+    """Push a batch of particles through the same fields in a single solve.
+
+    Parameters
+    ----------
+    initial_conditions : array_like
+        ``(N, 6)`` array of initial states ``(x, y, z, u, v, w)``
+    t0 : float
+        Initial time
+    charge, mass : float or array_like
+        Particle charges and masses, either scalars or arrays of length ``N``
+    B : array_like or callable
+        Magnetic field vector, or a function of position. A callable is
+        evaluated for all particles at once, see `newton_batch`. Use a
+        `FieldMap` for a field known on a grid. A callable may also
+        have a ``gradient`` method, see `gradient_of`, which is otherwise
+        estimated by `field_gradient`
+    F : array_like or callable
+        Force vector, or a function of position like B
+    method : str
+        Any `scipy.integrate.solve_ivp` method, ``"boris"`` for the
+        fixed-step `boris` pusher taking at least ``steps_per_period``
+        steps per gyroperiod, ``"splitting"`` for the `splitting`
+        integrator, which solves the gyration exactly and so may take
+        fewer, or ``"analytic"`` for the exact `analytic_motion` in
+        uniform fields. The default, ``"auto"``,
+        uses the exact solution when B is uniform and ``"RK45"``
+        otherwise. The `IMPLICIT_METHODS` are given the Jacobian of the
+        equations of motion, see `newton_jacobian`, rather than
+        estimating it
+    progress : callable, optional
+        Called with the fraction of the run completed as it proceeds,
+        and may raise to abort it
+    stop : StopCondition | callable | sequence, optional
+        Stop particles early, as in `compute_motion`. Stopped particles
+        are dropped from the solve, so they cost nothing more
+    min_particles : int
+        End the run for all of the particles once fewer than this many
+        are still going
+
+    Each particle is followed for ``num_periods`` of its own
+    gyroperiods, exactly as in `compute_motion`. The batch is
+    integrated in time normalised to each particle's run length so that
+    all trajectories share one time base; the number of samples is set
+    by the particle needing the most.
+
+    Returns
+    -------
+    np.ndarray
+        ``(N, T, 3)`` array of particle positions. With ``stop``, the
+        positions of each particle after it stopped are NaN, and ``T``
+        is cut short if they all stopped before the end
+
+    """
+    initial_conditions = np.asarray(initial_conditions, dtype=float)
+    if initial_conditions.ndim != 2 or initial_conditions.shape[1] != 6:
+        raise ValueError(
+            f"`initial_conditions` must have shape (N, 6) (got {initial_conditions.shape})"
+        )
+
+    num_particles = initial_conditions.shape[0]
+    charge = np.broadcast_to(np.asarray(charge, dtype=float), (num_particles,))
+    mass = np.broadcast_to(np.asarray(mass, dtype=float), (num_particles,))
+
+    B, F = from_time(B, t0), from_time(F, t0)
+    particle_periods, t1 = batch_run_lengths(
+        initial_conditions, charge, mass, B, num_periods
+    )
+    total_samples = int(particle_periods.astype(int).max()) * points_per_period
+    method = resolve_method(method, B, F)
+    stops = _stop_function(stop, t0)
+
+    if method == "analytic":
+        return _collect(
+            _iter_analytic_motion(
+                initial_conditions,
+                np.outer(t1, np.linspace(0, 1, total_samples)),
+                charge,
+                mass,
+                B,
+                F,
+                progress,
+                stops,
+                min_particles,
+            ),
+            np.empty((num_particles, total_samples, 3)),
+            axis=1,
+            truncate=stops is not None,
+        )
+
+    if method == "splitting":
+        return splitting(
+            initial_conditions,
+            t1,
+            total_samples,
+            _splitting_steps(steps_per_period, particle_periods),
+            charge,
+            mass,
+            B,
+            F,
+            progress,
+            stops,
+            min_particles,
+        )
+
+    if method == "boris":
+        return boris(
+            initial_conditions,
+            t1 / (total_samples - 1),
+            total_samples,
+            _boris_substeps(steps_per_period, particle_periods, total_samples),
+            charge,
+            mass,
+            B,
+            F,
+            progress,
+            stops,
+            min_particles,
+        )
+
+    def scaled_equations(particles, y0):
+        """The equations of motion of ``particles``, starting from the
+        flattened states ``y0``, in time normalised to each particle's
+        run length, and their ``jac``"""
+        particle_t1 = t1[particles]
+        particle_charge, particle_mass = charge[particles], mass[particles]
+        # d/ds = t1 * d/dt, applied per particle
+        time_scale = np.tile(particle_t1, 6)
+
+        def scaled_newton(s, Y):
+            return (
+                newton_batch(s * particle_t1, Y, particle_charge, particle_mass, B, F)
+                * time_scale
+            )
+
+        # `solver_jacobian` passes the fields too, which are already bound here
+        def scaled_jacobian(s, Y, *_):
+            from scipy import sparse
+
+            jacobian = newton_batch_jacobian(
+                s * particle_t1, Y, particle_charge, particle_mass, B, F
+            )
+            jacobian = sparse.csr_array(jacobian.multiply(time_scale[:, np.newaxis]))
+            # LSODA only takes dense Jacobians
+            return jacobian.toarray() if method == "LSODA" else jacobian
+
+        return scaled_newton, solver_jacobian(
+            method, scaled_jacobian, y0, particle_charge, particle_mass, B, F
+        )
+
+    s_eval = np.linspace(0, 1, total_samples)
+    if stops is not None:
+        return _collect(
+            _iter_batch_stopping(
+                scaled_equations,
+                initial_conditions,
+                s_eval,
+                t1,
+                mass,
+                method,
+                stops,
+                min_particles,
+                rtol,
+                atol,
+                progress,
+            ),
+            np.empty((num_particles, total_samples, 3)),
+            axis=1,
+            truncate=True,
+        )
+
+    y0 = initial_conditions.T.ravel()
+    scaled_newton, jac = scaled_equations(np.arange(num_particles), y0)
+    solution = _integrate(
+        scaled_newton,
+        [0, 1],
+        y0,
+        s_eval,
+        method,
+        rtol=rtol,
+        atol=atol,
+        jac=jac,
+        progress=progress,
+    )
+
+    return solution.reshape(-1, 6, num_particles)[:, :3].transpose(2, 0, 1)
+
+
+def _iter_batch_stopping(
+    scaled_equations,
+    initial_conditions,
+    s_eval,
+    t1,
+    mass,
+    method,
+    stops,
+    min_particles,
+    rtol,
+    atol,
+    progress,
+):
+    """Integrate a batch of particles that can stop, yielding ``(N, k,
+    3)`` blocks of positions, NaN for those that have stopped.
+
+    After each step in which particles stop, each one's own stop is
+    found by bisection, and the solver is started again with only the
+    particles still going, so the ones that stopped take no more
+    evaluations. ``scaled_equations`` gives the equations of motion of
+    some of the particles in normalised time, integrated over
+    ``s_eval``, as in `compute_motion_batch`.
+    """
+    num_particles = len(initial_conditions)
+    particles = np.arange(num_particles)
+    state = initial_conditions.T
+    s = 0.0
+    next_sample = 0
+
+    # Particles that start stopped only have their first position
+    keep = ~stops(np.zeros(num_particles), state, mass)
+    if not keep.all():
+        block = np.full((num_particles, 1, 3), np.nan)
+        block[:, 0] = initial_conditions[:, :3]
+        yield block
+        particles, state = particles[keep], state[:, keep]
+        next_sample = 1
+
+    while len(particles) and len(particles) >= min_particles:
+        particle_t1, particle_mass = t1[particles], mass[particles]
+        y0 = state.ravel()
+        scaled_newton, jac = scaled_equations(particles, y0)
+        solver = ode_solver(scaled_newton, [s, 1], y0, method, (), rtol, atol, jac)
+
+        def segment_progress(fraction, start=s):
+            progress(start + fraction * (1 - start))
+
+        for _ in iter_steps(solver, None if progress is None else segment_progress):
+            s = solver.t
+            state = solver.y.reshape(6, -1)
+            stopped = stops(s * particle_t1, state, particle_mass)
+            end = np.searchsorted(s_eval, s, side="right")
+            if end == next_sample and not stopped.any():
+                continue
+
+            interpolant = solver.dense_output()
+            samples = interpolant(s_eval[next_sample:end]).reshape(
+                6, len(particles), -1
+            )
+            positions = samples[:3].transpose(1, 2, 0)
+
+            # Each particle's own stop in the step, as above
+            stop_s = np.full(len(particles), np.inf)
+            for row in np.flatnonzero(stopped):
+                stop_s[row] = _locate_stop(
+                    lambda s, state, row=row: stops(
+                        s * particle_t1[row : row + 1],
+                        state[:, np.newaxis],
+                        particle_mass[row : row + 1],
+                    )[0],
+                    lambda s, row=row: interpolant(s).reshape(6, -1)[:, row],
+                    solver.t_old,
+                    s,
+                )[0]
+
+            ended = len(particles) - np.count_nonzero(stopped) < min_particles
+            if ended:
+                # The run ends with the stop that leaves too few
+                end_s = np.sort(stop_s)[max(0, len(particles) - min_particles)]
+                stop_s = np.minimum(stop_s, end_s)
+                end = np.searchsorted(s_eval, end_s, side="right")
+                positions = positions[:, : end - next_sample]
+
+            positions[s_eval[next_sample:end] > stop_s[:, np.newaxis]] = np.nan
+            block = np.full((num_particles, end - next_sample, 3), np.nan)
+            block[particles] = positions
+            next_sample = end
+            if block.shape[1]:
+                yield block
+
+            if ended:
+                return
+            if stopped.any():
+                particles, state = particles[~stopped], state[:, ~stopped]
+                break
+        else:
+            return
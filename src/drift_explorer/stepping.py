@@ -0,0 +1,128 @@
+import numpy as np
+
+from .fields import evaluate, from_time, norm
+
+# SciPy is slow to import, so it is imported where it's used, the
+# first time a run needs it
+
+SOLVE_IVP_METHODS = ("RK45", "RK23", "DOP853", "Radau", "BDF", "LSODA")
+# Methods that use the Jacobian of the equations of motion
+IMPLICIT_METHODS = ("Radau", "BDF", "LSODA")
+
+
+def resolve_method(method, B, F):
+    """Pick the solver for ``method="auto"``, and check the analytic
+    solution is only used where it is exact"""
+    uniform = not (callable(B) or callable(F))
+    if method == "auto":
+        return "analytic" if uniform else "RK45"
+    if method == "analytic" and not uniform:
+        raise ValueError("The analytic solution needs uniform (non-callable) B and F")
+    return method
+
+
+def solver_jacobian(method, jacobian, Y, q, m, B, F):
+    """``jac`` for `scipy.integrate.solve_ivp` with ``method``: None for
+    the explicit methods, which don't use it, the constant ``jacobian``
+    in uniform fields, or else the function itself"""
+    if method not in IMPLICIT_METHODS:
+        return None
+    if not (callable(B) or callable(F)):
+        return jacobian(0.0, Y, q, m, B, F)
+    return jacobian
+
+
+def ode_solver(fun, t_span, y0, method, args=(), rtol=None, atol=None, jac=None):
+    """Set up a `scipy.integrate.solve_ivp` method over ``t_span``. A
+    callable ``jac`` is called like ``fun``, with ``args``"""
+    t0, t1 = t_span
+
+    # Only pass these arguments if set
+    kwargs = {}
+    if rtol is not None:
+        kwargs["rtol"] = rtol
+    if atol is not None:
+        kwargs["atol"] = atol
+    if callable(jac):
+        kwargs["jac"] = lambda t, y: jac(t, y, *args)
+    elif method == "LSODA" and jac is not None:
+        # LSODA fails on a constant Jacobian, so give it as a function
+        kwargs["jac"] = lambda t, y: jac
+    elif jac is not None:
+        kwargs["jac"] = jac
+
+    from scipy import integrate
+
+    return getattr(integrate, method)(
+        lambda t, y: fun(t, y, *args), t0, np.asarray(y0, dtype=float), t1, **kwargs
+    )
+
+
+def iter_steps(solver, progress=None, stats=None):
+    """Step ``solver`` to the end of its interval, yielding after each
+    step and then calling ``progress`` with the fraction completed.
+    ``stats`` is kept up to date with the number of steps and the
+    solver's evaluation counts"""
+    t0, t1 = solver.t, solver.t_bound
+    steps = 0
+
+    while solver.status == "running":
+        message = solver.step()
+        if solver.status == "failed":
+            raise RuntimeError(f"Integration failed: {message}")
+        steps += 1
+        if stats is not None:
+            stats.update(
+                steps=steps, nfev=solver.nfev, njev=solver.njev, nlu=solver.nlu
+            )
+
+        yield
+
+        if progress is not None:
+            progress((solver.t - t0) / (t1 - t0))
+
+
+def num_samples(num_periods, mass, points_per_period):
+    """Number of positions `compute_motion` returns for a run"""
+    # dividing by m insures electrons go as far as ions despite
+    # gyrating faster
+    return int(num_periods / mass) * points_per_period
+
+
+def run_length(initial_conditions, charge, mass, B, num_periods):
+    """Number of gyroperiods and end time of a single particle run"""
+    # Particle pusher
+    x0, y0, z0 = initial_conditions[:3]
+
+    if callable(B):
+        wc = np.abs(charge) * norm(evaluate(B, [x0, y0, z0], 0.0)) / mass
+    else:
+        wc = np.abs(charge) * norm(B) / mass
+
+    # number of gyroperiods. dividing by m insures electrons go as far
+    # as ions despite gyrating faster
+    num_periods = num_periods / mass
+    gyroperiod = 2 * np.pi / wc
+    return num_periods, num_periods * gyroperiod
+
+
+def batch_run_lengths(initial_conditions, charge, mass, B, num_periods):
+    """Number of gyroperiods and end time of each particle in a batch
+    run, scaled as in `run_length`"""
+    if callable(B):
+        wc = np.abs(charge) * norm(evaluate(B, initial_conditions[:, :3].T, 0.0)) / mass
+    else:
+        wc = np.abs(charge) * norm(B) / mass
+
+    particle_periods = num_periods / mass
+    gyroperiod = 2 * np.pi / wc
+    return particle_periods, particle_periods * gyroperiod
+
+
+def run_duration(initial_conditions, charge, mass, B, num_periods, t0=0.0):
+    """Length of time `compute_motion` runs for, over which its
+    positions are evenly spaced. ``t0`` is the run's start time, which
+    matters for a time-dependent B"""
+    return run_length(initial_conditions, charge, mass, from_time(B, t0), num_periods)[
+        1
+    ]
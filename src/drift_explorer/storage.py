@@ -0,0 +1,113 @@
+import numpy as np
+
+# Number of positions copied at once by `copy_positions`, which bounds
+# the memory used to decode a `CompactTrajectory`
+COPY_CHUNK_SIZE = 1_000_000
+
+
+class CompactTrajectory:
+    """``(N, 3)`` array of positions stored as offsets from an origin.
+
+    The offsets can be a smaller type than the positions, such as
+    ``float32``, while the origin stays ``float64``. Taking the origin
+    to be near the trajectory, such as its starting point, keeps the
+    offsets small so they lose little precision. Indexing decodes just
+    the positions asked for, so long trajectories can be processed a
+    piece at a time without ever decoding the whole array.
+
+    Parameters
+    ----------
+    offsets : np.ndarray
+        ``(N, 3)`` array of offsets, which may be a `numpy.memmap`
+    origin : array_like
+        Position the offsets are measured from
+
+    """
+
+    ndim = 2
+
+    def __init__(self, offsets, origin):
+        self.offsets = offsets
+        self.origin = np.asarray(origin, dtype=float)
+
+    @property
+    def shape(self):
+        return self.offsets.shape
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            return self[index[0]][(slice(None), *index[1:])]
+        return self.offsets[index] + self.origin
+
+    def __setitem__(self, index, positions):
+        self.offsets[index] = np.asarray(positions) - self.origin
+
+    def __array__(self, dtype=None, copy=None):
+        positions = self[:]
+        return positions if dtype is None else positions.astype(dtype)
+
+    def min(self, axis=0):
+        if axis != 0:
+            raise ValueError("Only the minimum over positions (axis=0) is supported")
+        return self.offsets.min(axis=0) + self.origin
+
+    def max(self, axis=0):
+        if axis != 0:
+            raise ValueError("Only the maximum over positions (axis=0) is supported")
+        return self.offsets.max(axis=0) + self.origin
+
+
+def allocate_positions(num_samples, dtype=np.float64, origin=None, file=None):
+    """Preallocated ``(num_samples, 3)`` buffer for positions.
+
+    Parameters
+    ----------
+    num_samples : int
+        Number of positions
+    dtype : np.dtype
+        Type to store the positions as
+    origin : array_like | None
+        If given, store offsets from this position in a
+        `CompactTrajectory`, which is always done for types other than
+        ``float64``
+    file : str | Path | file-like | None
+        If given, back the buffer with this file as a `numpy.memmap`,
+        so that it needn't fit in memory
+
+    Returns
+    -------
+    np.ndarray | CompactTrajectory
+        Buffer that the positions can be written into
+
+    Examples
+    --------
+    >>> out = allocate_positions(10_000, np.float32, origin=initial_conditions[:3])
+    >>> compute_motion(initial_conditions, 0.0, 1, 1, B, out=out)
+
+    """
+    shape = (num_samples, 3)
+    if file is not None:
+        offsets = np.memmap(file, dtype=dtype, mode="w+", shape=shape)
+    else:
+        offsets = np.empty(shape, dtype=dtype)
+
+    if origin is None:
+        if np.dtype(dtype) == np.float64:
+            return offsets
+        origin = np.zeros(3)
+    return CompactTrajectory(offsets, origin)
+
+
+def copy_positions(positions, out, start=0):
+    """Copy ``positions`` into ``out`` from index ``start``, a chunk at a
+    time so neither has to be decoded all at once"""
+    for first in range(0, len(positions), COPY_CHUNK_SIZE):
+        chunk = positions[first : first + COPY_CHUNK_SIZE]
+        out[start + first : start + first + len(chunk)] = chunk
@@ -0,0 +1,345 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import sys
+import time
+import tomllib
+
+import numpy as np
+
+from .expressions import FieldExpression
+from .solver import compute_motion
+from .stepping import num_samples, run_duration
+from .trajectory_file import save_trajectory
+
+# Every parameter a sweep can vary, and its value when not given. The
+# defaults match the GUI's
+DEFAULTS = {
+    "position": [0.0, 1.0, 0.0],
+    "velocity": [1.0, 0.0, 0.1],
+    "charge": 1.0,
+    "mass": 1.0,
+    "B": [0.0, 0.0, 1.0],
+    "F": [0.0, 0.0, 0.0],
+    "t0": 0.0,
+    "method": "auto",
+    "rtol": 1e-3,
+    "atol": 1e-6,
+    "num_periods": 10,
+    "points_per_period": 100,
+    "steps_per_period": 20,
+}
+VECTOR_PARAMETERS = ("position", "velocity", "B", "F")
+# Name of the file listing every run, in the output directory
+SUMMARY_FILE = "summary.jsonl"
+
+
+def _is_range(value):
+    return isinstance(value, dict)
+
+
+def _expand_range(value):
+    """Values of a ``{start, stop, num, log}`` range"""
+    unknown = set(value) - {"start", "stop", "num", "log"}
+    if unknown:
+        raise ValueError(f"Unknown keys {sorted(unknown)} in range {value}")
+    space = np.geomspace if value.get("log", False) else np.linspace
+    return space(value["start"], value["stop"], value["num"]).tolist()
+
+
+def _is_vector(value):
+    """Whether ``value`` is one vector, rather than a list of them. Its
+    components may be ranges"""
+    return isinstance(value, str) or (
+        isinstance(value, list)
+        and len(value) == 3
+        and all(isinstance(component, (int, float, dict)) for component in value)
+    )
+
+
+def _choices(name, value):
+    """Every value of the parameter ``name`` in a sweep"""
+    if name in VECTOR_PARAMETERS:
+        vectors = []
+        for vector in [value] if _is_vector(value) else value:
+            if not _is_vector(vector):
+                raise ValueError(
+                    f"`{name}` must be three components, an expression, "
+                    f"or a list of those (got {vector!r})"
+                )
+            if isinstance(vector, str):
+                vectors.append(vector)
+                continue
+            # Sweep each component of the vector
+            vectors.extend(
+                list(components)
+                for components in itertools.product(
+                    *(_choices("component", component) for component in vector)
+                )
+            )
+        return vectors
+
+    if _is_range(value):
+        return _expand_range(value)
+    if isinstance(value, list):
+        return [
+            choice
+            for item in value
+            for choice in (_expand_range(item) if _is_range(item) else [item])
+        ]
+    return [value]
+
+
+def load_sweep(path):
+    """Read a sweep specification from a TOML or JSON file, see
+    `expand_sweep`"""
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path) as file:
+            return json.load(file)
+    with open(path, "rb") as file:
+        return tomllib.load(file)
+
+
+def expand_sweep(spec):
+    """Every combination of the parameter values in a sweep.
+
+    The ``spec`` maps the names in `DEFAULTS` to their values, and
+    leaving one out uses its default. A value can be a list of values
+    to try, or a range, given as ``{start, stop, num}`` and optionally
+    ``log = true`` to space the values geometrically. The vectors in
+    `VECTOR_PARAMETERS` can have ranges as components, and ``B`` and
+    ``F`` can be `FieldExpression` text. For example::
+
+        charge = [1, -1]
+        mass = {start = 0.01, stop = 1, num = 5, log = true}
+        velocity = [1, 0, {start = 0, stop = 1, num = 11}]
+        B = [[0, 0, 1], "0, 0, 1 + 0.1*x"]
+        method = ["RK45", "boris"]
+
+    is 2 x 5 x 11 x 2 x 2 = 440 runs.
+
+    Yields
+    ------
+    dict
+        Parameters of each run, with every name in `DEFAULTS`
+
+    """
+    unknown = set(spec) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(
+            f"Unknown sweep parameters {sorted(unknown)}, expected some of {list(DEFAULTS)}"
+        )
+
+    names = list(DEFAULTS)
+    choices = [_choices(name, spec.get(name, DEFAULTS[name])) for name in names]
+    for values in itertools.product(*choices):
+        yield dict(zip(names, values))
+
+
+def num_runs(spec):
+    """Number of runs `expand_sweep` gives, without expanding them"""
+    return int(
+        np.prod(
+            [len(_choices(name, spec.get(name, DEFAULTS[name]))) for name in DEFAULTS]
+        )
+    )
+
+
+def _field(value):
+    return FieldExpression(value) if isinstance(value, str) else value
+
+
+def run_one(index, parameters, output=None):
+    """Compute the run ``index`` of a sweep, writing its trajectory to
+    ``output`` if given.
+
+    Errors are recorded rather than raised, so that one bad run doesn't
+    stop the sweep.
+
+    Returns
+    -------
+    dict
+        The parameters, the file written, the number of positions, and
+        ``seconds`` spent computing them, or the ``error``
+
+    """
+    record = {"run": index, **parameters}
+    initial_conditions = [*parameters["position"], *parameters["velocity"]]
+    settings = {
+        name: parameters[name]
+        for name in (
+            "num_periods",
+            "points_per_period",
+            "method",
+            "rtol",
+            "atol",
+            "steps_per_period",
+        )
+    }
+
+    try:
+        B, F = _field(parameters["B"]), _field(parameters["F"])
+        length = num_samples(
+            parameters["num_periods"],
+            parameters["mass"],
+            parameters["points_per_period"],
+        )
+        # The velocities are only kept to be saved
+        velocities = None if output is None else np.empty((length, 3))
+        start = time.perf_counter()
+        positions, final_state = compute_motion(
+            initial_conditions,
+            parameters["t0"],
+            parameters["charge"],
+            parameters["mass"],
+            B,
+            F,
+            **settings,
+            return_state=True,
+            velocities=velocities,
+        )
+        record["seconds"] = time.perf_counter() - start
+        record["num_samples"] = len(positions)
+
+        if output is not None:
+            path = Path(output) / f"run-{index:06d}.drift"
+            save_trajectory(
+                path,
+                positions,
+                velocities,
+                final_state=final_state,
+                duration=run_duration(
+                    initial_conditions,
+                    parameters["charge"],
+                    parameters["mass"],
+                    B,
+                    parameters["num_periods"],
+                ),
+                parameters=dict(
+                    initial_conditions=initial_conditions,
+                    t0=parameters["t0"],
+                    charge=parameters["charge"],
+                    mass=parameters["mass"],
+                    B=parameters["B"],
+                    F=parameters["F"],
+                ),
+                settings=dict(settings, guiding_centre=False),
+            )
+            record["file"] = path.name
+    except Exception as error:
+        record["error"] = f"{type(error).__name__}: {error}"
+    return record
+
+
+def _run_job(job):
+    return run_one(*job)
+
+
+def run_sweep(spec, output, processes=None, save_trajectories=True, progress=None):
+    """Compute every run of a sweep, see `expand_sweep`, over a pool of
+    processes.
+
+    Each run is written to ``output`` as it finishes, in the trajectory
+    file format, along with a line of `SUMMARY_FILE` from `run_one`.
+    Runs are handed out one at a time, so long and short runs balance
+    across the processes, and finish in any order.
+
+    Parameters
+    ----------
+    spec : dict
+        The sweep, as read by `load_sweep`
+    output : str | Path
+        Directory to write the runs to, which is created if needed
+    processes : int | None
+        Number of processes, by default one for each core. With 1, the
+        runs are computed in this process
+    save_trajectories : bool
+        If False, only write the summary
+    progress : callable | None
+        Called with each record and the number of runs done so far
+
+    Returns
+    -------
+    int
+        The number of runs that failed
+
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    jobs = (
+        (index, parameters, output if save_trajectories else None)
+        for index, parameters in enumerate(expand_sweep(spec))
+    )
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    num_failed = 0
+    with open(output / SUMMARY_FILE, "w") as summary:
+
+        def write(records):
+            nonlocal num_failed
+            for done, record in enumerate(records, start=1):
+                summary.write(json.dumps(record) + "\n")
+                summary.flush()
+                num_failed += "error" in record
+                if progress is not None:
+                    progress(record, done)
+
+        if processes == 1:
+            write(map(_run_job, jobs))
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                write(pool.imap_unordered(_run_job, jobs))
+    return num_failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="drift-explorer-sweep",
+        description="Compute every combination of the parameters in a sweep file",
+    )
+    parser.add_argument("spec", type=Path, help="TOML or JSON sweep specification")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="directory to write the runs to (default: named after the spec)",
+    )
+    parser.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        help="number of processes to use (default: one per core)",
+    )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="only write the summary, not the trajectories",
+    )
+    args = parser.parse_args(argv)
+
+    spec = load_sweep(args.spec)
+    total = num_runs(spec)
+    output = args.output or args.spec.with_suffix("")
+
+    def report(record, done):
+        status = record.get("error") or f"{record['seconds']:.3f} s"
+        print(f"[{done}/{total}] run {record['run']}: {status}", file=sys.stderr)
+
+    num_failed = run_sweep(
+        spec,
+        output,
+        processes=args.processes,
+        save_trajectories=not args.summary_only,
+        progress=report,
+    )
+    print(f"{total - num_failed} of {total} runs written to {output}", file=sys.stderr)
+    return 1 if num_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import json
+import os
+
+import numpy as np
+
+from .storage import COPY_CHUNK_SIZE, CompactTrajectory
+
+# Start of every trajectory file, followed by the length of the header
+MAGIC = b"DRIFTTRJ"
+FORMAT_VERSION = 1
+# Arrays start on multiples of this many bytes, so they can be mapped
+ALIGNMENT = 64
+FILE_FILTER = "Trajectories (*.drift)"
+
+
+class SavedTrajectory:
+    """A run read back with `load_trajectory`.
+
+    The arrays are memory-mapped from the file, so opening a run is
+    instant however long it is, and only the parts that are used are
+    ever read.
+
+    Attributes
+    ----------
+    positions : np.memmap | CompactTrajectory
+        ``(T, 3)`` array of positions
+    velocities : np.memmap | None
+        ``(T, 3)`` array of velocities, if they were saved
+    final_state : np.ndarray | None
+        Position and velocity at the end of the run, from which it can
+        be continued
+    duration : float | None
+        Length of the run, which starts at time 0
+    parameters : dict
+        Physical parameters of the run, such as ``initial_conditions``
+        and ``B``
+    settings : dict
+        Solver settings, such as ``method`` and ``num_periods``
+
+    """
+
+    def __init__(
+        self, positions, velocities, final_state, duration, parameters, settings
+    ):
+        self.positions = positions
+        self.velocities = velocities
+        self.final_state = final_state
+        self.duration = duration
+        self.parameters = parameters
+        self.settings = settings
+
+    @property
+    def times(self):
+        """Time of each position, which are evenly spaced"""
+        if self.duration is None:
+            return None
+        return np.linspace(0.0, self.duration, len(self.positions))
+
+
+def _jsonable(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Can't save {type(value).__name__} in a trajectory file")
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_trajectory(
+    path,
+    positions,
+    velocities=None,
+    final_state=None,
+    duration=None,
+    parameters=None,
+    settings=None,
+):
+    """Write a run to a trajectory file.
+
+    The file starts with `MAGIC`, the length of a JSON header and the
+    header itself, which describes the run and where each array is in
+    the rest of the file. The arrays are stored raw, so they can be
+    memory-mapped by `load_trajectory`. They are written a chunk at a
+    time, so a run stored in a `numpy.memmap` never has to be in memory
+    all at once. A `CompactTrajectory` is saved as its offsets and
+    origin, without decoding it.
+
+    Parameters
+    ----------
+    path : str | Path
+        File to write
+    positions : np.ndarray | CompactTrajectory
+        ``(T, 3)`` array of positions
+    velocities : np.ndarray | None
+        ``(T, 3)`` array of velocities
+    final_state : np.ndarray | None
+        Position and velocity at the end of the run
+    duration : float | None
+        Length of the run, from which the time of each position follows
+    parameters : dict | None
+        Physical parameters of the run, such as the arguments to
+        `compute_motion`. These must be numbers, strings or arrays
+    settings : dict | None
+        Solver settings, as for ``parameters``
+
+    Examples
+    --------
+    >>> positions, state = compute_motion(*args, return_state=True)
+    >>> save_trajectory("run.drift", positions, final_state=state)
+
+    """
+    arrays = {"positions": positions}
+    if velocities is not None:
+        arrays["velocities"] = velocities
+    if final_state is not None:
+        arrays["final_state"] = np.asarray(final_state, dtype=float)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        stored = array.offsets if isinstance(array, CompactTrajectory) else array
+        layout[name] = {
+            "dtype": np.dtype(stored.dtype).str,
+            "shape": list(stored.shape),
+            "offset": offset,
+        }
+        if isinstance(array, CompactTrajectory):
+            layout[name]["origin"] = array.origin
+        offset = _aligned(offset + stored.nbytes)
+
+    header = json.dumps(
+        {
+            "version": FORMAT_VERSION,
+            "duration": duration,
+            "parameters": parameters or {},
+            "settings": settings or {},
+            "arrays": layout,
+        },
+        default=_jsonable,
+    ).encode()
+    # Pad the header with spaces, so the arrays start aligned
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+    header = header.ljust(data_start - len(MAGIC) - 8)
+
+    # Write alongside and then replace the file, so that any run mapped
+    # from the old one stays readable
+    partial = f"{os.fspath(path)}.partial"
+    with open(partial, "wb") as file:
+        file.write(MAGIC)
+        file.write(np.array(len(header), dtype="<u8").tobytes())
+        file.write(header)
+        for name, array in arrays.items():
+            if isinstance(array, CompactTrajectory):
+                array = array.offsets
+            file.seek(data_start + layout[name]["offset"])
+            for start in range(0, len(array), COPY_CHUNK_SIZE):
+                chunk = array[start : start + COPY_CHUNK_SIZE]
+                file.write(np.ascontiguousarray(chunk).tobytes())
+    os.replace(partial, path)
+
+
+def load_trajectory(path):
+    """Open a trajectory file written by `save_trajectory`, mapping
+    its arrays rather than reading them
+
+    Returns
+    -------
+    SavedTrajectory
+
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a trajectory file")
+        header_length = int(np.frombuffer(file.read(8), dtype="<u8")[0])
+        header = json.loads(file.read(header_length))
+
+    if header["version"] > FORMAT_VERSION:
+        raise ValueError(
+            f"'{path}' is version {header['version']} of the trajectory format, "
+            f"but only up to version {FORMAT_VERSION} can be read"
+        )
+
+    data_start = len(MAGIC) + 8 + header_length
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        array = np.memmap(
+            path,
+            dtype=np.dtype(entry["dtype"]),
+            mode="r",
+            offset=data_start + entry["offset"],
+            shape=tuple(entry["shape"]),
+        )
+        if "origin" in entry:
+            array = CompactTrajectory(array, entry["origin"])
+        arrays[name] = array
+
+    final_state = arrays.get("final_state")
+    return SavedTrajectory(
+        arrays["positions"],
+        arrays.get("velocities"),
+        None if final_state is None else np.array(final_state),
+        header["duration"],
+        header["parameters"],
+        header["settings"],
+    )
@@ -0,0 +1,106 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from contextlib import ExitStack
+
+import numpy as np
+
+
+class Cancelled(Exception):
+    """Raised inside a running computation to abort it"""
+
+
+class SolverWorker(QObject):
+    """Runs a solver function, such as `compute_motion`, on a worker thread.
+
+    The function is passed a ``progress`` callback, which reports the
+    percentage completed through the `progress` signal and raises
+    `Cancelled` once `cancel` has been called, so the solve stops at
+    its next step.
+
+    If ``stream`` is True, the function is a generator such as
+    `iter_motion`: each chunk is sent out through the `chunk` signal as
+    it arrives, and `finished` sends them all joined together. The
+    generator's return value, such as the final state, is kept as
+    `result`. If ``out`` is given, the chunks are written into it from
+    index ``start`` instead, such as a buffer from `allocate_positions`,
+    and `finished` sends ``out`` itself.
+
+    If ``profile`` is given, a `RunProfile`, the computation is timed as
+    its ``"solve"`` stage, and the function is also passed its
+    ``solver`` dict as ``stats``.
+    """
+
+    progress = pyqtSignal(int)
+    chunk = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(
+        self, function, *args, stream=False, out=None, start=0, profile=None, **kwargs
+    ):
+        super().__init__()
+        self.function = function
+        self.stream = stream
+        self.out = out
+        self.start = start
+        self.profile = profile
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self._cancel_requested = False
+        self._percent = None
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def _report_progress(self, fraction):
+        if self._cancel_requested:
+            raise Cancelled
+
+        # Only signal when the displayed value changes, as this is
+        # called on every integrator step
+        percent = int(100 * fraction)
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+    def _call(self):
+        kwargs = dict(self.kwargs, progress=self._report_progress)
+        if self.profile is not None:
+            kwargs["stats"] = self.profile.solver
+        return self.function(*self.args, **kwargs)
+
+    def _run_stream(self):
+        chunks = []
+        start = self.start
+        generator = self._call()
+        while True:
+            try:
+                chunk = next(generator)
+            except StopIteration as stop:
+                self.result = stop.value
+                break
+            if self._cancel_requested:
+                raise Cancelled
+            if self.out is None:
+                chunks.append(chunk)
+            else:
+                self.out[start : start + len(chunk)] = chunk
+                start += len(chunk)
+            self.chunk.emit(chunk)
+        return np.concatenate(chunks) if self.out is None else self.out
+
+    def run(self):
+        try:
+            with ExitStack() as stack:
+                if self.profile is not None:
+                    stack.enter_context(self.profile.stage("solve"))
+                    stack.enter_context(self.profile.capture())
+                result = self._run_stream() if self.stream else self._call()
+        except Cancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(str(error))
+        else:
+            self.finished.emit(result)
@@ -0,0 +1,23 @@
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """The application for tests of the Qt parts, drawn offscreen"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def wait_for(qapp, condition, timeout=30):
+    """Handle events until ``condition()`` is true"""
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            raise TimeoutError("Timed out waiting for the Qt event loop")
+        qapp.processEvents()
+        time.sleep(0.005)
@@ -0,0 +1,117 @@
+from drift_explorer import compute_motion
+from drift_explorer.animation import TrajectoryAnimation
+from drift_explorer.decimation import decimate
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import pytest
+
+positions = compute_motion(
+    [0, 1, 0, 1, 0, 0.1], 0, 1, 1, (0, 0, 1), (0.05, 0, 0), num_periods=500
+)
+
+
+@pytest.fixture
+def ax():
+    figure = Figure(figsize=(4, 3))
+    FigureCanvasAgg(figure)
+    return figure.add_subplot(projection="3d")
+
+
+def line_data(line):
+    return np.column_stack(line.get_data_3d())
+
+
+def draw_frames(animation, frames):
+    """Draw each of ``frames``, checking that only the newly revealed
+    segment is drawn as the head, and the trace grows by it"""
+    for frame in frames:
+        trace = line_data(animation.artists[0])
+        start = animation._revealed[0]
+        animation.draw_frame(frame)
+        head = line_data(animation.heads[0])
+        new_trace = line_data(animation.artists[0])
+        end = animation._revealed[0]
+
+        if end < start:
+            # Starting again from the beginning
+            trace = np.empty((0, 3))
+            start = 0
+        if end == start:
+            # Nothing new to reveal
+            assert len(head) == 0
+            np.testing.assert_array_equal(new_trace, trace)
+            continue
+        # The old trace is kept, and the head carries on from its end
+        np.testing.assert_array_equal(new_trace[: len(trace)], trace)
+        np.testing.assert_array_equal(head, new_trace[max(len(trace) - 1, 0) :])
+        np.testing.assert_array_equal(head[-1], positions[end - 1])
+
+
+def test_frames(ax):
+    animation = TrajectoryAnimation(ax, [positions], nframes=10)
+    ax.get_figure().canvas.draw()
+    draw_frames(animation, range(11))
+    # Left for the next frame by the override of `FuncAnimation._post_draw`,
+    # which matplotlib must still call
+    assert animation._background is not None
+
+    trace = line_data(animation.artists[0])
+    np.testing.assert_array_equal(trace[[0, -1]], positions[[0, -1]])
+    assert len(trace) < len(positions)
+
+    # Looping back to the start clears the trace
+    draw_frames(animation, [0])
+    assert len(line_data(animation.artists[0])) == 0
+    draw_frames(animation, [1])
+    assert animation._revealed[0] == animation._samples_per_frame
+
+
+def test_streamed(ax):
+    buffer = np.empty_like(positions)
+    animation = TrajectoryAnimation(
+        ax,
+        [np.empty((0, 3))],
+        expected_lengths=[len(positions)],
+        buffers=[buffer],
+        nframes=10,
+    )
+    ax.get_figure().canvas.draw()
+
+    # Frames only reveal what has been filled in so far
+    half = len(positions) // 2
+    buffer[:half] = positions[:half]
+    animation.fill([half])
+    draw_frames(animation, range(8))
+    assert animation._revealed[0] == half
+    # Room is left for the rest to grow into
+    assert ax.get_xlim()[1] > positions[:half, 0].max()
+
+    buffer[half:] = positions[half:]
+    animation.fill([len(positions)])
+    animation.finish()
+    last = -(-len(positions) // animation._samples_per_frame)
+    draw_frames(animation, range(8, last + 1))
+    assert animation._revealed[0] == len(positions)
+    np.testing.assert_allclose(
+        ax.get_xlim(), (positions[:, 0].min(), positions[:, 0].max())
+    )
+
+
+def test_refresh(ax):
+    animation = TrajectoryAnimation(ax, [positions], nframes=10)
+    ax.get_figure().canvas.draw()
+    draw_frames(animation, range(11))
+    coarse = len(line_data(animation.artists[0]))
+
+    # Zooming out needs fewer of the positions, picked again from the
+    # start for the new view
+    ax.axis((-1000, 1000, -1000, 1000, -1000, 1000))
+    animation.refresh()
+    trace = line_data(animation.artists[0])
+    assert len(trace) < coarse
+    np.testing.assert_array_equal(trace, positions[decimate(ax, positions)])
+
+    # And carries on from there
+    draw_frames(animation, [0, 1])
@@ -0,0 +1,153 @@
+from drift_explorer import (
+    Box,
+    EnergyLimit,
+    compute_motion,
+    compute_motion_batch,
+    iter_motion,
+)
+from drift_explorer.cache import TrajectoryCache
+
+import numpy as np
+import pytest
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+B = (0, 0, 1)
+# The particles leave through the top of the box, at z = 0.5
+box = Box([-10, -10, -1], [10, 10, 0.5])
+
+
+@pytest.mark.parametrize("method", ["analytic", "RK45", "Radau", "boris", "splitting"])
+def test_box(method):
+    settings = dict(num_periods=2, method=method, rtol=1e-9, atol=1e-12)
+    full = compute_motion(initial_conditions, 0, 1, 1, B, **settings)
+    positions, state = compute_motion(
+        initial_conditions, 0, 1, 1, B, **settings, return_state=True, stop=box
+    )
+
+    # Only the positions up to t = 5, when the particle reaches z = 0.5
+    time = np.linspace(0, 4 * np.pi, len(full))
+    assert len(positions) == np.count_nonzero(time <= 5)
+    np.testing.assert_allclose(positions, full[: len(positions)])
+    if method == "boris":
+        # Stopped at the end of a step
+        assert 0.5 < state[2] < 0.51
+    else:
+        np.testing.assert_allclose(state[:3], [np.sin(5), np.cos(5), 0.5], atol=1e-8)
+
+    # The velocities are kept up to the stop too
+    velocities = np.empty_like(full)
+    compute_motion(
+        initial_conditions, 0, 1, 1, B, **settings, stop=box, velocities=velocities
+    )
+    expected = np.stack([np.cos(time), -np.sin(time), np.full_like(time, 0.1)], 1)
+    np.testing.assert_allclose(
+        velocities[: len(positions)],
+        expected[: len(positions)],
+        atol=1e-2 if method == "boris" else 1e-6,
+    )
+
+    chunks = list(
+        iter_motion(
+            initial_conditions, 0, 1, 1, B, num_periods=2, method=method, stop=box
+        )
+    )
+    assert sum(len(chunk) for chunk in chunks) == len(positions)
+
+    if method == "splitting":
+        # Steps longer than a gyroperiod still stop between the samples
+        long_steps, state = compute_motion(
+            initial_conditions,
+            0,
+            1,
+            1,
+            B,
+            **settings,
+            steps_per_period=0.3,
+            return_state=True,
+            stop=box,
+        )
+        np.testing.assert_allclose(long_steps, positions)
+        np.testing.assert_allclose(state[:3], [np.sin(5), np.cos(5), 0.5], atol=1e-8)
+
+
+def test_conditions():
+    # Starting outside the box stops at once
+    positions = compute_motion(
+        initial_conditions, 0, 1, 1, B, stop=Box([1] * 3, [2] * 3)
+    )
+    np.testing.assert_array_equal(positions, [initial_conditions[:3]])
+
+    # A force along B speeds the particle up, until it has the energy
+    for method in ["analytic", "RK45"]:
+        _, state = compute_motion(
+            initial_conditions,
+            0,
+            1,
+            1,
+            B,
+            (0, 0, 0.1),
+            method=method,
+            return_state=True,
+            stop=[EnergyLimit(maximum=0.6), lambda t, state, mass: state[0] > 100],
+        )
+        assert 0.5 * np.sum(state[3:] ** 2) == pytest.approx(0.6)
+
+    # Conditions are given the time since t0, as fields are
+    _, state = compute_motion(
+        initial_conditions, 2, 1, 1, B, return_state=True, stop=lambda t, *_: t > 3
+    )
+    assert state[2] == pytest.approx(0.1)
+
+    with pytest.raises(ValueError, match="below upper"):
+        Box([0, 0, 1], [1, 1, 0])
+    with pytest.raises(ValueError, match="maximum"):
+        EnergyLimit()
+
+
+def test_cached_conditions():
+    cache = TrajectoryCache()
+    first = cache.compute_motion(initial_conditions, 0, 1, 1, B, stop=box)
+    assert (
+        cache.compute_motion(
+            initial_conditions, 0, 1, 1, B, stop=Box(box.lower, box.upper)
+        )
+        is first
+    )
+    assert cache.compute_motion(initial_conditions, 0, 1, 1, B) is not first
+
+
+class Field:
+    """Uniform field that notes how many particles it's evaluated for"""
+
+    def __init__(self):
+        self.sizes = []
+
+    def __call__(self, position):
+        self.sizes.append(position.shape[1])
+        return np.multiply.outer([0, 0, 1], np.ones(position.shape[1:]))
+
+
+@pytest.mark.parametrize("method", ["analytic", "RK45", "boris", "splitting"])
+def test_batch(method):
+    # Parallel speeds reaching z = 0.5 after 5, 2.5, never and 1
+    speeds = [0.1, 0.2, 0.0, 0.5]
+    batch = np.array([[0, 1, 0, 1, 0, speed] for speed in speeds])
+    field = Field() if method != "analytic" else B
+    positions = compute_motion_batch(
+        batch, 0, 1, 1, field, num_periods=2, method=method, stop=box
+    )
+
+    time = np.linspace(0, 4 * np.pi, 200)
+    lengths = np.count_nonzero(~np.isnan(positions[..., 0]), axis=1)
+    expected = [np.count_nonzero(time <= end) for end in (5, 2.5, np.inf, 1)]
+    np.testing.assert_array_equal(lengths, expected)
+    if method != "analytic":
+        # Stopped particles are dropped
+        assert field.sizes[-1] == 1
+
+    # The run ends once fewer than two particles are left
+    positions = compute_motion_batch(
+        batch, 0, 1, 1, B, num_periods=2, method=method, stop=box, min_particles=2
+    )
+    assert positions.shape == (4, expected[0], 3)
+    assert not np.isnan(positions[2]).any()
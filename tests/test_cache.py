@@ -0,0 +1,117 @@
+from drift_explorer import Box, compute_motion
+from drift_explorer.cache import TrajectoryCache
+
+import numpy as np
+
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+B = (0, 0, 1)
+
+
+def test_cache_hit():
+    cache = TrajectoryCache()
+
+    first = cache.compute_motion(initial_conditions, 0, 1, 1, B, method="RK45")
+    second = cache.compute_motion(list(initial_conditions), 0, 1, 1, B, method="RK45")
+    other = cache.compute_motion(initial_conditions, 0, 1, 1, B, method="RK23")
+
+    assert second is first
+    assert other is not first
+    np.testing.assert_array_equal(
+        first, compute_motion(initial_conditions, 0, 1, 1, B, method="RK45")
+    )
+
+    # Streaming shares the same entries
+    streamed = np.concatenate(list(cache.iter_motion(initial_conditions, 0, 1, 1, B)))
+    assert cache.compute_motion(initial_conditions, 0, 1, 1, B) is not None
+    np.testing.assert_array_equal(
+        streamed, cache.compute_motion(initial_conditions, 0, 1, 1, B)
+    )
+
+
+def test_cache_eviction():
+    # Room for two 1000 x 3 trajectories
+    cache = TrajectoryCache(max_bytes=2 * 1000 * 3 * 8)
+
+    first = cache.compute_motion(initial_conditions, 0, 1, 1, B)
+    cache.compute_motion(initial_conditions, 0, 2, 1, B)
+    # Use the first again, so the second is evicted instead
+    assert cache.compute_motion(initial_conditions, 0, 1, 1, B) is first
+    cache.compute_motion(initial_conditions, 0, 3, 1, B)
+
+    assert cache.compute_motion(initial_conditions, 0, 1, 1, B) is first
+    assert cache.get(cache.key(compute_motion, initial_conditions, 0, 2, 1, B)) is None
+
+
+def test_callable_field_not_cached():
+    cache = TrajectoryCache()
+    assert cache.key(compute_motion, initial_conditions, 0, 1, 1, lambda x: B) is None
+
+
+def test_buffers_not_cached():
+    cache = TrajectoryCache()
+    for _ in range(2):
+        # The velocities are filled in every time
+        velocities = np.zeros((1000, 3))
+        cache.compute_motion(initial_conditions, 0, 1, 1, B, velocities=velocities)
+        np.testing.assert_allclose(np.linalg.norm(velocities, axis=1), np.hypot(1, 0.1))
+
+    out = np.zeros((1000, 3))
+    cache.compute_motion(initial_conditions, 0, 1, 1, B, out=out)
+    np.testing.assert_array_equal(out, compute_motion(initial_conditions, 0, 1, 1, B))
+
+
+def test_disk_cache(tmp_path):
+    first = TrajectoryCache(directory=tmp_path).compute_motion(
+        initial_conditions, 0, 1, 1, B
+    )
+
+    # A new cache, as after a restart
+    cache = TrajectoryCache(directory=tmp_path)
+    key = cache.key(compute_motion, initial_conditions, 0, 1, 1, B)
+    np.testing.assert_array_equal(cache.get(key), first)
+
+
+def test_cached_final_state():
+    cache = TrajectoryCache()
+
+    streamed = cache.iter_motion(initial_conditions, 0, 1, 1, B)
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(streamed))
+        except StopIteration as stop:
+            state = stop.value
+            break
+
+    positions, cached_state = cache.compute_motion(
+        initial_conditions, 0, 1, 1, B, return_state=True
+    )
+    np.testing.assert_array_equal(np.concatenate(chunks), positions)
+    np.testing.assert_array_equal(cached_state, state)
+    np.testing.assert_allclose(state[:3], positions[-1])
+
+
+def test_streamed_to_disk(tmp_path):
+    # Too big for the memory tier, so only written to disk as it streams
+    cache = TrajectoryCache(max_bytes=10_000, directory=tmp_path)
+    chunks = list(cache.iter_motion(initial_conditions, 0, 1, 1, B, chunk_size=100))
+    assert cache._nbytes == 0
+    assert not list(tmp_path.glob("*.part"))
+
+    key = cache.key(compute_motion, initial_conditions, 0, 1, 1, B)
+    positions = cache.get(key)
+    assert isinstance(positions, np.memmap)
+    np.testing.assert_array_equal(positions, np.concatenate(chunks))
+    np.testing.assert_array_equal(
+        positions, compute_motion(initial_conditions, 0, 1, 1, B)
+    )
+
+    # Runs cut short are trimmed to their length
+    stop = Box([-5, -5, -1], [5, 5, 0.5])
+    stopped = np.concatenate(
+        list(cache.iter_motion(initial_conditions, 0, 1, 1, B, stop=stop))
+    )
+    key = cache.key(compute_motion, initial_conditions, 0, 1, 1, B, stop=stop)
+    assert len(stopped) < 1000
+    np.testing.assert_array_equal(cache.get(key), stopped)
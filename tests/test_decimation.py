@@ -0,0 +1,42 @@
+from drift_explorer import compute_motion
+from drift_explorer.decimation import decimate, display_coordinates
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+
+def distance_to_polyline(points, indices):
+    """Distance in pixels from each point to the segment of the
+    decimated line drawn past it"""
+    following = np.clip(np.searchsorted(indices, np.arange(len(points))), 1, None)
+    start, end = points[indices[following - 1]], points[indices[following]]
+    direction = end - start
+    length_squared = np.maximum(np.sum(direction**2, axis=1), 1e-30)
+    fraction = np.clip(
+        np.sum((points - start) * direction, axis=1) / length_squared, 0, 1
+    )
+    return np.linalg.norm(points - start - fraction[:, np.newaxis] * direction, axis=1)
+
+
+def test_decimate():
+    _, ax = plt.subplots(subplot_kw={"projection": "3d"})
+    positions = compute_motion(
+        [0, 1, 0, 1, 0, 0.1], 0, 1, 1, (0, 0, 1), (0.05, 0, 0), num_periods=2000
+    )
+    ax.axis((-300, 300, -600, 0, 0, 1300))
+
+    indices = decimate(ax, positions)
+
+    assert indices[0] == 0
+    assert indices[-1] == len(positions) - 1
+    assert len(indices) < len(positions) / 10
+
+    points = display_coordinates(ax, positions)
+    assert distance_to_polyline(points, indices).max() <= np.sqrt(2)
+
+    # Zooming in brings back the detail
+    ax.axis((-2, 2, -2, 2, 0, 2))
+    assert len(decimate(ax, positions)) > len(indices)
@@ -0,0 +1,64 @@
+from drift_explorer import (
+    FieldExpression,
+    compute_motion,
+    gyro_average,
+    measure_drift,
+    theoretical_drift,
+)
+
+import numpy as np
+import pytest
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+
+
+def test_gyro_average():
+    # A circle about a drifting centre, sampled a fractional number of
+    # times per period
+    times = np.linspace(0, 3 * 2 * np.pi, 311)
+    positions = np.stack(
+        (np.cos(times), np.sin(times) + 0.2 * times, 0.1 * times), axis=1
+    )
+    centre_times, centres = gyro_average(positions, times, 2 * np.pi)
+
+    assert centre_times[0] == pytest.approx(np.pi)
+    expected = np.stack(
+        (np.zeros_like(centre_times), 0.2 * centre_times, 0.1 * centre_times), axis=1
+    )
+    np.testing.assert_allclose(centres, expected, atol=1e-3)
+
+    with pytest.raises(ValueError):
+        gyro_average(positions[:50], times[:50], 2 * np.pi)
+
+
+@pytest.mark.parametrize("num_periods", [2, 3, 5])
+def test_uniform_drift(num_periods):
+    B, F = (0, 0, 1), (0.05, 0, 0)
+    positions = compute_motion(
+        initial_conditions, 0, 1, 1, B, F, num_periods=num_periods, method="analytic"
+    )
+    diagnostics = measure_drift(
+        positions, initial_conditions, 0, 1, 1, B, F, num_periods=num_periods
+    )
+
+    np.testing.assert_allclose(diagnostics.theory, [0, -0.05, 0])
+    np.testing.assert_allclose(diagnostics.drift, diagnostics.theory, atol=1e-7)
+    # Along the field, the velocity is left as it was
+    np.testing.assert_allclose(diagnostics.velocity[2], 0.1)
+
+
+def test_grad_B_drift():
+    # The field strengthens along x, so a positive charge drifts along
+    # B x grad B = +y, at mu |grad B| / (q B) = 0.005
+    B = FieldExpression("0, 0, 1 + 0.01*x")
+    np.testing.assert_allclose(
+        theoretical_drift(initial_conditions, 0, 1, 1, B), [0, 0.005, 0], rtol=1e-2
+    )
+
+    positions = compute_motion(
+        initial_conditions, 0, 1, 1, B, num_periods=5, rtol=1e-10, atol=1e-12
+    )
+    diagnostics = measure_drift(
+        positions, initial_conditions, 0, 1, 1, B, num_periods=5
+    )
+    np.testing.assert_allclose(diagnostics.drift, diagnostics.theory, atol=1e-5)
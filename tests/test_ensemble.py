@@ -0,0 +1,91 @@
+from drift_explorer import Box, EnsembleStatistics, compute_ensemble, maxwellian
+
+import numpy as np
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+B = (0, 0, 1)
+F = (0.05, 0, 0)
+
+
+def test_maxwellian():
+    velocities = maxwellian(100_000, [1, 0, 0.1], 0.2, rng=1)
+    assert velocities.shape == (100_000, 3)
+    np.testing.assert_allclose(velocities.mean(axis=0), [1, 0, 0.1], atol=5e-3)
+    np.testing.assert_allclose(velocities.std(axis=0), 0.2, rtol=1e-2)
+
+
+def test_streaming_statistics():
+    velocities = np.random.default_rng(2).normal([1, -2, 3], [0.1, 1, 2], (1000, 3))
+    statistics = EnsembleStatistics(bins=20)
+    for chunk in np.array_split(velocities, 7):
+        statistics.add(chunk, lost=1)
+
+    assert statistics.count == 1000
+    assert statistics.loss_fraction == 7 / 1007
+    np.testing.assert_allclose(statistics.mean, velocities.mean(axis=0))
+    np.testing.assert_allclose(statistics.covariance, np.cov(velocities.T))
+    # Edges from the first chunk, five of its standard deviations wide
+    assert np.all(statistics.histograms.sum(axis=1) + statistics.outside == 1000)
+
+
+def test_uniform_drift():
+    # Every particle drifts along -y at |F x B| = 0.05, and keeps its
+    # parallel velocity, however fast it gyrates
+    statistics = compute_ensemble(
+        initial_conditions,
+        0,
+        1,
+        1,
+        B,
+        F,
+        num_particles=2000,
+        thermal_speed=0.1,
+        method="analytic",
+        chunk_size=300,
+        num_orbits=3,
+        seed=3,
+    )
+    assert statistics.total == 2000
+    assert statistics.lost == 0
+    np.testing.assert_allclose(statistics.mean[:2], [0, -0.05], atol=1e-12)
+    np.testing.assert_allclose(statistics.mean[2], 0.1, atol=1e-2)
+    np.testing.assert_allclose(statistics.std, [0, 0, 0.1], atol=1e-2)
+    assert statistics.orbits.shape == (3, 1000, 3)
+
+    # Chunking only changes the order the particles are added in
+    again = compute_ensemble(
+        initial_conditions,
+        0,
+        1,
+        1,
+        B,
+        F,
+        num_particles=2000,
+        thermal_speed=0.1,
+        method="analytic",
+        num_orbits=0,
+        seed=3,
+    )
+    np.testing.assert_allclose(again.mean, statistics.mean)
+    np.testing.assert_allclose(again.covariance, statistics.covariance, atol=1e-15)
+
+
+def test_losses():
+    # The particles rise along z at about 0.1, out of the box after
+    # about a gyroperiod, unless they start heading down
+    statistics = compute_ensemble(
+        initial_conditions,
+        0,
+        1,
+        1,
+        B,
+        num_particles=500,
+        thermal_speed=0.1,
+        method="boris",
+        stop=Box([-5, -5, -1], [5, 5, 1]),
+        seed=4,
+    )
+    assert statistics.total == 500
+    assert 0.5 < statistics.loss_fraction < 1
+    # Those left are the ones that barely move along z
+    assert np.all(np.abs(statistics.mean[2]) < 1 / (20 * np.pi))
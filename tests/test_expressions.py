@@ -0,0 +1,109 @@
+from drift_explorer import (
+    FieldExpression,
+    compute_motion,
+    compute_motion_batch,
+)
+from drift_explorer.cache import TrajectoryCache
+
+import numpy as np
+import pytest
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+
+
+def test_evaluation():
+    field = FieldExpression("1 + x*y, y - 0.5*z^2, 2")
+    assert not field.time_dependent
+    assert field == FieldExpression(" 1 + x*y, y - 0.5*z^2, 2 ")
+
+    rng = np.random.default_rng(1)
+    points = rng.uniform(-1, 1, (3, 100))
+    x, y, z = points
+    expected = np.array([1 + x * y, y - 0.5 * z**2, np.full_like(x, 2)])
+    np.testing.assert_allclose(field(points), expected)
+    np.testing.assert_allclose(field(points[:, 0]), expected[:, 0])
+
+    wave = FieldExpression("0, 0, cos(x - t)")
+    assert wave.time_dependent
+    np.testing.assert_allclose(wave([np.pi, 0, 0], np.pi), [0, 0, 1])
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("0, 0", "three components"),
+        ("0, 0, 1 +", "Invalid expression"),
+        ("0, 0, w", "Unknown name"),
+        ("0, 0, __import__('os')", "can't be called"),
+        ("0, 0, x.real", "not allowed"),
+        ("0, 0, 'a'", "Only numbers"),
+        ("0, 0, [x][0]", "not allowed"),
+    ],
+)
+def test_invalid_expressions(text, message):
+    with pytest.raises(ValueError, match=message):
+        FieldExpression(text)
+
+
+@pytest.mark.parametrize("method", ["RK45", "boris"])
+@pytest.mark.parametrize("t0", [0.0, 2.0])
+def test_time_dependent_force(method, t0):
+    # A force along B growing in time, so z follows a cubic
+    B = (0, 0, 1)
+    F = FieldExpression("0, 0, 0.01 * t")
+    positions = compute_motion(
+        initial_conditions,
+        t0,
+        1,
+        1,
+        FieldExpression("0, 0, 1"),
+        F,
+        num_periods=2,
+        method=method,
+        rtol=1e-8,
+        atol=1e-10,
+        steps_per_period=200,
+    )
+
+    # Boris is only second order in time
+    atol = 1e-4 if method == "boris" else 1e-6
+    time = np.linspace(0, 4 * np.pi, len(positions))
+    z = 0.1 * time + 0.01 * (t0 * time**2 / 2 + time**3 / 6)
+    np.testing.assert_allclose(positions[:, 2], z, atol=atol)
+
+    # Across B the motion is the same as in a uniform field
+    expected = compute_motion(
+        initial_conditions, 0, 1, 1, B, num_periods=2, method="analytic"
+    )
+    np.testing.assert_allclose(positions[:, :2], expected[:, :2], atol=1e-3)
+
+    batch = compute_motion_batch(
+        np.tile(initial_conditions, (2, 1)),
+        t0,
+        1,
+        1,
+        B,
+        F,
+        num_periods=2,
+        method=method,
+        rtol=1e-8,
+        atol=1e-10,
+        steps_per_period=200,
+    )
+    np.testing.assert_allclose(batch[0, :, 2], z, atol=atol)
+
+
+def test_cached_expressions():
+    cache = TrajectoryCache()
+    first = cache.compute_motion(
+        initial_conditions, 0, 1, 1, FieldExpression("0, 0, 1 + 0.01*x"), num_periods=1
+    )
+    # A separately compiled copy of the same expression is a hit
+    second = cache.compute_motion(
+        initial_conditions, 0, 1, 1, FieldExpression("0, 0, 1 + 0.01*x"), num_periods=1
+    )
+    assert second is first
+    other = cache.compute_motion(
+        initial_conditions, 0, 1, 1, FieldExpression("0, 0, 1 + 0.02*x"), num_periods=1
+    )
+    assert other is not first
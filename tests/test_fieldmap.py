@@ -0,0 +1,74 @@
+from drift_explorer import FieldMap, compute_motion
+
+import numpy as np
+import pytest
+
+
+def quadratic_field(position):
+    x, y, z = position
+    return np.array([1 + x * y, y - 0.5 * z**2, 2 + 0.1 * x])
+
+
+def test_interpolation():
+    rng = np.random.default_rng(1)
+    # Away from the edges, where the tricubic stencil is complete
+    points = rng.uniform(-0.8, 0.8, (3, 1000))
+
+    linear = FieldMap.from_function(
+        quadratic_field, (-1, -1, -1), (1, 1, 1), (21, 31, 41)
+    )
+    cubic = FieldMap.from_function(
+        quadratic_field, (-1, -1, -1), (1, 1, 1), (21, 31, 41), order=3
+    )
+
+    expected = quadratic_field(points)
+    np.testing.assert_allclose(linear(points), expected, atol=1e-3)
+    # Catmull-Rom reproduces quadratics exactly
+    np.testing.assert_allclose(cubic(points), expected, atol=1e-12)
+
+    # One position at a time gives the same
+    for field in (linear, cubic):
+        np.testing.assert_allclose(field(points[:, 0]), field(points)[:, 0])
+        np.testing.assert_allclose(
+            field(list(points[:, 1])), field(points[:, :2])[:, 1]
+        )
+
+    with pytest.raises(ValueError, match="outside the field map"):
+        linear([2.0, 0.0, 0.0])
+    filled = FieldMap(*linear.axes, linear.values, fill_value=[0, 0, 1])
+    np.testing.assert_array_equal(filled(np.array([[2.0], [0], [0]])), [[0], [0], [1]])
+
+
+def test_motion_through_field_map():
+    initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+    B = (0, 0, 1)
+    F = (0.01, 0, 0)
+    uniform = FieldMap.from_function(
+        lambda position: np.broadcast_to(np.reshape(B, (3, 1)), position.shape),
+        (-5, -5, -5),
+        (5, 5, 5),
+        (3, 3, 3),
+    )
+    force = FieldMap(*uniform.axes, np.broadcast_to(F, uniform.values.shape))
+
+    expected = compute_motion(
+        initial_conditions, 0, 1, 1, B, F, num_periods=2, method="analytic"
+    )
+    for method in ("RK45", "boris"):
+        positions = compute_motion(
+            initial_conditions,
+            0,
+            1,
+            1,
+            uniform,
+            force,
+            num_periods=2,
+            method=method,
+            rtol=1e-8,
+            atol=1e-10,
+            steps_per_period=200,
+        )
+        np.testing.assert_allclose(positions, expected, atol=1e-3)
+
+    with pytest.raises(ValueError, match="uniform"):
+        compute_motion(initial_conditions, 0, 1, 1, B, force, method="analytic")
@@ -0,0 +1,111 @@
+from drift_explorer import FieldExpression, compute_motion
+
+from conftest import wait_for
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def window(qapp):
+    # Only once there is an application, so matplotlib picks Qt
+    from drift_explorer.gui import DriftExplorer
+
+    window = DriftExplorer()
+    window.cache.clear()
+    window.method_box.setCurrentText("DOP853")
+    window.rtol_box.setValue(1e-10)
+    window.atol_box.setValue(1e-12)
+    yield window
+    window.close()
+
+
+def run_then_extend(qapp, window, periods, total_periods):
+    window.num_gyroperiods_spinbox.setValue(periods)
+    window.run_to_end()
+    wait_for(qapp, lambda: window.worker is None)
+    window.num_gyroperiods_spinbox.setValue(total_periods)
+    window.extend()
+    wait_for(qapp, lambda: window.worker is None)
+    return window.final_state
+
+
+def test_extend_non_uniform(qapp, window):
+    # The gyroperiod where the extension starts differs from the first
+    # run's, which the extension still counts its periods in
+    window.b_expression_box.setText("0, 0, 1 + 0.05*x")
+    state = run_then_extend(qapp, window, 10, 20)
+
+    _, expected = compute_motion(
+        window.sim_settings()[0][0],
+        0,
+        1,
+        1,
+        FieldExpression("0, 0, 1 + 0.05*x"),
+        num_periods=20,
+        method="DOP853",
+        rtol=1e-10,
+        atol=1e-12,
+        return_state=True,
+    )
+    np.testing.assert_allclose(state, expected, atol=1e-6)
+
+
+def test_extend_time_dependent(qapp, window):
+    # The extension must see the field as it is when the first run ends
+    expression = "0, 0, 1 + 0.05*sin(0.35*t)"
+    window.b_expression_box.setText(expression)
+    state = run_then_extend(qapp, window, 10, 20)
+
+    _, expected = compute_motion(
+        window.sim_settings()[0][0],
+        0,
+        1,
+        1,
+        FieldExpression(expression),
+        num_periods=20,
+        method="DOP853",
+        rtol=1e-10,
+        atol=1e-12,
+        return_state=True,
+    )
+    np.testing.assert_allclose(state, expected, atol=1e-6)
+
+
+def test_splitting_options(window):
+    window.dense_output_box.setChecked(True)
+    window.section_group.setChecked(True)
+    window.method_box.setCurrentText("splitting")
+    for option in (window.dense_output_box, window.section_group):
+        assert not option.isChecked()
+        assert not option.isEnabled()
+
+    window.method_box.setCurrentText("boris")
+    assert window.dense_output_box.isEnabled()
+    assert window.section_group.isEnabled()
+
+
+def test_open_run(qapp, window, tmp_path, monkeypatch):
+    from PyQt6.QtWidgets import QFileDialog
+
+    path = str(tmp_path / "run.drift")
+    monkeypatch.setattr(QFileDialog, "getSaveFileName", lambda *args: (path, ""))
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", lambda *args: (path, ""))
+
+    window.b_expression_box.setText("0, 0, 1 + 0.05*x")
+    window.run_to_end()
+    wait_for(qapp, lambda: window.worker is None)
+    settings = window.run_settings
+    window.save_run()
+
+    # The run is opened as it was saved, whatever mode is ticked
+    window.ensemble_group.setChecked(True)
+    window.open_run()
+    assert window.run_settings == settings
+    np.testing.assert_array_equal(
+        window.positions, window.cache.compute_motion(*settings[0], **settings[1])
+    )
+
+
+def test_cache_in_memory(window):
+    assert window.cache.directory is None
@@ -1,4 +1,13 @@
-from drift_explorer import compute_motion
+from drift_explorer import (
+    FieldExpression,
+    compute_dense_motion,
+    compute_motion,
+    compute_motion_batch,
+    compute_guiding_centre,
+    iter_motion,
+)
+from drift_explorer.solver import newton, newton_batch_jacobian, newton_jacobian
+from drift_explorer.stepping import SOLVE_IVP_METHODS
 
 import numpy as np
 
@@ -12,7 +21,9 @@ def test_basic():
 
     B = (0, 0, 1)
 
-    ions = compute_motion(initial_conditions, t0, q, m, B)
+    # The default picks the exact solution in uniform fields, so ask
+    # for the integrator
+    ions = compute_motion(initial_conditions, t0, q, m, B, method="RK45")
 
     x_min = ions[:, 0].min()
     x_max = ions[:, 0].max()
@@ -29,3 +40,371 @@ def test_basic():
     assert np.isclose(y_max, 1.0, rtol=rtol)
     assert np.isclose(z_min, 0.0, rtol=rtol)
     assert np.isclose(z_max, 2 * np.pi, rtol=rtol)
+
+
+def test_batch_matches_single():
+    t0 = 0
+    initial_conditions = np.array(
+        [
+            [0, 1, 0, 1, 0, 0.1],
+            [1, 0, 0, 0, 0.5, 0],
+            [0, 0, 1, -0.2, 0.3, 0.4],
+        ]
+    )
+    charge = np.array([1, -1, 2])
+    mass = 1
+    B = (0, 0.5, 1)
+    F = (0.1, 0, 0)
+
+    batch = compute_motion_batch(
+        initial_conditions,
+        t0,
+        charge,
+        mass,
+        B,
+        F,
+        method="RK45",
+        rtol=1e-10,
+        atol=1e-12,
+    )
+
+    assert batch.shape == (3, 1000, 3)
+
+    for particle, q, positions in zip(initial_conditions, charge, batch):
+        single = compute_motion(
+            particle, t0, q, mass, B, F, method="RK45", rtol=1e-10, atol=1e-12
+        )
+        np.testing.assert_allclose(positions, single, atol=1e-6)
+
+
+def test_boris():
+    q, m = 1, 1
+    t0 = 0
+    initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+    B = (0, 0, 1)
+
+    ions = compute_motion(
+        initial_conditions, t0, q, m, B, num_periods=1000, method="boris"
+    )
+
+    # No secular growth of the orbit, and exact gyrophase so the final
+    # point is back where it started
+    radius = np.hypot(ions[:, 0], ions[:, 1])
+    np.testing.assert_allclose(radius, 1.0, rtol=1e-3)
+    assert np.isclose(radius[-100:].max(), radius[:100].max(), rtol=1e-10)
+    np.testing.assert_allclose(ions[-1, :2], [0, 1], atol=1e-10)
+    assert np.isclose(ions[-1, 2], 0.1 * 2 * np.pi * 1000)
+
+
+def test_splitting():
+    t0 = 0
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+
+    # Exact in uniform fields, even with steps of many gyroperiods, for
+    # electrons and ions together
+    charge, mass = np.array([1, -1]), np.array([1, 0.01])
+    exact = compute_motion_batch(
+        [initial_conditions] * 2, t0, charge, mass, B, F, method="analytic"
+    )
+    for steps_per_period in (0.05, 1, 5):
+        split = compute_motion_batch(
+            [initial_conditions] * 2,
+            t0,
+            charge,
+            mass,
+            B,
+            F,
+            method="splitting",
+            steps_per_period=steps_per_period,
+        )
+        np.testing.assert_allclose(split, exact, atol=1e-9)
+
+    # Second order in fields that vary
+    B = FieldExpression("0, 0, 1 + 0.05*x")
+    F = FieldExpression("0.02*y, 0, 0")
+    settings = dict(num_periods=3, points_per_period=20)
+    reference = compute_motion(
+        initial_conditions,
+        t0,
+        1,
+        1,
+        B,
+        F,
+        method="DOP853",
+        rtol=1e-12,
+        atol=1e-12,
+        **settings,
+    )
+    errors = []
+    for steps_per_period in (20, 40):
+        stats = {}
+        split = compute_motion(
+            initial_conditions,
+            t0,
+            1,
+            1,
+            B,
+            F,
+            method="splitting",
+            steps_per_period=steps_per_period,
+            stats=stats,
+            **settings,
+        )
+        assert stats["steps"] == 3 * steps_per_period
+        errors.append(np.abs(split - reference).max())
+    assert 3.5 < errors[0] / errors[1] < 4.5
+    assert errors[1] < 1e-2
+
+
+def test_analytic_matches_integrator():
+    t0 = 0
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+
+    for q in (1, -1):
+        exact = compute_motion(initial_conditions, t0, q, 1, B, F, method="analytic")
+        numerical = compute_motion(
+            initial_conditions, t0, q, 1, B, F, method="RK45", rtol=1e-10, atol=1e-12
+        )
+        np.testing.assert_allclose(exact, numerical, atol=1e-6)
+
+
+def test_guiding_centre():
+    t0 = 0
+    q, m = 1, 1
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+
+    # Reconstructing the gyration is exact in uniform fields
+    particle = compute_motion(initial_conditions, t0, q, m, B, F)
+    reconstructed = compute_guiding_centre(
+        initial_conditions, t0, q, m, B, F, points_per_period=100, gyrophase=True
+    )
+    np.testing.assert_allclose(reconstructed, particle, atol=1e-8)
+
+    # grad-B drift speed mu * |grad B| / (q B) for a particle starting
+    # with unit perpendicular speed where B = 1
+    def B_gradient(position):
+        x = position[0]
+        return (0 * x, 0 * x, 1 + 0.01 * x)
+
+    centres = compute_guiding_centre(
+        [0, 0, 0, 1, 0, 0], t0, q, m, B_gradient, num_periods=100, rtol=1e-8
+    )
+    t1 = 100 * 2 * np.pi
+    assert np.isclose(centres[-1, 1] - centres[0, 1], 0.5 * 0.01 * t1, rtol=1e-3)
+
+
+def test_continue_from_final_state():
+    t0 = 0
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+
+    for method in ("analytic", "RK45", "boris"):
+        kwargs = dict(method=method, rtol=1e-10, atol=1e-12)
+        _, full_state = compute_motion(
+            initial_conditions,
+            t0,
+            1,
+            1,
+            B,
+            F,
+            num_periods=20,
+            return_state=True,
+            **kwargs,
+        )
+        first, state = compute_motion(
+            initial_conditions,
+            t0,
+            1,
+            1,
+            B,
+            F,
+            num_periods=10,
+            return_state=True,
+            **kwargs,
+        )
+        second, final_state = compute_motion(
+            state, t0, 1, 1, B, F, num_periods=10, return_state=True, **kwargs
+        )
+
+        np.testing.assert_allclose(second[0], first[-1])
+        np.testing.assert_allclose(final_state, full_state, atol=1e-5)
+
+
+def test_iter_matches_compute():
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+
+    for method in ("analytic", *SOLVE_IVP_METHODS, "boris", "splitting"):
+        kwargs = dict(method=method, rtol=1e-8, atol=1e-10, num_periods=10)
+        positions, state = compute_motion(
+            initial_conditions, 0, 1, 1, B, F, return_state=True, **kwargs
+        )
+        # 1000 positions, so the last chunk is only partly filled
+        chunks = iter_motion(
+            initial_conditions, 0, 1, 1, B, F, chunk_size=300, **kwargs
+        )
+        pieces = []
+        while True:
+            try:
+                pieces.append(next(chunks))
+            except StopIteration as stop:
+                final_state = stop.value
+                break
+
+        assert [len(piece) for piece in pieces] == [300, 300, 300, 100]
+        np.testing.assert_array_equal(np.concatenate(pieces), positions)
+        np.testing.assert_array_equal(final_state, state)
+
+
+def test_velocities():
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+    length = 1000
+
+    exact = np.empty((length, 3))
+    compute_motion(initial_conditions, 0, 1, 1, B, F, velocities=exact)
+    # The speed along B grows with the force along it
+    b = np.array(B) / np.linalg.norm(B)
+    parallel = exact @ b
+    time = np.linspace(0, 20 * np.pi / np.linalg.norm(B), length)
+    np.testing.assert_allclose(parallel, parallel[0] + (F @ b) * time)
+
+    for method in (*SOLVE_IVP_METHODS, "boris", "splitting"):
+        kwargs = dict(method=method, rtol=1e-8, atol=1e-10, steps_per_period=200)
+        velocities = np.empty((length, 3))
+        positions, state = compute_motion(
+            initial_conditions,
+            0,
+            1,
+            1,
+            B,
+            F,
+            return_state=True,
+            velocities=velocities,
+            **kwargs,
+        )
+        # Asking for the velocities leaves the positions as they were
+        np.testing.assert_array_equal(
+            positions, compute_motion(initial_conditions, 0, 1, 1, B, F, **kwargs)
+        )
+        np.testing.assert_allclose(velocities, exact, atol=1e-3)
+        np.testing.assert_allclose(velocities[-1], state[3:])
+
+
+def test_dense_output():
+    t0 = 0
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+    exact = compute_motion(initial_conditions, t0, 1, 1, B, F, method="analytic")
+
+    # Sampling the dense output on the same grid gives the same result
+    for method in ("analytic", "RK45"):
+        kwargs = dict(method=method, rtol=1e-10, atol=1e-12)
+        positions = compute_motion(initial_conditions, t0, 1, 1, B, F, **kwargs)
+        trajectory = compute_dense_motion(initial_conditions, t0, 1, 1, B, F, **kwargs)
+        np.testing.assert_allclose(trajectory.sample(len(positions)), positions)
+
+    # Interpolating between the Boris steps converges to the exact orbit
+    trajectory = compute_dense_motion(
+        initial_conditions, t0, 1, 1, B, F, method="boris", steps_per_period=1000
+    )
+    np.testing.assert_allclose(trajectory.sample(len(exact)), exact, atol=1e-4)
+
+    # Part of the run at a finer resolution
+    window = trajectory.sample(5000, stop=trajectory.duration / 10)
+    exact_window = compute_dense_motion(
+        initial_conditions, t0, 1, 1, B, F, method="analytic"
+    ).sample(5000, stop=trajectory.duration / 10)
+    np.testing.assert_allclose(window, exact_window, atol=1e-4)
+
+
+def test_jacobian():
+    rng = np.random.default_rng(2)
+    Y = rng.normal(size=6)
+    q, m = -1.5, 0.3
+    B = FieldExpression("0.1*y, 0.2*z*t, 1 + 0.1*x^2")
+    F = FieldExpression("0.05*x*y, 0, sin(z)")
+
+    # Central differences of the equations of motion themselves
+    step = 1e-6
+    expected = np.array(
+        [
+            (
+                newton(0.5, Y + step * e, q, m, B, F)
+                - newton(0.5, Y - step * e, q, m, B, F)
+            )
+            / (2 * step)
+            for e in np.eye(6)
+        ]
+    ).T
+    np.testing.assert_allclose(newton_jacobian(0.5, Y, q, m, B, F), expected, atol=1e-7)
+
+    # The batch Jacobian has one such block per particle
+    states = rng.normal(size=(6, 4))
+    batch = newton_batch_jacobian(
+        0.5, states.ravel(), np.full(4, q), np.full(4, m), B, F
+    ).toarray()
+    for particle in range(4):
+        index = np.arange(6) * 4 + particle
+        np.testing.assert_allclose(
+            batch[np.ix_(index, index)],
+            newton_jacobian(0.5, states[:, particle], q, m, B, F),
+        )
+
+
+def test_implicit_methods():
+    initial_conditions = np.array([0.5, 1, 0, 1, -0.3, 0.1])
+    B = (0.2, 0, 1)
+    F = (0.1, 0.05, 0.02)
+    exact = compute_motion(initial_conditions, 0, 1, 1, B, F, method="analytic")
+
+    class Field:
+        """B with its gradient given, which should be used instead of
+        finite differences"""
+
+        gradient_calls = 0
+
+        def __call__(self, position):
+            return np.multiply.outer(B, np.ones(np.shape(position)[1:]))
+
+        def gradient(self, position):
+            Field.gradient_calls += 1
+            return np.zeros((3, 3, *np.shape(position)[1:]))
+
+    for method in ("Radau", "BDF", "LSODA"):
+        for field in (B, Field()):
+            positions = compute_motion(
+                initial_conditions,
+                0,
+                1,
+                1,
+                field,
+                F,
+                method=method,
+                rtol=1e-9,
+                atol=1e-11,
+            )
+            np.testing.assert_allclose(positions, exact, atol=1e-5)
+        batch = compute_motion_batch(
+            [initial_conditions] * 2,
+            0,
+            1,
+            1,
+            Field(),
+            F,
+            method=method,
+            rtol=1e-9,
+            atol=1e-11,
+        )
+        np.testing.assert_allclose(batch[1], exact, atol=1e-5)
+    assert Field.gradient_calls > 0
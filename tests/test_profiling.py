@@ -0,0 +1,90 @@
+from drift_explorer import compute_motion
+from drift_explorer.cache import TrajectoryCache
+from drift_explorer.profiling import RunProfile
+
+import json
+import pstats
+
+import numpy as np
+import pytest
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+
+
+def test_solver_stats():
+    stats = {}
+    compute_motion(
+        initial_conditions,
+        0,
+        1,
+        1,
+        (0, 0, 1),
+        num_periods=2,
+        method="RK45",
+        stats=stats,
+    )
+    assert stats["steps"] > 0
+    # Six evaluations a step, and more for the first step and rejected ones
+    assert stats["nfev"] >= 6 * stats["steps"]
+
+    stats = {}
+    compute_motion(
+        initial_conditions,
+        0,
+        1,
+        1,
+        (0, 0, 1),
+        num_periods=2,
+        method="boris",
+        steps_per_period=50,
+        stats=stats,
+    )
+    # At least the steps asked for, and a whole number between samples
+    assert stats["steps"] >= 100
+    assert stats["steps"] % 199 == 0
+
+    cache = TrajectoryCache()
+    stats = {}
+    cache.compute_motion(initial_conditions, 0, 1, 1, (0, 0, 1), stats=stats)
+    assert not stats.get("cached")
+    cache.compute_motion(initial_conditions, 0, 1, 1, (0, 0, 1), stats=stats)
+    assert stats["cached"]
+
+
+def test_run_profile(tmp_path):
+    profile = RunProfile()
+    with profile.stage("solve"), profile.capture():
+        compute_motion(
+            initial_conditions, 0, 1, 1, (0, 0, 1), method="RK45", stats=profile.solver
+        )
+    with profile.stage("draw"):
+        pass
+    with profile.stage("draw"):
+        pass
+    profile.memory["positions"] = 3 * 2**20
+
+    assert list(profile.stages) == ["solve", "draw"]
+    summary = profile.summary()
+    assert summary.startswith("Done in")
+    assert "steps" in summary and "3.0 MiB" in summary
+
+    profile.save(tmp_path / "report.json")
+    with open(tmp_path / "report.json") as file:
+        report = json.load(file)
+    assert report["solver"]["nfev"] == profile.solver["nfev"]
+    assert report["functions"] is None
+    with pytest.raises(ValueError, match="cProfile"):
+        profile.save(tmp_path / "report.prof")
+
+
+def test_capture(tmp_path):
+    profile = RunProfile(capture=True)
+    with profile.stage("solve"), profile.capture():
+        compute_motion(initial_conditions, 0, 1, 1, (0, 0, 1), method="RK45")
+
+    functions = profile.functions()
+    assert any("compute_motion" in function["function"] for function in functions)
+
+    profile.save(tmp_path / "run.prof")
+    stats = pstats.Stats(str(tmp_path / "run.prof"))
+    assert stats.total_calls > 0
@@ -0,0 +1,101 @@
+from drift_explorer import Plane, compute_motion, compute_section
+from drift_explorer.cache import TrajectoryCache
+
+import numpy as np
+import pytest
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+B = (0, 0, 1)
+F = (0.05, 0, 0)
+# Through the start, which the particle crosses upward once per period
+plane = Plane([0, 0, 0], [1, 0, 0])
+
+
+def test_plane():
+    np.testing.assert_allclose(
+        plane.coordinates([[5, 2, 3], [0, -1, 1]]), [[2, 3], [-1, 1]]
+    )
+    tilted = Plane([1, 0, 0], [1, 1, 0])
+    np.testing.assert_allclose(tilted.distance([[1, 0, 5], [2, 1, 0]]), [0, np.sqrt(2)])
+    np.testing.assert_allclose(tilted.axes @ tilted.axes.T, np.eye(2), atol=1e-15)
+    np.testing.assert_allclose(tilted.axes @ tilted.normal, 0, atol=1e-15)
+
+    assert Plane([0, 0, 0], [2, 0, 0]) == plane
+    with pytest.raises(ValueError):
+        Plane([0, 0, 0], [0, 0, 0])
+
+
+@pytest.mark.parametrize("method", ["analytic", "RK45", "DOP853", "Radau", "boris"])
+def test_crossings(method):
+    # Stopping half a period after a crossing, away from the end of the run
+    positions, times = compute_section(
+        initial_conditions,
+        0,
+        1,
+        1,
+        B,
+        F,
+        plane,
+        num_periods=5.5,
+        method=method,
+        steps_per_period=100,
+        rtol=1e-10,
+        atol=1e-12,
+        return_times=True,
+    )
+
+    # The particle drifts along -y at |F x B| = 0.05, and rises along z
+    # at 0.1, back at x = 0 after every period
+    periods = np.arange(1, 6)
+    np.testing.assert_allclose(times, 2 * np.pi * periods)
+    expected = np.stack((np.zeros(5), 1 - 0.05 * times, 0.1 * times), axis=1)
+    np.testing.assert_allclose(
+        positions, expected, atol=1e-3 if method == "boris" else 1e-7
+    )
+
+
+def test_directions():
+    settings = dict(num_periods=5.25, method="RK45", rtol=1e-8, atol=1e-10)
+    both = compute_section(
+        initial_conditions, 0, 1, 1, B, F, plane, direction=0, **settings
+    )
+    downward = compute_section(
+        initial_conditions, 0, 1, 1, B, F, plane, direction=-1, **settings
+    )
+    assert len(both) == 10
+    np.testing.assert_allclose(downward, both[::2])
+    # Half a period after each upward crossing, on the far side of the orbit
+    assert np.all(downward[:, 1] < -1)
+
+    # As often as the sampled trajectory changes side, after leaving the
+    # plane at the start
+    trajectory = compute_motion(initial_conditions, 0, 1, 1, B, F, **settings)
+    assert np.count_nonzero(np.diff(np.sign(trajectory[1:, 0]))) == len(both)
+
+
+def test_long_run():
+    # Memory grows with the crossings, not the steps taken
+    positions = compute_section(
+        initial_conditions, 0, 1, 1, B, num_periods=20_000, method="analytic"
+    )
+    assert positions.shape == (19_999, 3)
+    np.testing.assert_allclose(positions[:, :2], [[0, 1]] * len(positions), atol=1e-9)
+
+
+def test_cached():
+    cache = TrajectoryCache()
+    first = cache.call(compute_section, initial_conditions, 0, 1, 1, B, F, plane)
+    stats = {}
+    again = cache.call(
+        compute_section,
+        initial_conditions,
+        0,
+        1,
+        1,
+        B,
+        F,
+        Plane([0, 0, 0], [1, 0, 0]),
+        stats=stats,
+    )
+    assert again is first
+    assert stats["cached"]
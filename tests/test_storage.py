@@ -0,0 +1,45 @@
+from drift_explorer import CompactTrajectory, allocate_positions, compute_motion
+from drift_explorer.cache import TrajectoryCache
+
+import numpy as np
+
+# Far from the origin, where float32 positions would lose the gyration
+initial_conditions = np.array([1e6, 1e6 + 1, 0, 1, 0, 0.1])
+B = (0, 0, 1)
+
+
+def test_compact_storage(tmp_path):
+    expected = compute_motion(initial_conditions, 0, 1, 1, B, method="analytic")
+
+    out = allocate_positions(
+        len(expected),
+        np.float32,
+        origin=initial_conditions[:3],
+        file=tmp_path / "positions.dat",
+    )
+    positions = compute_motion(
+        initial_conditions, 0, 1, 1, B, method="analytic", out=out
+    )
+
+    assert positions is out
+    assert isinstance(positions, CompactTrajectory)
+    assert isinstance(positions.offsets, np.memmap)
+    assert positions.nbytes == expected.nbytes // 2
+
+    np.testing.assert_allclose(np.asarray(positions), expected, rtol=0, atol=1e-5)
+    np.testing.assert_allclose(positions[10:20, 1], expected[10:20, 1], atol=1e-5)
+    np.testing.assert_allclose(positions.min(axis=0), expected.min(axis=0), atol=1e-5)
+    np.testing.assert_allclose(positions.max(axis=0), expected.max(axis=0), atol=1e-5)
+
+
+def test_plain_buffer():
+    out = allocate_positions(1001)
+    assert type(out) is np.ndarray
+
+    positions = compute_motion(initial_conditions, 0, 1, 1, B, out=out)
+    assert positions is out
+
+    # Runs written into a caller's buffer aren't cached
+    cache = TrajectoryCache()
+    cache.compute_motion(initial_conditions, 0, 1, 1, B, out=out)
+    assert not cache._entries
@@ -0,0 +1,76 @@
+from drift_explorer import FieldExpression, compute_motion, load_trajectory
+from drift_explorer.sweep import SUMMARY_FILE, expand_sweep, main, num_runs
+
+import json
+
+import numpy as np
+import pytest
+
+SPEC = """
+charge = [1, -1]
+mass = {start = 0.5, stop = 2, num = 3, log = true}
+velocity = [1, 0, {start = 0, stop = 0.2, num = 2}]
+B = [[0, 0, 1], "0, 0, 1 + 0.01*x"]
+num_periods = 2
+"""
+
+
+def test_expand_sweep():
+    spec = {
+        "charge": [1, {"start": 2, "stop": 4, "num": 3}],
+        "velocity": [1, 0, {"start": 0, "stop": 1, "num": 5}],
+        "B": [[0, 0, 1], "0, 0, 1 + x"],
+    }
+    runs = list(expand_sweep(spec))
+
+    assert len(runs) == num_runs(spec) == 4 * 5 * 2
+    assert sorted({run["charge"] for run in runs}) == [1, 2, 3, 4]
+    assert sorted({run["velocity"][2] for run in runs}) == [0, 0.25, 0.5, 0.75, 1]
+    assert runs[0]["method"] == "auto"
+    assert runs[0]["position"] == [0, 1, 0]
+
+    with pytest.raises(ValueError, match="Unknown sweep parameters"):
+        list(expand_sweep({"charges": [1, 2]}))
+    with pytest.raises(ValueError, match="three components"):
+        list(expand_sweep({"B": [0, 1]}))
+
+
+def test_run_sweep(tmp_path):
+    spec = tmp_path / "sweep.toml"
+    spec.write_text(SPEC)
+
+    assert main([str(spec), "-j", "2"]) == 0
+
+    output = tmp_path / "sweep"
+    with open(output / SUMMARY_FILE) as summary:
+        records = sorted((json.loads(line) for line in summary), key=lambda r: r["run"])
+    assert [record["run"] for record in records] == list(range(24))
+
+    record = records[-1]
+    assert record["seconds"] > 0
+    saved = load_trajectory(output / record["file"])
+    velocities = np.empty_like(saved.velocities)
+    expected = compute_motion(
+        [*record["position"], *record["velocity"]],
+        0,
+        record["charge"],
+        record["mass"],
+        FieldExpression(record["B"]),
+        num_periods=2,
+        velocities=velocities,
+    )
+    np.testing.assert_allclose(saved.positions, expected)
+    np.testing.assert_allclose(saved.velocities, velocities)
+    assert saved.parameters["B"] == "0, 0, 1 + 0.01*x"
+    assert saved.settings["method"] == "auto"
+
+
+def test_failed_runs(tmp_path):
+    spec = tmp_path / "sweep.json"
+    spec.write_text(json.dumps({"B": ["0, 0, nope", [0, 0, 1]], "num_periods": 1}))
+
+    assert main([str(spec), "-o", str(tmp_path / "out"), "-j", "1"]) == 1
+    with open(tmp_path / "out" / SUMMARY_FILE) as summary:
+        failed, succeeded = (json.loads(line) for line in summary)
+    assert "Unknown name 'nope'" in failed["error"]
+    assert "error" not in succeeded
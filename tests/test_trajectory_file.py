@@ -0,0 +1,58 @@
+from drift_explorer import (
+    CompactTrajectory,
+    allocate_positions,
+    compute_motion,
+    load_trajectory,
+    save_trajectory,
+)
+
+import numpy as np
+
+initial_conditions = np.array([0, 1, 0, 1, 0, 0.1])
+B = (0, 0, 1)
+
+
+def test_save_and_load(tmp_path):
+    positions, state = compute_motion(
+        initial_conditions, 0, 1, 1, B, method="analytic", return_state=True
+    )
+    velocities = np.gradient(positions, axis=0)
+    path = tmp_path / "run.drift"
+    save_trajectory(
+        path,
+        positions,
+        velocities=velocities,
+        final_state=state,
+        duration=20 * np.pi,
+        parameters=dict(initial_conditions=initial_conditions, charge=1, mass=1, B=B),
+        settings=dict(method="analytic", num_periods=10),
+    )
+
+    saved = load_trajectory(path)
+    assert isinstance(saved.positions, np.memmap)
+    np.testing.assert_array_equal(saved.positions, positions)
+    np.testing.assert_array_equal(saved.velocities, velocities)
+    np.testing.assert_array_equal(saved.final_state, state)
+    np.testing.assert_allclose(saved.times[[0, -1]], [0, 20 * np.pi])
+    assert saved.parameters["B"] == list(B)
+    assert saved.settings == dict(method="analytic", num_periods=10)
+
+    # Saving over the file doesn't disturb what was opened from it
+    save_trajectory(path, positions[:10])
+    assert len(load_trajectory(path).positions) == 10
+    np.testing.assert_array_equal(saved.positions, positions)
+
+
+def test_save_compact(tmp_path):
+    out = allocate_positions(1000, np.float32, origin=initial_conditions[:3])
+    positions = compute_motion(initial_conditions, 0, 1, 1, B, out=out)
+    path = tmp_path / "run.drift"
+    save_trajectory(path, positions)
+
+    saved = load_trajectory(path)
+    assert isinstance(saved.positions, CompactTrajectory)
+    assert saved.positions.offsets.dtype == np.float32
+    np.testing.assert_array_equal(saved.positions.offsets, positions.offsets)
+    np.testing.assert_array_equal(saved.positions[:], positions[:])
+    assert saved.final_state is None
+    assert saved.times is None
@@ -0,0 +1,91 @@
+from drift_explorer import iter_motion
+from drift_explorer.stepping import num_samples
+from drift_explorer.worker import SolverWorker
+
+from conftest import wait_for
+
+import numpy as np
+import pytest
+
+
+def run_on_thread(qapp, worker):
+    """Run ``worker`` on a `QThread` as the GUI does, returning the
+    name and arguments of the signal it ended with"""
+    from PyQt6.QtCore import QThread
+
+    ended = []
+    thread = QThread()
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    for name in ("finished", "failed", "cancelled"):
+        signal = getattr(worker, name)
+        signal.connect(lambda *args, name=name: ended.append((name, args)))
+        signal.connect(thread.quit)
+    thread.start()
+    wait_for(qapp, lambda: ended and thread.isFinished())
+    return ended
+
+
+def test_cancel(qapp):
+    from PyQt6.QtCore import Qt
+
+    length = num_samples(100, 1, 100)
+    out = np.full((length, 3), np.nan)
+    worker = SolverWorker(
+        iter_motion,
+        [0, 1, 0, 1, 0, 0.1],
+        0,
+        1,
+        1,
+        (0, 0, 1),
+        num_periods=100,
+        method="boris",
+        stream=True,
+        out=out,
+    )
+    # Cancel on the worker's own thread as the first chunk arrives, so
+    # the run can't finish before the request
+    worker.chunk.connect(
+        lambda chunk: worker.cancel(), Qt.ConnectionType.DirectConnection
+    )
+
+    assert run_on_thread(qapp, worker) == [("cancelled", ())]
+    assert worker.result is None
+    # Only the start of the buffer was filled in
+    filled = ~np.isnan(out).any(axis=1)
+    assert 0 < filled.sum() < length
+    assert filled[: filled.sum()].all()
+    expected = iter_motion(
+        [0, 1, 0, 1, 0, 0.1], 0, 1, 1, (0, 0, 1), num_periods=100, method="boris"
+    )
+    np.testing.assert_array_equal(out[filled], np.concatenate(list(expected))[filled])
+
+
+def test_failed(qapp):
+    def force(position):
+        raise ValueError("Force out of range")
+
+    worker = SolverWorker(
+        iter_motion, [0, 1, 0, 1, 0, 0.1], 0, 1, 1, (0, 0, 1), F=force, stream=True
+    )
+    assert run_on_thread(qapp, worker) == [("failed", ("Force out of range",))]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_finished(qapp, stream):
+    worker = SolverWorker(
+        iter_motion if stream else lambda *args, **kwargs: 42,
+        [0, 1, 0, 1, 0, 0.1],
+        0,
+        1,
+        1,
+        (0, 0, 1),
+        stream=stream,
+    )
+    ((name, (result,)),) = run_on_thread(qapp, worker)
+    assert name == "finished"
+    if stream:
+        assert result.shape == (num_samples(10, 1, 100), 3)
+        assert worker.result.shape == (6,)
+    else:
+        assert result == 42